@@ -0,0 +1,13 @@
+"""
+Benchmarks for the hot paths under `game/`.
+
+Run the whole suite (or a part of it) from the game directory with
+
+    python -m game.benchmarks
+    python -m game.benchmarks --filter equipment --output before.json
+    python -m game.benchmarks --compare before.json
+
+Benchmarks needing the database run against a throwaway in-memory database set
+up with the game's own settings, so they never touch `evennia.db3`.
+
+"""
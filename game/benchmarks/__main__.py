@@ -0,0 +1,54 @@
+"""
+Run the benchmark suite, see `game.benchmarks`.
+
+"""
+
+import argparse
+import random
+import sys
+
+from . import (  # noqa: F401 (registers)
+    bench_characters,
+    bench_chargen,
+    bench_equipment,
+    bench_rules,
+)
+from .harness import compare, get_benchmarks, load, run, save
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m game.benchmarks", description="Benchmark the game/ hot paths."
+    )
+    parser.add_argument("--filter", help="Only run benchmarks matching this")
+    parser.add_argument("--number", type=int, help="Override the number of timed calls")
+    parser.add_argument("--seed", type=int, default=0, help="Seed for the global RNG")
+    parser.add_argument("--output", help="Save the results as JSON to this file")
+    parser.add_argument("--compare", help="Compare with results saved in this file")
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.10,
+        help="Slowdown (fraction of ops/sec) counted as a regression (default 0.10)",
+    )
+    parser.add_argument("--list", action="store_true", help="List benchmarks and exit")
+    args = parser.parse_args(args)
+
+    benchmarks = get_benchmarks(args.filter)
+    if args.list:
+        for bench in benchmarks:
+            print(bench.name + (" (db)" if bench.needs_db else ""))
+        return 0
+
+    random.seed(args.seed)
+    results = run(benchmarks, number=args.number)
+    if args.output:
+        save(results, args.output)
+    if args.compare:
+        if compare(load(args.compare), results, threshold=args.threshold):
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
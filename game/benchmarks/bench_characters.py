@@ -0,0 +1,80 @@
+"""
+Benchmarks for character hooks. These need the database.
+
+"""
+
+from .harness import benchmark
+
+# the stats of a character read for saving throws, healing and slot counts
+_STATS = (
+    "strength",
+    "dexterity",
+    "endurance",
+    "intelligence",
+    "perception",
+    "willpower",
+    "hp",
+    "hp_max",
+    "level",
+)
+
+
+@benchmark("characters.at_damage+heal", number=2000, needs_db=True)
+def at_damage_heal():
+    from evennia.utils import create
+
+    from ..characters import EvAdventureCharacter
+
+    character = create.create_object(EvAdventureCharacter, key="punching bag")
+
+    def _round():
+        # what a character goes through in a round of a long fight
+        character.at_damage(1)
+        character.heal(1)
+
+    return _round
+
+
+@benchmark("characters.load", number=500, needs_db=True)
+def load():
+    from evennia.objects.models import ObjectDB
+    from evennia.utils import create
+
+    from ..characters import EvAdventureCharacter
+
+    dbid = create.create_object(
+        EvAdventureCharacter,
+        key="newbie",
+        attributes=(("strength", 3), ("willpower", 2), ("hp", 6), ("hp_max", 6)),
+    ).id
+
+    def _load():
+        # a character not in memory, loaded with the stats combat reads
+        ObjectDB.get_cached_instance(dbid).flush_from_cache(force=True)
+        character = ObjectDB.objects.get(id=dbid)
+        return [getattr(character, stat) for stat in _STATS]
+
+    return _load
+
+
+@benchmark("ledger.raid_loot", number=50, needs_db=True)
+def raid_loot():
+    from evennia.utils import create
+
+    from ..characters import EvAdventureCharacter
+    from ..ledger import CoinLedger
+
+    ledger = CoinLedger()
+    boss = create.create_object(EvAdventureCharacter, key="dragon")
+    raiders = [
+        create.create_object(EvAdventureCharacter, key=f"raider{num}")
+        for num in range(50)
+    ]
+
+    def _loot():
+        # the boss drops a hoard, which is shared out and written in one batch
+        ledger.transfer(None, boss, 500)
+        ledger.transfer_many((boss, raider, 10) for raider in raiders)
+        ledger.apply()
+
+    return _loot
@@ -0,0 +1,30 @@
+"""
+Benchmarks for character generation. These need the database.
+
+"""
+
+from .harness import benchmark
+
+
+@benchmark("chargen.TemporaryCharacterSheet", number=2000, needs_db=True)
+def temporary_character_sheet():
+    from ..chargen import TemporaryCharacterSheet
+
+    return TemporaryCharacterSheet
+
+
+@benchmark("chargen.apply", number=50, needs_db=True)
+def apply():
+    from ..chargen import TemporaryCharacterSheet
+
+    return lambda: TemporaryCharacterSheet().apply()
+
+
+@benchmark("chargen.SheetPool.get", number=2000, needs_db=True)
+def sheet_pool_get():
+    from ..chargen import SheetPool
+
+    # deep enough to never run dry during the run
+    pool = SheetPool(depth=2500, low_water=0)
+    pool.fill()
+    return pool.get
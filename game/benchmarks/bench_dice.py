@@ -0,0 +1,64 @@
+"""
+Microbenchmark for `EvAdventureRollEngine.roll`.
+
+Compares the compiled, cached roll plans against the old split-and-loop
+implementation. Doesn't need a database, run it with
+
+    python -m game.benchmarks.bench_dice
+
+"""
+
+from random import randint
+from timeit import repeat
+
+from ..rules import EvAdventureRollEngine
+
+ROLL_STRINGS = ("1d20", "2d6", "1d8", "4d6", "10d6")
+
+
+def legacy_roll(roll_string):
+    """The roll implementation before roll plans were compiled and cached."""
+    number, diesize = roll_string.split("d", 1)
+    number = int(number)
+    diesize = int(diesize)
+    rolls = []
+    for _ in range(number):
+        random_result = randint(1, diesize)
+        rolls.append(random_result)
+    return sum(rolls)
+
+
+def rolls_per_second(func, roll_string, number=20000, repeats=5):
+    """Best-of-N rolls per second for `func(roll_string)`."""
+    best = min(repeat(lambda: func(roll_string), number=number, repeat=repeats))
+    return number / best
+
+
+def main():
+    engine = EvAdventureRollEngine()
+    print(f"{'roll':>8} {'legacy/s':>12} {'compiled/s':>12} {'speedup':>8}")
+    for roll_string in ROLL_STRINGS:
+        legacy = rolls_per_second(legacy_roll, roll_string)
+        compiled = rolls_per_second(engine.roll, roll_string)
+        print(
+            f"{roll_string:>8} {legacy:>12,.0f} {compiled:>12,.0f} "
+            f"{compiled / legacy:>7.2f}x"
+        )
+
+    # a 200-combatant round, one roll each
+    print(f"\n{'batch':>8} {'loop/s':>12} {'roll_many/s':>12} {'speedup':>8}")
+    for roll_string in ("1d20", "2d6"):
+        loop = rolls_per_second(
+            lambda rs: [engine.roll(rs) for _ in range(200)], roll_string, number=200
+        )
+        batch = rolls_per_second(
+            lambda rs: engine.roll_many(rs, 200), roll_string, number=200
+        )
+        print(
+            f"{roll_string:>8} {loop * 200:>12,.0f} {batch * 200:>12,.0f} "
+            f"{batch / loop:>7.2f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+"""
+Benchmarks for the equipment handler and item display. These need the database.
+
+"""
+
+from itertools import cycle
+
+from .harness import benchmark
+
+# how many items a hoarder carries around in the backpack
+HOARD_SIZE = 50
+
+
+def _hoarder():
+    """A strong character with a full backpack."""
+    from evennia.utils import create
+
+    from ..characters import EvAdventureCharacter
+    from ..objects import EvAdventureObject
+
+    character = create.create_object(EvAdventureCharacter, key="hoarder")
+    character.endurance = HOARD_SIZE * 2
+    for num in range(HOARD_SIZE):
+        character.equipment.add(
+            create.create_object(EvAdventureObject, key=f"junk{num}")
+        )
+    return character
+
+
+@benchmark("equipment.count_slots", number=2000, needs_db=True)
+def count_slots():
+    return _hoarder().equipment.count_slots
+
+
+@benchmark("equipment.all", number=5000, needs_db=True)
+def equipment_all():
+    return _hoarder().equipment.all
+
+
+@benchmark("equipment.add+drop", number=500, needs_db=True)
+def add_drop():
+    from evennia.utils import create
+
+    from ..objects import EvAdventureObject
+
+    equipment = _hoarder().equipment
+    item = create.create_object(EvAdventureObject, key="pebble")
+
+    def _add_drop():
+        equipment.add(item)
+        equipment.drop(item)
+
+    return _add_drop
+
+
+@benchmark("equipment.move", number=500, needs_db=True)
+def move():
+    from evennia.utils import create
+
+    from ..objects import EvAdventureWeapon
+
+    equipment = _hoarder().equipment
+    weapons = [
+        create.create_object(EvAdventureWeapon, key=key) for key in ("sword", "axe")
+    ]
+    for weapon in weapons:
+        equipment.add(weapon)
+    # swap between the two weapons, each move puts the other back in the backpack
+    weapons = cycle(weapons)
+    return lambda: equipment.move(next(weapons))
+
+
+@benchmark("equipment.inventory", number=500, needs_db=True)
+def inventory():
+    equipment = _hoarder().equipment
+
+    def _inventory():
+        # a listing right after a change, so the backpack is fetched again
+        equipment.refresh_listing()
+        return equipment.inventory()
+
+    return _inventory
+
+
+@benchmark("equipment.wieldable", number=5000, needs_db=True)
+def wieldable():
+    return _hoarder().equipment.get_wieldable_objects_from_backpack
+
+
+@benchmark("equipment.armor+weapon", number=5000, needs_db=True)
+def armor_weapon():
+    equipment = _hoarder().equipment
+    # what combat reads every round, here with empty hands
+    return lambda: (equipment.armor, equipment.weapon)
+
+
+@benchmark("utils.get_obj_stats", number=2000, needs_db=True)
+def get_obj_stats():
+    from functools import partial
+
+    from evennia.utils import create
+
+    from ..objects import EvAdventureWeapon
+    from ..utils import get_obj_stats
+
+    character = _hoarder()
+    weapon = create.create_object(
+        EvAdventureWeapon, key="sword", attributes=(("desc", "A sharp sword."),)
+    )
+    character.equipment.add(weapon)
+    character.equipment.move(weapon)
+    return partial(get_obj_stats, weapon, owner=character)
+
+
+@benchmark("utils.get_obj_stats(ansi)", number=2000, needs_db=True)
+def get_obj_stats_ansi():
+    from functools import partial
+
+    from evennia.utils import create
+
+    from ..objects import EvAdventureWeapon
+    from ..utils import get_obj_stats
+
+    weapon = create.create_object(
+        EvAdventureWeapon, key="sword", attributes=(("desc", "A sharp sword."),)
+    )
+    return partial(get_obj_stats, weapon, ansi=True)
+
+
+@benchmark("equipment.load", number=500, needs_db=True)
+def load():
+    from ..equipment import EquipmentHandler
+
+    character = _hoarder()
+    # a new handler reads and unpacks the stored inventory
+    return lambda: EquipmentHandler(character).slots
+
+
+@benchmark("equipment.save", number=500, needs_db=True)
+def save():
+    equipment = _hoarder().equipment
+
+    def _save():
+        equipment._dirty = True
+        equipment.flush()
+
+    return _save
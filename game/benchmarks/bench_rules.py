@@ -0,0 +1,49 @@
+"""
+Benchmarks for the roll engine. These don't need the database.
+
+"""
+
+from functools import partial
+
+from ..dice import RollStream
+from ..enums import Ability
+from ..rules import EvAdventureRollEngine, death_table
+from ..tables import chargen_tables
+from .harness import benchmark
+
+
+class _Character:
+    """Just enough of a character for a saving throw."""
+
+    strength = 3
+
+
+def _engine():
+    # a seeded stream, so every run rolls the same
+    return EvAdventureRollEngine(rng=RollStream(0))
+
+
+for _roll_string in ("1d20", "2d6", "4d6kh3"):
+    benchmark(f"rules.roll[{_roll_string}]", number=20000)(
+        lambda roll_string=_roll_string: partial(_engine().roll, roll_string)
+    )
+
+
+@benchmark("rules.roll_many[1d20x200]", number=2000)
+def roll_many():
+    return partial(_engine().roll_many, "1d20", 200)
+
+
+@benchmark("rules.roll_random_table[death]", number=20000)
+def roll_random_table_death():
+    return partial(_engine().roll_random_table, "1d8", death_table)
+
+
+@benchmark("rules.roll_random_table[physique]", number=20000)
+def roll_random_table_list():
+    return partial(_engine().roll_random_table, "1d20", chargen_tables["physique"])
+
+
+@benchmark("rules.saving_throw", number=20000)
+def saving_throw():
+    return partial(_engine().saving_throw, _Character(), Ability.STR, 15)
@@ -0,0 +1,65 @@
+"""
+Starting up Evennia outside of the server, for benchmarks needing the database.
+
+"""
+
+import os
+
+_DJANGO_DONE = False
+_SETUP_DONE = False
+
+
+def init_django():
+    """
+    Load the game settings and set up Django, without touching any database.
+    Enough to import typeclasses, like in worker processes. Only does anything
+    the first time it's called.
+
+    """
+    global _DJANGO_DONE
+    if _DJANGO_DONE:
+        return
+
+    import evennia.server.evennia_launcher as launcher
+
+    gamedir = os.path.dirname(
+        os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    )
+    os.chdir(gamedir)
+    launcher.GAMEDIR = gamedir
+    launcher.init_game_directory(gamedir, check_db=False)
+
+    _DJANGO_DONE = True
+
+
+def setup_evennia():
+    """
+    Initialize Evennia with the game settings and an empty, in-memory test
+    database. Only does anything the first time it's called.
+
+    """
+    global _SETUP_DONE
+    if _SETUP_DONE:
+        return
+
+    init_django()
+
+    from django.conf import settings
+    from django.db import connection
+    from django.test.utils import setup_test_environment
+
+    setup_test_environment()
+    connection.creation.create_test_db(verbosity=0, autoclobber=True)
+
+    import evennia
+
+    evennia._init()
+
+    # an empty database has no Limbo, so make a home for new objects
+    from evennia.utils import create
+
+    limbo = create.create_object("typeclasses.rooms.Room", key="Limbo", nohome=True)
+    settings.DEFAULT_HOME = limbo.dbref
+    settings.START_LOCATION = limbo.dbref
+
+    _SETUP_DONE = True
@@ -0,0 +1,214 @@
+"""
+Measuring, reporting and comparing benchmarks.
+
+A benchmark is a setup function registered with the `benchmark` decorator. It
+returns the callable to be timed, so that creating objects and similar
+preparations are not part of the measurement.
+
+"""
+
+import json
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+from fnmatch import fnmatch
+
+_REGISTRY = {}
+
+
+class Benchmark:
+    """A registered benchmark."""
+
+    __slots__ = ("name", "setup", "number", "needs_db")
+
+    def __init__(self, name, setup, number, needs_db):
+        self.name = name
+        self.setup = setup
+        self.number = number
+        self.needs_db = needs_db
+
+
+def benchmark(name, number=2000, needs_db=False):
+    """
+    Register a benchmark.
+
+    Args:
+        name (str): A unique name, like "rules.roll[1d20]".
+        number (int): How many calls to time.
+        needs_db (bool): If Evennia and a database must be set up first.
+
+    """
+
+    def _decorator(setup):
+        _REGISTRY[name] = Benchmark(name, setup, number, needs_db)
+        return setup
+
+    return _decorator
+
+
+def get_benchmarks(pattern=None):
+    """
+    Get registered benchmarks, optionally filtered.
+
+    Args:
+        pattern (str, optional): Only get benchmarks with this substring or
+            glob pattern in their name.
+    Returns:
+        list: The matching `Benchmark`s, sorted by name.
+
+    """
+    return [
+        bench
+        for name, bench in sorted(_REGISTRY.items())
+        if not pattern or pattern in name or fnmatch(name, pattern)
+    ]
+
+
+def _percentile(sorted_values, fraction):
+    return sorted_values[
+        min(len(sorted_values) - 1, int(fraction * len(sorted_values)))
+    ]
+
+
+def measure(func, number, warmup=None):
+    """
+    Time a callable.
+
+    Args:
+        func (callable): What to call, with no arguments.
+        number (int): How many calls to time.
+        warmup (int, optional): Calls to make before timing, to fill caches.
+            Defaults to a tenth of `number`.
+    Returns:
+        dict: `ops_per_sec`, `p50_us` and `p99_us` latency, and `alloc_bytes`,
+            the memory allocated (at peak) per call as seen by tracemalloc.
+
+    """
+    perf_counter_ns = time.perf_counter_ns
+    for _ in range(number // 10 if warmup is None else warmup):
+        func()
+
+    timings = []
+    for _ in range(number):
+        start = perf_counter_ns()
+        func()
+        timings.append(perf_counter_ns() - start)
+
+    # tracemalloc slows everything down, so it gets its own, shorter, pass
+    alloc_calls = max(1, min(number, 200))
+    allocated = 0
+    tracemalloc.start()
+    try:
+        for _ in range(alloc_calls):
+            before = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+            func()
+            allocated += tracemalloc.get_traced_memory()[1] - before
+    finally:
+        tracemalloc.stop()
+
+    timings.sort()
+    return {
+        "number": number,
+        "ops_per_sec": number / (sum(timings) / 1e9) if sum(timings) else None,
+        "p50_us": _percentile(timings, 0.50) / 1000,
+        "p99_us": _percentile(timings, 0.99) / 1000,
+        "alloc_bytes": allocated / alloc_calls,
+    }
+
+
+def run(benchmarks, number=None, report=print):
+    """
+    Run benchmarks.
+
+    Args:
+        benchmarks (list): The `Benchmark`s to run.
+        number (int, optional): Override the number of calls to time.
+        report (callable, optional): Called with a line of text for each result.
+    Returns:
+        dict: The results, ready to be saved as JSON.
+
+    """
+    if any(bench.needs_db for bench in benchmarks):
+        from .environment import setup_evennia
+
+        setup_evennia()
+
+    results = {}
+    report(
+        f"{'benchmark':<40} {'ops/sec':>12} {'p50 us':>9} {'p99 us':>9} {'alloc B':>9}"
+    )
+    for bench in benchmarks:
+        result = measure(bench.setup(), number or bench.number)
+        results[bench.name] = result
+        report(
+            f"{bench.name:<40} {result['ops_per_sec']:>12,.0f} {result['p50_us']:>9.2f} "
+            f"{result['p99_us']:>9.2f} {result['alloc_bytes']:>9,.0f}"
+        )
+    return {"meta": _meta(), "results": results}
+
+
+def _meta():
+    """Info about where the benchmarks were run."""
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "commit": commit,
+        "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+    }
+
+
+def save(results, filename):
+    """Save results from `run` as JSON."""
+    with open(filename, "w") as output_file:
+        json.dump(results, output_file, indent=2)
+
+
+def load(filename):
+    """Load results saved with `save`."""
+    with open(filename) as input_file:
+        return json.load(input_file)
+
+
+def compare(baseline, current, threshold=0.10, report=print):
+    """
+    Compare two sets of results.
+
+    Args:
+        baseline (dict): Earlier results, as returned by `run` or `load`.
+        current (dict): The new results.
+        threshold (float): How much slower (as a fraction of ops/sec) a benchmark
+            may get before it counts as a regression.
+        report (callable, optional): Called with a line of text for each benchmark.
+    Returns:
+        list: The names of the benchmarks that regressed.
+
+    """
+    regressions = []
+    report(f"\n{'benchmark':<40} {'before':>12} {'after':>12} {'change':>8}")
+    for name, result in current["results"].items():
+        before = baseline["results"].get(name)
+        if not before or not before["ops_per_sec"]:
+            report(f"{name:<40} {'-':>12} {result['ops_per_sec']:>12,.0f}")
+            continue
+        change = result["ops_per_sec"] / before["ops_per_sec"] - 1
+        flag = ""
+        if change < -threshold:
+            regressions.append(name)
+            flag = "  REGRESSION"
+        report(
+            f"{name:<40} {before['ops_per_sec']:>12,.0f} {result['ops_per_sec']:>12,.0f} "
+            f"{change:>+8.1%}{flag}"
+        )
+    return regressions
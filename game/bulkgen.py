@@ -0,0 +1,188 @@
+"""
+Creating characters in bulk, without going through the chargen menu. Meant for
+making load-test fixtures:
+
+    python -m game.bulkgen --count 20000 --seed 1 --output bulkgen.json
+
+Character sheets are rolled with the same `TemporaryCharacterSheet` (and so the
+same `chargen_tables`) as interactive chargen, spread over a pool of worker
+processes. The sheets are then turned into characters with their starting gear in
+this process, many characters per database transaction.
+
+By default the characters go into the game database. With `--scratch` they are
+created in a throwaway in-memory database instead, to measure throughput without
+touching the game.
+
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from .benchmarks.environment import init_django, setup_evennia
+from .dice import RollStream, derive_seed
+
+# sheets per unit of work handed to a worker. Fixed, so that a seeded run gives
+# the same sheets regardless of the number of workers
+CHUNK_SIZE = 250
+# characters created per database transaction
+BATCH_SIZE = 200
+
+
+def _roll_chunk(count, seed):
+    """Roll a chunk of sheets in a worker, as records."""
+    from .chargen import TemporaryCharacterSheet
+    from .rules import EvAdventureRollEngine
+
+    engine = EvAdventureRollEngine(rng=RollStream(seed))
+    return [TemporaryCharacterSheet(dice=engine).to_record() for _ in range(count)]
+
+
+def roll_sheets(count, workers=None, seed=None):
+    """
+    Roll many character sheets, spread over worker processes.
+
+    Args:
+        count (int): How many sheets to roll.
+        workers (int, optional): Number of worker processes. Defaults to the
+            number of CPUs. With 1, everything runs in this process.
+        seed (int, optional): A seed to make the sheets reproducible.
+    Returns:
+        list: The sheets, as records from `TemporaryCharacterSheet.to_record`.
+
+    """
+    chunks = []
+    for index, start in enumerate(range(0, count, CHUNK_SIZE)):
+        chunk_seed = None if seed is None else derive_seed(seed, index)
+        chunks.append((min(CHUNK_SIZE, count - start), chunk_seed))
+
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or len(chunks) <= 1:
+        results = [_roll_chunk(*chunk) for chunk in chunks]
+    else:
+        # the workers only need Django set up to import chargen, not a database
+        with ProcessPoolExecutor(max_workers=workers, initializer=init_django) as pool:
+            results = list(pool.map(_roll_chunk, *zip(*chunks)))
+    return [record for chunk in results for record in chunk]
+
+
+def create_characters(records, batch_size=BATCH_SIZE):
+    """
+    Create characters and their starting gear from rolled sheets, a batch of
+    characters per transaction.
+
+    Args:
+        records (list): Sheets as records, like from `roll_sheets`.
+        batch_size (int): Characters to create per transaction.
+    Returns:
+        int: The number of characters created.
+
+    """
+    from django.db import transaction
+    from evennia.utils.idmapper.models import flush_cache
+
+    from .chargen import TemporaryCharacterSheet
+    from .hotstats import HOT_STATS
+
+    for start in range(0, len(records), batch_size):
+        with transaction.atomic():
+            for record in records[start : start + batch_size]:
+                TemporaryCharacterSheet.from_record(record).apply()
+            # there's no server running to write the hot stats later
+            HOT_STATS.flush()
+        # don't keep tens of thousands of characters and items in memory
+        flush_cache()
+    return len(records)
+
+
+def bulkgen(count, workers=None, seed=None, batch_size=BATCH_SIZE):
+    """
+    Roll and create many characters, timing each step.
+
+    Args:
+        count (int): How many characters to create.
+        workers (int, optional): Number of worker processes rolling sheets.
+        seed (int, optional): A seed to make the characters reproducible.
+        batch_size (int): Characters to create per transaction.
+    Returns:
+        dict: A report with the time taken and the throughput of each step.
+
+    """
+    start_time = time.perf_counter()
+    records = roll_sheets(count, workers=workers, seed=seed)
+    roll_time = time.perf_counter() - start_time
+
+    start_time = time.perf_counter()
+    created = create_characters(records, batch_size=batch_size)
+    create_time = time.perf_counter() - start_time
+
+    total_time = roll_time + create_time
+    return {
+        "count": created,
+        "seed": seed,
+        "batch_size": batch_size,
+        "roll_elapsed": roll_time,
+        "create_elapsed": create_time,
+        "elapsed": total_time,
+        "sheets_per_sec": len(records) / roll_time if roll_time else None,
+        "characters_per_sec": created / create_time if create_time else None,
+        "total_per_sec": created / total_time if total_time else None,
+    }
+
+
+def main(args=None):
+    """Command-line entry point."""
+    parser = argparse.ArgumentParser(
+        prog="python -m game.bulkgen",
+        description="Create many random characters, like for load tests.",
+    )
+    parser.add_argument("--count", type=int, default=1000)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument(
+        "--batch",
+        type=int,
+        default=BATCH_SIZE,
+        help=f"Characters per transaction (default {BATCH_SIZE})",
+    )
+    parser.add_argument(
+        "--scratch",
+        action="store_true",
+        help="Use a throwaway in-memory database instead of the game database",
+    )
+    parser.add_argument("--output", help="Write the JSON report to this file")
+    args = parser.parse_args(args)
+
+    if args.scratch:
+        setup_evennia()
+    else:
+        init_django()
+        import evennia
+
+        evennia._init()
+
+    report = bulkgen(
+        args.count, workers=args.workers, seed=args.seed, batch_size=args.batch
+    )
+
+    if args.output:
+        with open(args.output, "w") as output_file:
+            json.dump(report, output_file, indent=2)
+
+    print(f"{report['count']} characters in {report['elapsed']:.2f}s")
+    print(
+        f"rolling: {report['roll_elapsed']:.2f}s, "
+        f"{report['sheets_per_sec']:,.0f} sheets/sec"
+    )
+    print(
+        f"creating: {report['create_elapsed']:.2f}s, "
+        f"{report['characters_per_sec']:,.0f} characters/sec"
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,207 @@
+"""
+The item catalog, an in-memory index of all items in the game.
+
+Items are tagged with their `ObjType` when created (see
+`EvAdventureObject.at_object_creation`). Rather than searching the database for
+those tags every time, the catalog keeps the dbrefs of all tagged items indexed
+by obj_type, typeclass and location, so questions like "all magic weapons in
+this room" are answered from memory:
+
+    from game.catalog import CATALOG
+
+    CATALOG.find(obj_type=(ObjType.MAGIC, ObjType.WEAPON), location=room)
+
+The index is built from the database when the server starts and is then kept up
+to date by the item creation, move and delete hooks. Changing an item's
+location or obj_type tags in other ways (like setting `obj.location` directly)
+bypasses the hooks; call `CATALOG.refresh(obj)` afterwards.
+
+"""
+
+from collections import defaultdict
+
+from evennia.objects.models import ObjectDB
+from evennia.utils.utils import make_iter
+
+from .enums import ObjType
+
+# the tag category items are indexed by
+OBJ_TYPE_CATEGORY = "obj_type"
+
+
+def _tag_key(obj_type):
+    """An obj_type as its tag key"""
+    return obj_type.value if isinstance(obj_type, ObjType) else obj_type
+
+
+def _typeclass_path(typeclass):
+    """A typeclass (or its path) as a path"""
+    if isinstance(typeclass, str):
+        return typeclass
+    return f"{typeclass.__module__}.{typeclass.__name__}"
+
+
+def _dbid(obj):
+    """An object (or its dbid) as a dbid"""
+    return getattr(obj, "id", obj)
+
+
+class ItemCatalog:
+    """
+    An index of item dbrefs by obj_type tag, typeclass and location.
+
+    """
+
+    def __init__(self):
+        self._clear()
+
+    def _clear(self):
+        # dbid: (obj_type tag keys, typeclass path, location dbid)
+        self._entries = {}
+        self._by_obj_type = defaultdict(set)
+        self._by_typeclass = defaultdict(set)
+        self._by_location = defaultdict(set)
+        # set once the catalog has been built from the database
+        self.ready = False
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, obj):
+        return _dbid(obj) in self._entries
+
+    def _index(self, dbid, obj_types, typeclass_path, location_id):
+        self._entries[dbid] = (obj_types, typeclass_path, location_id)
+        for obj_type in obj_types:
+            self._by_obj_type[obj_type].add(dbid)
+        self._by_typeclass[typeclass_path].add(dbid)
+        self._by_location[location_id].add(dbid)
+
+    def _unindex(self, dbid):
+        entry = self._entries.pop(dbid, None)
+        if entry:
+            obj_types, typeclass_path, location_id = entry
+            for obj_type in obj_types:
+                self._by_obj_type[obj_type].discard(dbid)
+            self._by_typeclass[typeclass_path].discard(dbid)
+            self._by_location[location_id].discard(dbid)
+
+    def rebuild(self):
+        """
+        Build the catalog from scratch, from the database. All items are fetched
+        in one query.
+
+        """
+        self._clear()
+        rows = ObjectDB.objects.filter(
+            db_tags__db_category=OBJ_TYPE_CATEGORY, db_tags__db_tagtype__isnull=True
+        ).values_list("id", "db_typeclass_path", "db_location_id", "db_tags__db_key")
+        items = {}
+        for dbid, typeclass_path, location_id, tag_key in rows:
+            items.setdefault(dbid, (typeclass_path, location_id, []))[2].append(tag_key)
+        for dbid, (typeclass_path, location_id, obj_types) in items.items():
+            self._index(dbid, tuple(obj_types), typeclass_path, location_id)
+        self.ready = True
+
+    def add(self, obj):
+        """
+        Add an item, or update it if it's already in the catalog.
+
+        Args:
+            obj (Object): The item. Objects without obj_type tags are ignored.
+
+        """
+        if not self.ready or not obj.pk:
+            # it will be picked up when the catalog is built
+            return
+        obj_types = tuple(obj.tags.get(category=OBJ_TYPE_CATEGORY, return_list=True))
+        self._unindex(obj.id)
+        if obj_types:
+            self._index(obj.id, obj_types, obj.typeclass_path, obj.db_location_id)
+
+    # everything about an item may have changed
+    refresh = add
+
+    def move(self, obj):
+        """
+        Update the location of an item.
+
+        Args:
+            obj (Object): The item, already at its new location.
+
+        """
+        entry = self._entries.get(obj.id)
+        if entry and entry[2] != obj.db_location_id:
+            obj_types, typeclass_path, _ = entry
+            self._unindex(obj.id)
+            self._index(obj.id, obj_types, typeclass_path, obj.db_location_id)
+
+    def remove(self, obj):
+        """
+        Remove an item from the catalog.
+
+        Args:
+            obj (Object or int): The item, or its dbid.
+
+        """
+        self._unindex(_dbid(obj))
+
+    def dbids(self, obj_type=None, typeclass=None, location=None):
+        """
+        Find the dbids of all items matching all the given criteria.
+
+        Args:
+            obj_type (ObjType, str or tuple, optional): One or more obj_types the
+                items must all have.
+            typeclass (type or str, optional): The exact typeclass (or typeclass
+                path) of the items.
+            location (Object or int, optional): Where the items are.
+        Returns:
+            set: The dbids of all matching items. Without any criteria, all items.
+
+        """
+        if not self.ready:
+            self.rebuild()
+
+        matches = [
+            self._by_obj_type.get(_tag_key(obj_type), set())
+            for obj_type in make_iter(obj_type or ())
+        ]
+        if typeclass is not None:
+            matches.append(self._by_typeclass.get(_typeclass_path(typeclass), set()))
+        if location is not None:
+            matches.append(self._by_location.get(_dbid(location), set()))
+        if not matches:
+            return set(self._entries)
+        # start from the smallest set, so the intersection is cheap
+        matches.sort(key=len)
+        return matches[0].intersection(*matches[1:])
+
+    def find(self, obj_type=None, typeclass=None, location=None):
+        """
+        Find all items matching all the given criteria. See `dbids` for the
+        arguments.
+
+        Returns:
+            list: The matching items, ordered by dbid. Items already in memory need
+                no query; the rest are fetched in one.
+
+        """
+        dbids = self.dbids(obj_type=obj_type, typeclass=typeclass, location=location)
+        objs = {}
+        missing = []
+        for dbid in dbids:
+            obj = ObjectDB.get_cached_instance(dbid)
+            if obj:
+                objs[dbid] = obj
+            else:
+                missing.append(dbid)
+        if missing:
+            objs.update(
+                (obj.id, obj) for obj in ObjectDB.objects.filter(id__in=missing)
+            )
+        return [objs[dbid] for dbid in sorted(objs)]
+
+
+# the catalog of the game
+CATALOG = ItemCatalog()
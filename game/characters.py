@@ -1,54 +1,12 @@
 from evennia import DefaultCharacter, AttributeProperty
+from evennia.typeclasses.attributes import ModelAttributeBackend
 from evennia.utils.utils import lazy_property
 from .equipment import EquipmentHandler
+from .hotstats import HOT_STATS, HotAttributeProperty
+from .ledger import LEDGER
+from .living import LivingMixin
 from .rules import dice
-
-
-class LivingMixin:
-
-    is_pc = False
-
-    def heal(self, hp):
-        """
-        Heal hp amount of health, not allowing to exceed our max hp
-
-        """
-        damage = self.hp_max - self.hp
-        healed = min(damage, hp)
-        self.hp += healed
-
-        self.msg(f"You heal for {healed} HP.")
-
-    def at_pay(self, amount):
-        """When paying coins, make sure to never detract more than we have"""
-        amount = min(amount, self.coins)
-        self.coins -= amount
-        return amount
-
-    def at_damage(self, damage, attacker=None):
-        """Called when attacked and taking damage"""
-        self.hp -= damage
-
-    def at_defeat(self):
-        """Called when defeated. By default, this means death."""
-        self.at_death()
-
-    def at_death(self):
-        """Called when this thing dies."""
-        # this will mean different things for different living things
-        pass
-
-    def at_do_loot(self, looted):
-        """Called when looting another entity"""
-        looted.at_looted(self)
-
-    def at_looted(self, looter):
-        """Called when looted by another entity"""
-
-        # default to stealing some coins
-        max_steal = dice.roll("1d10")
-        stolen = self.at_pay(max_steal)
-        looter.coins += stolen
+from .statblock import PackedStat, StatBlockAttributeHandler, StatBlockProperty
 
 
 class EvAdventureCharacter(LivingMixin, DefaultCharacter):
@@ -56,25 +14,36 @@ class EvAdventureCharacter(LivingMixin, DefaultCharacter):
 
     is_pc = True
 
-    strength = AttributeProperty(1)
-    dexterity = AttributeProperty(1)
-    endurance = AttributeProperty(1)
-    perception = AttributeProperty(1)
-    intelligence = AttributeProperty(1)
-    willpower = AttributeProperty(1)
+    # the abilities, hp and level are all kept in one Attribute, see game.statblock
+    stat_block = StatBlockProperty()
+
+    strength = PackedStat(1)
+    dexterity = PackedStat(1)
+    endurance = PackedStat(1)
+    perception = PackedStat(1)
+    intelligence = PackedStat(1)
+    willpower = PackedStat(1)
 
-    hp = AttributeProperty(8)
-    hp_max = AttributeProperty(8)
+    hp = PackedStat(8)
+    hp_max = PackedStat(8)
 
-    level = AttributeProperty(1)
-    xp = AttributeProperty(0)
-    coins = AttributeProperty(0)
+    level = PackedStat(1)
+
+    # these change all the time, so they're kept in memory and written in batches
+    xp = HotAttributeProperty(0)
+    coins = HotAttributeProperty(0)
 
     charclass = AttributeProperty("Fighter")  # no classes in our game!
     charrace = AttributeProperty(
         "Human"
     )  # definitely needed for our game, default human
 
+    @lazy_property
+    def attributes(self):
+        # keeps the hot stats in memory in sync with direct Attribute writes, and
+        # puts writes of the packed stats into the stat block
+        return StatBlockAttributeHandler(self, ModelAttributeBackend)
+
     def at_defeat(self):
         """Characters roll on death table"""
         if self.location.allow_death:
@@ -85,6 +54,12 @@ class EvAdventureCharacter(LivingMixin, DefaultCharacter):
                 f"$You() $conj(collapse) in a heap, alive but beaten.", from_obj=self
             )
             self.heal(self.hp_max)
+        # the fight is over for us, so get our hp into the database
+        HOT_STATS.flush(self)
+
+    def transfer_coins(self, payee, amount):
+        """Give coins to someone through the coin ledger, see `game.ledger`."""
+        return LEDGER.transfer(self, payee, amount)
 
     def at_death(self):
         """We rolled 'dead' on the death table."""
@@ -97,6 +72,41 @@ class EvAdventureCharacter(LivingMixin, DefaultCharacter):
     def equipment(self):
         return EquipmentHandler(self)
 
+    def _flush_equipment(self):
+        """Write any delayed equipment changes, if the handler was ever loaded."""
+        equipment = self.__dict__.get("equipment")
+        if equipment:
+            equipment.flush()
+
+    def at_post_unpuppet(self, account=None, session=None, **kwargs):
+        """Called when the player stops playing us, like on logout."""
+        super().at_post_unpuppet(account=account, session=session, **kwargs)
+        # coins we traded are written together with the other side's, see
+        # game.ledger
+        HOT_STATS.flush(self)
+
+    def at_idmapper_flush(self):
+        """Called before we're dropped from the cache; write what's only in memory."""
+        HOT_STATS.flush(self)
+        return super().at_idmapper_flush()
+
+    def at_object_delete(self):
+        """Called before we're deleted, so there's no use writing our hot stats."""
+        if not super().at_object_delete():
+            return False
+        HOT_STATS.forget(self)
+        return True
+
+    def at_server_reload(self):
+        """Called on all cached objects before the server reloads."""
+        super().at_server_reload()
+        self._flush_equipment()
+
+    def at_server_shutdown(self):
+        """Called on all cached objects before the server shuts down."""
+        super().at_server_shutdown()
+        self._flush_equipment()
+
     def at_pre_object_receive(self, moved_object, source_location, **kwargs):
         """Called by Evennia before object arrives 'in' this character (that is,
         if they pick up something). If it returns False, move is aborted.
@@ -1,8 +1,14 @@
+from collections import deque
+from time import perf_counter
 from .tables import chargen_tables
 from .rules import dice
+from .dice import compile_table
 from .characters import EvAdventureCharacter
+from django.db import transaction
 from evennia import create_object, EvMenu
+from evennia.prototypes.prototypes import search_prototype
 from evennia.prototypes.spawner import spawn
+from evennia.utils.utils import delay
 
 _TEMP_SHEET = """
 {name}
@@ -24,29 +30,160 @@ _ABILITIES = {
     "STR": "strength",
     "DEX": "dexterity",
     "END": "endurance",
-    "INT": "intellgence",
+    "INT": "intelligence",
     "PER": "perception",
     "WIL": "willpower",
 }
 
+# typeclasses for starting gear that has no prototype of its own
+_ITEM_TYPECLASSES = {
+    "weapon": "game.objects.EvAdventureWeapon",
+    "shield": "game.objects.EvAdventureShield",
+    "armor": "game.objects.EvAdventureArmor",
+    "helmet": "game.objects.EvAdventureHelmet",
+    "backpack": "game.objects.EvAdventureObject",
+}
+
+# how many pre-rolled sheets to keep ready. 0 turns the pool off
+SHEET_POOL_DEPTH = 20
+# refill the pool when it's down to this many sheets
+SHEET_POOL_LOW_WATER = 5
+# how many sheets to roll at a time when refilling, before letting other work run
+SHEET_POOL_REFILL_BATCH = 5
+
+# in-progress chargen is kept in this Attribute on the account, so it survives
+# reloads and disconnects
+CHARGEN_ATTRIBUTE = "chargen_sheet"
+CHARGEN_CATEGORY = "chargen"
+
+# the starting gear that is worn or wielded, rather than kept in the backpack
+_WORN_KINDS = ("weapon", "shield", "armor", "helmet")
+
+# seconds to remember the prototype (or lack of one) of a piece of starting gear.
+# Prototypes added by builders are picked up after this long
+KIT_PROTOTYPE_TIMEOUT = 60
+
+# {name: (when it was looked up, prototype or None)}
+_KIT_PROTOTYPES = {}
+
+# compile up front, so a broken table is caught on import
+for _table in chargen_tables.values():
+    compile_table(_table)
+
+
+def _kit_prototype(name):
+    """Get the prototype of a piece of starting gear, or None if it has none"""
+    name = name.lower()
+    now = perf_counter()
+    cached = _KIT_PROTOTYPES.get(name)
+    if cached and now - cached[0] < KIT_PROTOTYPE_TIMEOUT:
+        return cached[1]
+    # the search also gives partial matches, so pick out the exact one
+    prototype = next(
+        (
+            prototype
+            for prototype in search_prototype(key=name)
+            if prototype.get("prototype_key", "").lower() == name
+        ),
+        None,
+    )
+    _KIT_PROTOTYPES[name] = (now, prototype)
+    return prototype
+
+
+def clear_kit_prototypes():
+    """Forget the remembered starting gear prototypes, like after adding some."""
+    _KIT_PROTOTYPES.clear()
+
+
+def spawn_kit(items, location=None):
+    """
+    Spawn a whole set of starting gear in one go. Only the prototypes of the items
+    are looked up, and they're remembered for `KIT_PROTOTYPE_TIMEOUT` seconds. All
+    objects are spawned with a single call. Items without a prototype of their own
+    are created as plain objects of the right kind.
+
+    Args:
+        items (list): A list of `(name, kind)`, where `kind` is one of "weapon",
+            "shield", "armor", "helmet" or "backpack".
+        location (Object, optional): Where to put the new objects, usually the
+            character they're for.
+    Returns:
+        list: The new objects, in the same order as `items`.
+
+    """
+    if not items:
+        return []
+    prototypes = []
+    for name, kind in items:
+        prototype = _kit_prototype(name)
+        prototype = (
+            dict(prototype)
+            if prototype
+            else {"key": name, "typeclass": _ITEM_TYPECLASSES[kind]}
+        )
+        if location:
+            prototype["location"] = location
+        prototypes.append(prototype)
+    return spawn(*prototypes)
+
 
 class TemporaryCharacterSheet:
-    def _random_ability(self):
-        return min(dice.roll("1d6")), dice.roll("1d6"), dice.roll("1d6")
+    # the fields of a sheet, in the order they're stored in a record
+    _RECORD_FIELDS = (
+        "name",
+        "strength",
+        "dexterity",
+        "endurance",
+        "intelligence",
+        "perception",
+        "willpower",
+        "desc",
+        "hp_max",
+        "hp",
+        "xp",
+        "level",
+        "armor",
+        "helmet",
+        "shield",
+        "weapon",
+        "backpack",
+        "ability_changes",
+    )
+    record_version = 1
+
+    # hundreds of sheets can be in use at once, so keep them small
+    __slots__ = _RECORD_FIELDS + ("_sheet_text",)
 
-    def __init__(self):
+    def __setattr__(self, name, value):
+        object.__setattr__(self, name, value)
+        if name != "_sheet_text":
+            # something changed, so the sheet must be rendered again
+            object.__setattr__(self, "_sheet_text", None)
+
+    def _random_ability(self, dice=dice):
+        # lowest of three d6
+        return min(dice.roll("1d6"), dice.roll("1d6"), dice.roll("1d6"))
+
+    def __init__(self, dice=dice):
+        """
+        Args:
+            dice (EvAdventureRollEngine, optional): The roll engine to roll the
+                sheet with, like one with a seeded stream. Defaults to the global one.
+
+        """
         self.ability_changes = 0  # how many times we swapped abilities
 
         # name will likely be modified later
-        self.name = dice.roll_random_table("1d282", dice.roll("1d6"))
+        self.name = dice.roll_random_table("1d282", chargen_tables["name"])
 
         # base attributes
-        self.strength = self._random_ability()
-        self.dexterity = self._random_ability()
-        self.endurance = self._random_ability()
-        self.intelligence = self._random_ability()
-        self.perception = self._random_ability()
-        self.willpower = self._random_ability()
+        self.strength = self._random_ability(dice)
+        self.dexterity = self._random_ability(dice)
+        self.endurance = self._random_ability(dice)
+        self.intelligence = self._random_ability(dice)
+        self.perception = self._random_ability(dice)
+        self.willpower = self._random_ability(dice)
 
         # physical attributes (for rp purposes)
         physique = dice.roll_random_table("1d20", chargen_tables["physique"])
@@ -75,29 +212,75 @@ class TemporaryCharacterSheet:
 
         # random equipment
         self.armor = dice.roll_random_table("1d20", chargen_tables["armor"])
+        if self.armor == "no armor":
+            self.armor = None
 
         _helmet_and_shield = dice.roll_random_table(
             "1d20", chargen_tables["helmets and shields"]
         )
-        self.helmet = "helmet" if "helmet" in _helmet_and_shield else "none"
-        self.shield = "shield" if "shield" in _helmet_and_shield else "none"
+        self.helmet = (
+            "helmet" if _helmet_and_shield in ("helmet", "helmet and shield") else None
+        )
+        self.shield = (
+            "shield" if _helmet_and_shield in ("shield", "helmet and shield") else None
+        )
 
         self.weapon = dice.roll_random_table("1d20", chargen_tables["starting weapon"])
 
-        self.backpack = [
+        # a tuple, so it can only be changed by replacing it
+        self.backpack = (
             "ration",
             "ration",
             dice.roll_random_table("1d20", chargen_tables["dungeoning gear"]),
             dice.roll_random_table("1d20", chargen_tables["dungeoning gear"]),
             dice.roll_random_table("1d20", chargen_tables["general gear 1"]),
             dice.roll_random_table("1d20", chargen_tables["general gear 2"]),
-        ]
+        )
+
+    def to_record(self):
+        """
+        Get the sheet as a compact record, for storing.
+
+        Returns:
+            tuple: `(record_version, name, strength, ...)`, see `_RECORD_FIELDS`.
+
+        """
+        return (self.record_version,) + tuple(
+            getattr(self, field) for field in self._RECORD_FIELDS
+        )
+
+    @classmethod
+    def from_record(cls, record):
+        """
+        Recreate a sheet from a record made by `to_record`, without rolling anything.
+
+        Args:
+            record (tuple): The stored record.
+        Returns:
+            TemporaryCharacterSheet: The sheet.
+        Raises:
+            ValueError: If the record is of an unknown version.
+
+        """
+        version, *values = record
+        if version != cls.record_version or len(values) != len(cls._RECORD_FIELDS):
+            raise ValueError(f"Unknown character sheet record version {version}.")
+        sheet = cls.__new__(cls)
+        for field, value in zip(cls._RECORD_FIELDS, values):
+            setattr(sheet, field, value)
+        sheet.backpack = tuple(sheet.backpack)
+        return sheet
 
     def show_sheet(self):
+        if self._sheet_text is None:
+            self._sheet_text = self._render_sheet()
+        return self._sheet_text
+
+    def _render_sheet(self):
         equipment = (
             str(item)
-            for item in [self.armor, self.helmet, self.shield, self.weapon]
-            + self.backpack
+            for item in (self.armor, self.helmet, self.shield, self.weapon)
+            + tuple(self.backpack)
             if item
         )
 
@@ -113,16 +296,46 @@ class TemporaryCharacterSheet:
             equipment=", ".join(equipment),
         )
 
-    def apply(self):
-        # create character object with given abilities
+    def apply(self, account=None):
+        """
+        Create the character and its starting gear. Everything is created in a
+        single transaction, and the equipment is saved only once.
+
+        Args:
+            account (Account, optional): The account to allow puppeting the character.
+        Returns:
+            EvAdventureCharacter: The new character.
+
+        """
+        kit = [(getattr(self, kind), kind) for kind in _WORN_KINDS if getattr(self, kind)]
+        kit.extend((name, "backpack") for name in self.backpack)
+
+        with transaction.atomic():
+            new_character = self._create_character(account)
+            # spawning in the character doesn't call its hooks, so the items are
+            # added to the equipment below
+            items = spawn_kit(kit, location=new_character)
+
+            # put on the equipment, saving it only once at the end
+            equipment = new_character.equipment
+            with equipment.batch():
+                for item, (_, kind) in zip(items, kit):
+                    equipment.add(item)
+                    if kind != "backpack":
+                        equipment.move(item)
+
+        return new_character
+
+    def _create_character(self, account=None):
+        """Create the character object, with the abilities of the sheet"""
         new_character = create_object(
             EvAdventureCharacter,
             key=self.name,
-            attrs=(
+            attributes=(
                 ("strength", self.strength),
                 ("dexterity", self.dexterity),
                 ("endurance", self.endurance),
-                ("intellgence", self.intelligence),
+                ("intelligence", self.intelligence),
                 ("perception", self.perception),
                 ("willpower", self.willpower),
                 ("hp", self.hp),
@@ -130,34 +343,197 @@ class TemporaryCharacterSheet:
                 ("desc", self.desc),
             ),
         )
-        # spawn equipment (requires prototypes)
-        if self.weapon:
-            weapon = spawn(self.weapon)
-            new_character.equipment.move(weapon)
-        if self.shield:
-            shield = spawn(self.shield)
-            new_character.equipment.move(shield)
-        if self.armor:
-            armor = spawn(self.armor)
-            new_character.equipment.move(armor)
-        if self.helmet:
-            helmet = spawn(self.helmet)
-            new_character.equipment.move(helmet)
-
-        for item in self.backpack:
-            item = spawn(item)
-            new_character.equipment.store(item)
-
+        if account:
+            new_character.locks.add(
+                f"puppet:id({new_character.id}) or pid({account.id}) "
+                "or perm(Developer) or pperm(Developer)"
+            )
         return new_character
 
 
+class SheetPool:
+    """
+    A pool of pre-rolled character sheets, so starting chargen doesn't have to
+    wait for all the rolling. When the pool runs low, it's refilled in the
+    background, a few sheets at a time so other work gets to run in between.
+
+    """
+
+    def __init__(
+        self,
+        depth=SHEET_POOL_DEPTH,
+        low_water=SHEET_POOL_LOW_WATER,
+        refill_batch=SHEET_POOL_REFILL_BATCH,
+    ):
+        """
+        Args:
+            depth (int, optional): The number of sheets to keep ready. With 0, no
+                sheets are kept and every sheet is rolled when asked for.
+            low_water (int, optional): Refill when down to this many sheets.
+            refill_batch (int, optional): Sheets to roll per step of a refill.
+
+        """
+        self.depth = depth
+        self.low_water = low_water
+        self.refill_batch = refill_batch
+        self._sheets = deque()
+        self._refill_task = None
+        # when the running refill was asked for
+        self._refill_requested = None
+
+        # metrics
+        self.hits = 0
+        self.misses = 0
+        self.refills = 0
+        self.last_refill_latency = None
+        self.max_refill_latency = 0.0
+        self.total_refill_latency = 0.0
+
+    def __len__(self):
+        return len(self._sheets)
+
+    def get(self):
+        """
+        Get a fresh character sheet, from the pool if there's one ready.
+
+        Returns:
+            TemporaryCharacterSheet: A sheet no one else will get.
+
+        """
+        if self._sheets:
+            sheet = self._sheets.popleft()
+            self.hits += 1
+        else:
+            sheet = TemporaryCharacterSheet()
+            self.misses += 1
+        if len(self._sheets) <= self.low_water:
+            self.request_refill()
+        return sheet
+
+    def request_refill(self):
+        """Start filling the pool in the background, unless it's already going."""
+        if self.depth and not self._refill_task and len(self._sheets) < self.depth:
+            self._refill_requested = perf_counter()
+            self._refill_task = delay(0, self._refill_step)
+
+    def _refill_step(self):
+        """Roll a batch of sheets, then come back later for the next batch."""
+        self._refill_task = None
+        for _ in range(min(self.refill_batch, self.depth - len(self._sheets))):
+            self._sheets.append(TemporaryCharacterSheet())
+        if len(self._sheets) < self.depth:
+            self._refill_task = delay(0, self._refill_step)
+            return
+
+        # full again
+        latency = perf_counter() - self._refill_requested
+        self._refill_requested = None
+        self.refills += 1
+        self.last_refill_latency = latency
+        self.max_refill_latency = max(self.max_refill_latency, latency)
+        self.total_refill_latency += latency
+
+    def fill(self):
+        """Fill the pool right away, without waiting for the background."""
+        if self._refill_task and self._refill_task.active():
+            self._refill_task.cancel()
+        self._refill_task = None
+        self._refill_requested = None
+        while len(self._sheets) < self.depth:
+            self._sheets.append(TemporaryCharacterSheet())
+
+    @property
+    def hit_rate(self):
+        """The share of sheets that came ready from the pool."""
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def metrics(self):
+        """
+        Get the pool's statistics.
+
+        Returns:
+            dict: The pool size, hits and misses, hit rate and refill latencies (in
+                seconds, from running low until full again).
+
+        """
+        return {
+            "size": len(self._sheets),
+            "depth": self.depth,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hit_rate,
+            "refills": self.refills,
+            "last_refill_latency": self.last_refill_latency,
+            "max_refill_latency": self.max_refill_latency,
+            "mean_refill_latency": (
+                self.total_refill_latency / self.refills if self.refills else None
+            ),
+        }
+
+
+# the pool used by chargen
+SHEET_POOL = SheetPool()
+
+
+def _chargen_owner(caller):
+    """The account to keep chargen progress on"""
+    return getattr(caller, "account", None) or caller
+
+
+def save_chargen(caller, sheet):
+    """
+    Store the chargen progress of `caller`, so it can be resumed later.
+
+    Args:
+        caller (Account or Object): The one doing chargen.
+        sheet (TemporaryCharacterSheet): The sheet being worked on.
+
+    """
+    _chargen_owner(caller).attributes.add(
+        CHARGEN_ATTRIBUTE, sheet.to_record(), category=CHARGEN_CATEGORY
+    )
+
+
+def load_chargen(caller):
+    """
+    Get the stored chargen progress of `caller`, if any.
+
+    Args:
+        caller (Account or Object): The one doing chargen.
+    Returns:
+        TemporaryCharacterSheet or None: The sheet they were working on.
+
+    """
+    record = _chargen_owner(caller).attributes.get(
+        CHARGEN_ATTRIBUTE, category=CHARGEN_CATEGORY
+    )
+    if record:
+        try:
+            return TemporaryCharacterSheet.from_record(record)
+        except ValueError:
+            # from an older version of chargen; start over
+            clear_chargen(caller)
+    return None
+
+
+def clear_chargen(caller):
+    """Forget the stored chargen progress of `caller`"""
+    _chargen_owner(caller).attributes.remove(
+        CHARGEN_ATTRIBUTE, category=CHARGEN_CATEGORY
+    )
+
+
 def node_chargen(caller, raw_string, **kwargs):
 
     tmp_character = kwargs["tmp_character"]
 
     text = tmp_character.show_sheet()
 
-    options = [{"desc": "Change your name", "goto": ("node_change_name", kwargs)}]
+    options = [
+        {"desc": "Change your name", "goto": ("node_change_name", kwargs)},
+        {"desc": "Reroll everything", "goto": ("_reroll", kwargs)},
+    ]
 
     if tmp_character.ability_changes <= 0:
         options.append(
@@ -176,6 +552,15 @@ def node_chargen(caller, raw_string, **kwargs):
     return text, options
 
 
+def _reroll(caller, raw_string, **kwargs):
+    """
+    Used by node_chargen to throw the sheet away and start over with a new one.
+    """
+    kwargs["tmp_character"] = SHEET_POOL.get()
+    save_chargen(caller, kwargs["tmp_character"])
+    return "node_chargen", kwargs
+
+
 def _update_name(caller, raw_string, **kwargs):
     """
     Used by node_change_name below to check what user entered
@@ -184,6 +569,7 @@ def _update_name(caller, raw_string, **kwargs):
     if raw_string:
         tmp_character = kwargs["tmp_character"]
         tmp_character.name = raw_string.lower().capitalize()
+        save_chargen(caller, tmp_character)
 
     return "node_chargen", kwargs
 
@@ -235,6 +621,7 @@ def _swap_abilities(caller, raw_string, **kwargs):
         setattr(tmp_character, abi2, abival1)
 
         tmp_character.ability_changes = +1
+        save_chargen(caller, tmp_character)
 
     return "node_chargen", kwargs
 
@@ -262,32 +649,47 @@ def node_swap_abilities(caller, raw_string, **kwargs):
     To swap the values of two stats, e.g. STR & INT, write |wSTR INT|n.
     Leave empty to abort."""
 
-    options = {"key": "_default", "goto": ("swap_abilities", kwargs)}
+    options = {"key": "_default", "goto": ("_swap_abilities", kwargs)}
 
     return text, options
 
 
 def start_chargen(caller, session=None):
     """
-    This is a start point for spinning up chargen from a command later
+    This is a start point for spinning up chargen from a command later. If
+    the caller was already in chargen (before a reload or disconnect), they
+    continue where they left off.
     """
 
-    menutree = {"node_chargen": node_chargen}
-
-    # generate all random components of the character
-    tmp_character = TemporaryCharacterSheet()
+    menutree = {
+        "node_chargen": node_chargen,
+        "node_change_name": node_change_name,
+        "node_swap_abilities": node_swap_abilities,
+        "node_apply_character": node_apply_character,
+        "_reroll": _reroll,
+        "_update_name": _update_name,
+        "_swap_abilities": _swap_abilities,
+    }
+
+    tmp_character = load_chargen(caller)
+    if not tmp_character:
+        # get a character with all random components already rolled
+        tmp_character = SHEET_POOL.get()
+        save_chargen(caller, tmp_character)
     EvMenu(caller, menutree, session=session, tmp_character=tmp_character)
 
+
 def node_apply_character(caller, raw_string, **kwargs):
-    """                              
+    """
     End chargen and create the character. We will also puppet it.
-                                     
-    """                              
+
+    """
     tmp_character = kwargs["tmp_character"]
-    new_character = tmp_character.apply(caller)      
-    
-    caller.account.db._playable_characters = [new_character] 
-    
+    new_character = tmp_character.apply(caller)
+    clear_chargen(caller)
+
+    caller.account.db._playable_characters = [new_character]
+
     text = "Character created!"
-    
-    return text, None 
+
+    return text, None
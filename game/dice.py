@@ -0,0 +1,388 @@
+"""
+Dice expressions.
+
+Roll strings like "1d20", "2d6+3", "4d6kh3" or "1d20adv" are compiled once into
+a `RollPlan` and kept in a bounded cache, so repeated rolls of the same string
+skip all parsing. Plans are interned - compiling the same string twice gives back
+the very same plan object.
+
+Supported syntax (case-insensitive, whitespace ignored):
+
+    [X]dY[khN|klN][adv|dis][+M|-M]
+
+- X: number of dice (default 1), Y: sides per die.
+- khN/klN: keep only the N highest/lowest dice.
+- adv/dis: roll the whole thing twice, keep the higher/lower total.
+- +M/-M: a flat modifier added to the total.
+
+Randomness comes from the global `random` module unless a `RollStream` is used.
+Streams are independently seeded random sources (one per character, combat or
+session) that can be snapshotted and restored, so a sequence of rolls can be
+replayed exactly.
+
+Random tables (lists of results or `("1-5", result)` range tuples) are compiled
+the same way with `compile_table`, into a dense lookup indexed directly by the
+die result.
+
+"""
+
+import re
+from functools import lru_cache
+from hashlib import sha256
+from random import Random
+
+# max number of distinct roll strings to keep compiled plans for
+ROLL_CACHE_SIZE = 512
+# max number of distinct random tables to keep compiled lookups for
+TABLE_CACHE_SIZE = 256
+
+_ROLL_REGEX = re.compile(
+    r"^(?P<count>\d*)d(?P<sides>\d+)"
+    r"(?:(?P<keep>kh|kl)(?P<keepnum>\d+))?"
+    r"(?P<adv>adv|dis)?"
+    r"(?P<modifier>[+-]\d+)?$"
+)
+
+
+class RollPlan:
+    """
+    A compiled dice expression. Don't create these directly, use `compile_roll`.
+
+    """
+
+    __slots__ = (
+        "expression",
+        "count",
+        "sides",
+        "keep",
+        "keep_highest",
+        "modifier",
+        "advantage",
+        "disadvantage",
+        "faces",
+        "simple",
+    )
+
+    def __init__(
+        self,
+        expression,
+        count,
+        sides,
+        keep=None,
+        keep_highest=True,
+        modifier=0,
+        advantage=False,
+        disadvantage=False,
+    ):
+        self.expression = expression
+        self.count = count
+        self.sides = sides
+        self.keep = keep
+        self.keep_highest = keep_highest
+        self.modifier = modifier
+        self.advantage = advantage
+        self.disadvantage = disadvantage
+        # the population to draw from, shared by all rolls of this plan
+        self.faces = range(1, sides + 1)
+        # plain XdY(+M) can skip all the keep/advantage logic
+        self.simple = keep is None and not advantage and not disadvantage
+
+    def __repr__(self):
+        return f"<RollPlan {self.expression}>"
+
+    @property
+    def min_result(self):
+        """The lowest possible result of this roll."""
+        return (self.keep or self.count) + self.modifier
+
+    @property
+    def max_result(self):
+        """The highest possible result of this roll."""
+        return (self.keep or self.count) * self.sides + self.modifier
+
+    def total(self, dice):
+        """
+        Sum up one set of dice according to the keep-rules of the plan.
+
+        Args:
+            dice (list): The `count` individual die results.
+        Returns:
+            int: The total, without the modifier.
+
+        """
+        if self.keep is None:
+            return sum(dice)
+        dice = sorted(dice, reverse=self.keep_highest)
+        return sum(dice[: self.keep])
+
+    def roll(self, randint, choices):
+        """
+        Execute the plan. All dice are drawn in one call to the random source.
+
+        Args:
+            randint (callable): A `randint(a, b)` function, used for single dice.
+            choices (callable): A `choices(population, k=N)` function, used for
+                drawing several dice at once.
+        Returns:
+            int: The result of the roll.
+
+        """
+        count = self.count
+        if self.simple:
+            if count == 1:
+                return randint(1, self.sides) + self.modifier
+            return sum(choices(self.faces, k=count)) + self.modifier
+
+        if self.advantage or self.disadvantage:
+            # draw both attempts in one go and split them
+            dice = choices(self.faces, k=count * 2)
+            first, second = self.total(dice[:count]), self.total(dice[count:])
+            result = max(first, second) if self.advantage else min(first, second)
+        else:
+            result = self.total(choices(self.faces, k=count))
+        return result + self.modifier
+
+    def roll_many(self, number, choices):
+        """
+        Execute the plan `number` times. The dice for all rolls are drawn in a
+        single call to the random source.
+
+        Args:
+            number (int): How many rolls to make.
+            choices (callable): A `choices(population, k=N)` function.
+        Returns:
+            list: The `number` results, in order.
+
+        """
+        count = self.count
+        modifier = self.modifier
+        if self.simple:
+            dice = choices(self.faces, k=count * number)
+            if count == 1:
+                return [die + modifier for die in dice]
+            return [
+                sum(dice[start : start + count]) + modifier
+                for start in range(0, count * number, count)
+            ]
+
+        total = self.total
+        if self.advantage or self.disadvantage:
+            dice = choices(self.faces, k=count * number * 2)
+            pick = max if self.advantage else min
+            return [
+                pick(
+                    total(dice[start : start + count]),
+                    total(dice[start + count : start + count * 2]),
+                )
+                + modifier
+                for start in range(0, count * number * 2, count * 2)
+            ]
+        dice = choices(self.faces, k=count * number)
+        return [
+            total(dice[start : start + count]) + modifier
+            for start in range(0, count * number, count)
+        ]
+
+
+@lru_cache(maxsize=ROLL_CACHE_SIZE)
+def compile_roll(roll_string):
+    """
+    Compile a dice expression into a (cached) `RollPlan`.
+
+    Args:
+        roll_string (str): A dice string, like "1d20", "2d6+3" or "4d6kh3".
+    Returns:
+        RollPlan: The compiled plan. The same string always gives the same plan.
+    Raises:
+        ValueError: If the string is not a valid dice expression.
+
+    """
+    match = _ROLL_REGEX.match("".join(roll_string.split()).lower())
+    if not match:
+        raise ValueError(f"Invalid dice expression: {roll_string!r}")
+
+    count = int(match["count"] or 1)
+    sides = int(match["sides"])
+    if count < 1 or sides < 1:
+        raise ValueError(
+            f"Dice expression needs at least one die with one side: {roll_string!r}"
+        )
+
+    keep = None
+    if match["keep"]:
+        keep = int(match["keepnum"])
+        if not 1 <= keep <= count:
+            raise ValueError(f"Cannot keep {keep} of {count} dice: {roll_string!r}")
+
+    return RollPlan(
+        roll_string,
+        count,
+        sides,
+        keep=keep,
+        keep_highest=match["keep"] != "kl",
+        modifier=int(match["modifier"] or 0),
+        advantage=match["adv"] == "adv",
+        disadvantage=match["adv"] == "dis",
+    )
+
+
+class RollStream(Random):
+    """
+    An independent, seedable source of random numbers for the roll engine.
+
+    """
+
+    def __init__(self, seed=None):
+        """
+        Args:
+            seed (int or str, optional): The seed of the stream. If not given, the
+                stream is seeded from the OS like the global random module.
+
+        """
+        super().__init__(seed)
+        self.initial_seed = seed
+
+    def __repr__(self):
+        return f"<RollStream seed={self.initial_seed!r}>"
+
+    def snapshot(self):
+        """
+        Get the current state of the stream.
+
+        Returns:
+            tuple: A picklable state to pass to `restore` later.
+
+        """
+        return self.getstate()
+
+    def restore(self, snapshot):
+        """
+        Rewind (or fast-forward) the stream to an earlier snapshot. The same rolls
+        made after the snapshot will now give the same results again.
+
+        Args:
+            snapshot (tuple): A state returned from `snapshot`.
+
+        """
+        self.setstate(snapshot)
+
+
+def derive_seed(seed, key):
+    """
+    Derive a seed for a sub-stream, so that a single master seed can be used to
+    seed a stream per character or combat without the streams overlapping.
+
+    Args:
+        seed (int or str): The master seed.
+        key (str): What the sub-stream is for, like a character's dbref.
+    Returns:
+        int: A new seed.
+
+    """
+    return int.from_bytes(sha256(f"{seed}:{key}".encode()).digest()[:8], "big")
+
+
+# marks holes in a range table's lookup
+_NO_RESULT = object()
+
+_TABLE_CACHE = {}
+
+
+class RollTable:
+    """
+    A compiled random table. Don't create these directly, use `compile_table`.
+
+    """
+
+    __slots__ = ("source", "lookup", "offset", "ranged")
+
+    def __init__(self, source, lookup, offset, ranged):
+        self.source = source
+        self.lookup = lookup
+        self.offset = offset
+        self.ranged = ranged
+
+    def __repr__(self):
+        return f"<RollTable {len(self.lookup)} entries>"
+
+    def get(self, roll_result):
+        """
+        Look up the result for a given die result.
+
+        Args:
+            roll_result (int): The result of the die roll.
+        Returns:
+            Any: The table entry for that result.
+        Raises:
+            RuntimeError: If the die result falls outside the ranges of the table.
+
+        """
+        lookup = self.lookup
+        if not self.ranged:
+            # a simple list; results outside it are clamped to the ends
+            return lookup[max(1, min(len(lookup), roll_result)) - 1]
+
+        index = roll_result - self.offset
+        if 0 <= index < len(lookup):
+            choice = lookup[index]
+            if choice is not _NO_RESULT:
+                return choice
+        raise RuntimeError("roll_random_table: Invalid die roll")
+
+
+def _parse_range(valrange):
+    """
+    Parse a range string like "1-5" or "3" into `(min, max)`.
+
+    """
+    try:
+        minval, *maxval = valrange.split("-", 1)
+        minval = abs(int(minval))
+        maxval = abs(int(maxval[0]) if maxval else minval)
+    except (AttributeError, ValueError):
+        raise ValueError(f"Malformed table range: {valrange!r}")
+    if minval > maxval:
+        raise ValueError(f"Malformed table range: {valrange!r}")
+    return minval, maxval
+
+
+def compile_table(table_choices):
+    """
+    Compile a random table into a (cached) `RollTable`. Tables are cached by
+    identity, so they should not be modified after being rolled on.
+
+    Args:
+        table_choices (list or tuple): A list of either single elements or of
+            tuples on the form `[("1-5", "item"), ("6", "item2"), ...]`.
+    Returns:
+        RollTable: The compiled table.
+    Raises:
+        ValueError: If the table is empty or its ranges are malformed or overlap.
+
+    """
+    table = _TABLE_CACHE.get(id(table_choices))
+    if table is not None and table.source is table_choices:
+        return table
+
+    if not table_choices:
+        raise ValueError("Cannot compile an empty table.")
+
+    if isinstance(table_choices[0], (tuple, list)):
+        ranges = [
+            (*_parse_range(valrange), choice) for valrange, choice in table_choices
+        ]
+        offset = min(minval for minval, _, _ in ranges)
+        lookup = [_NO_RESULT] * (max(maxval for _, maxval, _ in ranges) - offset + 1)
+        for minval, maxval, choice in ranges:
+            for value in range(minval, maxval + 1):
+                if lookup[value - offset] is not _NO_RESULT:
+                    raise ValueError(f"Table ranges overlap at {value}.")
+                lookup[value - offset] = choice
+        table = RollTable(table_choices, lookup, offset, True)
+    else:
+        table = RollTable(table_choices, list(table_choices), 1, False)
+
+    if len(_TABLE_CACHE) >= TABLE_CACHE_SIZE:
+        _TABLE_CACHE.clear()
+    _TABLE_CACHE[id(table_choices)] = table
+    return table
@@ -1,6 +1,53 @@
-from .enums import WieldLocation, Ability
-from .objects import EvAdventureObject, WeaponEmptyHand
+from collections import namedtuple
+from collections.abc import Mapping
+from contextlib import contextmanager
+from itertools import count
+from .enums import WieldLocation, Ability, ObjType
+from .objects import (
+    EMPTY_HAND,
+    EvAdventureObject,
+    get_empty_hand,
+    get_stat_views,
+    prefetch_attributes,
+)
+from .properties import attribute_version
 from evennia import utils
+from evennia.utils import logger
+from evennia.objects.models import ObjectDB
+from evennia.utils.dbserialize import deserialize
+from evennia.utils.utils import delay, make_iter
+
+# the wield slots, in the order they are stored
+WIELD_SLOTS = (
+    WieldLocation.WEAPON_HAND,
+    WieldLocation.SHIELD_HAND,
+    WieldLocation.TWO_HANDS,
+    WieldLocation.BODY,
+    WieldLocation.HEAD,
+)
+
+# the use-slots offered when swapping worn and wielded loadouts
+WEARABLE_SLOTS = (WieldLocation.BODY, WieldLocation.HEAD)
+WIELDABLE_SLOTS = (
+    WieldLocation.WEAPON_HAND,
+    WieldLocation.TWO_HANDS,
+    WieldLocation.SHIELD_HAND,
+)
+# the obj_types that can be used (they have `at_pre_use`)
+USABLE_OBJ_TYPES = (ObjType.CONSUMABLE, ObjType.MAGIC)
+
+# what combat needs to know about a loadout, worked out once per loadout change
+LoadoutStats = namedtuple(
+    "LoadoutStats",
+    ("armor", "weapon", "weapon_stats", "attack_type", "defend_type", "damage_roll"),
+)
+
+# the Attributes the backpack listings need, fetched for all items in one query
+LISTING_ATTRIBUTES = ("size", "inventory_use_slot")
+
+# loadout versions are handed out from one counter, so a reloaded handler never
+# reuses a version
+_LOADOUT_VERSIONS = count(1)
 
 
 class EquipmentError(TypeError):
@@ -14,39 +61,311 @@ class EquipmentHandler:
     # we're going to need to save
 
     save_attribute = "inventory_slots"
+    # The inventory is stored as `(version, (5 wield slot dbids), (backpack dbids))`,
+    # which is much cheaper to pickle than enums and objects. Older saves (a dict
+    # of `{WieldLocation: obj}`) are converted on load.
+    storage_version = 2
+
+    # recount the slots on every count_slots() call and complain if the running
+    # total has drifted. Slow, only meant for debugging.
+    verify_slot_usage = False
+
+    # seconds to wait before writing changes to the database, collecting all
+    # changes made in the meantime into one write. 0 writes right away.
+    save_delay = 0
 
     def __init__(self, obj):
         # here, obj is the character we store the handler on
 
         self.obj = obj
+        # running total of used slots, counted on first use
+        self._slot_usage = None
+        # write-behind state
+        self._dirty = False
+        self._batch_depth = 0
+        self._flush_task = None
+        # prefetched Attributes of the backpack items, until the next change
+        self._listing = None
+        # the backpack grouped by use-slot and by obj_type, built on first use
+        self._index = None
+        # the LoadoutStats of what's worn and wielded, until it changes
+        self._stats = None
+        # `[(obj, attribute version)]` of the worn items the stats were worked out from
+        self._stats_versions = None
+        # where everything is, `{dbid: (WieldLocation, backpack position or None)}`,
+        # built on first use
+        self._where = None
+        # changes whenever anything is added, removed or moved around
+        self.loadout_version = next(_LOADOUT_VERSIONS)
         self.__load()
 
     def __load(self):
         """Load our data from an Attribute on `self.obj`"""
-        self.slots = self.obj.attributes.get(
-            self.save_attribute,
-            category="inventory",
-            default={
-                WieldLocation.WEAPON_HAND: None,
-                WieldLocation.SHIELD_HAND: None,
-                WieldLocation.TWO_HANDS: None,
-                WieldLocation.BODY: None,
-                WieldLocation.HEAD: None,
-                WieldLocation.BACKPACK: [],
-            },
+        # the stored dbrefs are only turned into objects when `slots` is used
+        self._stored = self.obj.attributes.get(
+            self.save_attribute, category="inventory", default=None
         )
+        self._slots = None
+
+    @property
+    def slots(self):
+        """
+        The equipment, as a dict `{WieldLocation: obj}`, where the backpack is a list.
+
+        """
+        if self._slots is None:
+            self._slots = self._unpack(self._stored)
+            self._stored = None
+        return self._slots
+
+    @slots.setter
+    def slots(self, slots):
+        self._slots = slots
+        self._stored = None
+        self._slot_usage = None
+        self._listing = None
+        self._index = None
+        self._stats = None
+        self._where = None
+        self.loadout_version = next(_LOADOUT_VERSIONS)
+
+    def _pack(self):
+        """Get the compact form of the equipment, for storing"""
+        slots = self.slots
+        return (
+            self.storage_version,
+            tuple(slots[slot].id if slots[slot] else None for slot in WIELD_SLOTS),
+            tuple(obj.id for obj in slots[WieldLocation.BACKPACK]),
+        )
+
+    def _unpack(self, stored):
+        """Turn stored equipment back into a slots-dict of objects"""
+        slots = {slot: None for slot in WIELD_SLOTS}
+        slots[WieldLocation.BACKPACK] = []
+        if not stored:
+            return slots
+
+        if isinstance(stored, Mapping):
+            # an old save, with the objects stored directly. We get a plain copy
+            # rather than the Attribute's own saving-on-change dict, and store it
+            # again in the new format
+            slots.update(deserialize(stored))
+            slots[WieldLocation.BACKPACK] = [
+                obj for obj in slots[WieldLocation.BACKPACK] if obj
+            ]
+            self._slots = slots
+            self._save()
+            return slots
+
+        version, wielded, backpack = stored
+        if version != self.storage_version:
+            raise EquipmentError(
+                f"Unknown equipment storage version {version} on {self.obj}."
+            )
+        # objects deleted since they were stored just disappear
+        objs = self._resolve(wielded + backpack)
+        for slot, dbid in zip(WIELD_SLOTS, wielded):
+            slots[slot] = objs.get(dbid)
+        slots[WieldLocation.BACKPACK] = [
+            objs[dbid] for dbid in backpack if dbid in objs
+        ]
+        return slots
+
+    def _resolve(self, dbids):
+        """
+        Get objects by dbid, all in one query.
+
+        Returns:
+            dict: A mapping `{dbid: obj}` for all objects that still exist.
+
+        """
+        objs = {}
+        missing = []
+        for dbid in set(dbids):
+            if dbid is None:
+                continue
+            # objects already in memory don't need a query
+            obj = ObjectDB.get_cached_instance(dbid)
+            if obj:
+                objs[dbid] = obj
+            else:
+                missing.append(dbid)
+        if missing:
+            objs.update((obj.id, obj) for obj in ObjectDB.objects.filter(id__in=missing))
+        return objs
 
     def _save(self):
-        """Save our data back to the same attribute"""
-        self.obj.attributes.add(self.save_attribute, self.slots, category="inventory")
+        """
+        Save our data back to the same attribute. Inside a `batch()` or with a
+        `save_delay`, the save is put off and done together with later changes.
+
+        """
+        self._dirty = True
+        self._listing = None
+        self.loadout_version = next(_LOADOUT_VERSIONS)
+        if self._batch_depth:
+            return
+        if self.save_delay:
+            if not self._flush_task:
+                self._flush_task = delay(self.save_delay, self.flush)
+            return
+        self.flush()
+
+    def flush(self):
+        """Write any unsaved changes to the database right away"""
+        if self._flush_task:
+            if self._flush_task.active():
+                self._flush_task.cancel()
+            self._flush_task = None
+        if self._dirty:
+            self._dirty = False
+            self.obj.attributes.add(
+                self.save_attribute, self._pack(), category="inventory"
+            )
+
+    @contextmanager
+    def batch(self):
+        """
+        Collect all changes made in the block into a single database write at the
+        end. The write happens even if the block raises, so the database always
+        ends up matching what's in memory.
+
+        Example:
+        ::
+
+            with character.equipment.batch():
+                character.equipment.add(sword)
+                character.equipment.move(sword)
+
+        """
+        self._batch_depth += 1
+        try:
+            yield self
+        finally:
+            self._batch_depth -= 1
+            if not self._batch_depth:
+                self.flush()
+
+    def _backpack_listing(self):
+        """
+        Get the listing Attributes of everything in the backpack, all fetched at
+        once. Kept until the equipment next changes.
+
+        Returns:
+            list: A list of `(obj, {attrname: value})` in backpack order.
+
+        """
+        if self._listing is None:
+            backpack = self.slots[WieldLocation.BACKPACK]
+            values = prefetch_attributes(backpack, LISTING_ATTRIBUTES)
+            self._listing = [(obj, values[obj.id]) for obj in backpack]
+        return self._listing
+
+    def refresh_listing(self):
+        """
+        Forget the prefetched backpack Attributes and indexes. Only needed if a
+        carried item's size or use-slot was changed, or `slots` was changed,
+        without going through the handler.
+
+        """
+        self._listing = None
+        self._index = None
+        self._where = None
+
+    def _backpack_index(self):
+        """
+        Get the backpack indexes, building them if needed.
+
+        Returns:
+            tuple: `({WieldLocation: [obj, ...]}, {ObjType: [obj, ...]})`, each
+                list in backpack order.
+
+        """
+        if self._index is None:
+            self._index = ({}, {})
+            for obj, values in self._backpack_listing():
+                self._index_add(obj, values["inventory_use_slot"])
+        return self._index
+
+    def _index_add(self, obj, use_slot=None):
+        """Add an object put in the backpack to the indexes"""
+        if self._index is None:
+            return
+        if use_slot is None:
+            use_slot = getattr(obj, "inventory_use_slot", WieldLocation.BACKPACK)
+        by_slot, by_type = self._index
+        by_slot.setdefault(use_slot, []).append(obj)
+        # the obj_type tags come from the class, so there's no need to ask the db
+        for obj_type in make_iter(getattr(obj, "obj_type", ())):
+            by_type.setdefault(obj_type, []).append(obj)
+
+    def _index_remove(self, *objs):
+        """Remove objects taken out of the backpack from the indexes"""
+        if self._index is None:
+            return
+        by_slot, by_type = self._index
+        for obj in objs:
+            for indexed in (*by_slot.values(), *by_type.values()):
+                if obj in indexed:
+                    indexed.remove(obj)
+
+    def _locations(self):
+        """
+        Get the reverse map of where everything is, building it if needed.
+
+        Returns:
+            dict: `{dbid: (WieldLocation, position)}`, where position is the
+                index in the backpack list, or None for the wield slots.
+
+        """
+        if self._where is None:
+            self._where = {}
+            self._relocate()
+        return self._where
+
+    def _relocate(self, start=0):
+        """
+        Update the reverse map after things were moved around, for the wield slots
+        and for the backpack from position `start` on.
+
+        """
+        where = self._where
+        if where is None:
+            return
+        slots = self.slots
+        for slot in WIELD_SLOTS:
+            obj = slots[slot]
+            if obj:
+                where[obj.id] = (slot, None)
+        backpack = slots[WieldLocation.BACKPACK]
+        for position in range(start, len(backpack)):
+            where[backpack[position].id] = (WieldLocation.BACKPACK, position)
+
+    def _unlocate(self, *objs):
+        """Remove objects no longer carried from the reverse map"""
+        if self._where is not None:
+            for obj in objs:
+                if obj:
+                    self._where.pop(obj.id, None)
+
+    def _backpack_position(self, obj):
+        """Get the position of obj in the backpack, or raise ValueError"""
+        slot, position = self._locations().get(obj.id, (None, None))
+        if slot is not WieldLocation.BACKPACK:
+            raise ValueError(f"{obj} is not in the backpack.")
+        return position
+
+    def _from_index(self, index, keys):
+        """Get the indexed objects for all `keys`, in the order of the keys"""
+        return [obj for key in keys for obj in index.get(key, ())]
 
     @property
     def max_slots(self):
         """Max amount of slots, based on END defense (END + 10)"""
         return getattr(self.obj, Ability.END.value, 1) + 10
 
-    def count_slots(self):
-        """Count current slot usage"""
+    def _recount_slots(self):
+        """Count slot usage the slow way, by checking every item"""
         slots = self.slots
         # get the size for each object if it's not in the backpack
         wield_item_sizes = []
@@ -61,6 +380,37 @@ class EquipmentHandler:
         )
         return wield_usage + backpack_usage
 
+    def recount_slots(self):
+        """
+        Recount the slot usage from scratch. Only needed if `slots` or the size of a
+        carried item was changed without going through the handler.
+
+        Returns:
+            int: The slot usage.
+
+        """
+        self._slot_usage = self._recount_slots()
+        return self._slot_usage
+
+    def count_slots(self):
+        """Count current slot usage"""
+        if self._slot_usage is None:
+            return self.recount_slots()
+        if self.verify_slot_usage:
+            usage = self._recount_slots()
+            if usage != self._slot_usage:
+                logger.log_warn(
+                    f"EquipmentHandler on {self.obj}: slot usage was "
+                    f"{self._slot_usage} but should be {usage}."
+                )
+                self._slot_usage = usage
+        return self._slot_usage
+
+    def _adjust_slot_usage(self, *objs, sign=1):
+        """Update the running slot total when objects come or go"""
+        if self._slot_usage is not None:
+            self._slot_usage += sign * sum(getattr(obj, "size", 0) for obj in objs)
+
     def validate_slot_usage(self, obj):
         """
         Check if obj can fit in equipment, based on its size.
@@ -100,14 +450,38 @@ class EquipmentHandler:
     def add(self, obj):
         """Put something in the backpack."""
         self.validate_slot_usage(obj)
-        self.slots[WieldLocation.BACKPACK].append(obj)
+        backpack = self.slots[WieldLocation.BACKPACK]
+        backpack.append(obj)
+        self._adjust_slot_usage(obj)
+        self._index_add(obj)
+        self._relocate(len(backpack) - 1)
         self._save()
 
     def drop(self, obj):
         # Remove something from the backpack
-        self.slots[WieldLocation.BACKPACK].remove(obj)
+        position = self._backpack_position(obj)
+        del self.slots[WieldLocation.BACKPACK][position]
+        self._adjust_slot_usage(obj, sign=-1)
+        self._index_remove(obj)
+        self._unlocate(obj)
+        self._relocate(position)
         self._save()
 
+    def removed(self, obj):
+        """
+        Take an object out of the equipment, wherever it is, like when it's
+        dropped or given away. Does nothing if it's not carried.
+
+        Args:
+            obj (Object): The object that left the character.
+
+        """
+        slot, position = self._locations().get(obj.id, (None, None))
+        if slot is WieldLocation.BACKPACK:
+            self.drop(obj)
+        elif slot:
+            self.remove(slot)
+
     def remove(self, slot):
         """Remove contents of a particular slot, for
         example `equipment.remove(WieldLocation.SHIELD_HAND)"""
@@ -115,6 +489,9 @@ class EquipmentHandler:
         ret = []
         ret.append(slots[slot])
         slots[slot] = None
+        self._adjust_slot_usage(*ret, sign=-1)
+        self._unlocate(*ret)
+        self._stats = None
         if ret:
             self._save()
         else:
@@ -128,6 +505,12 @@ class EquipmentHandler:
         ret = []
         ret.extend(slots[slot])
         slots[slot] = []
+        self._adjust_slot_usage(*ret, sign=-1)
+        self._unlocate(*ret)
+        if slot is WieldLocation.BACKPACK:
+            self._index_remove(*ret)
+        else:
+            self._stats = None
 
         if ret:
             self._save()
@@ -139,8 +522,11 @@ class EquipmentHandler:
     def move(self, obj):
         """Move object from backpack to its intended inventory_use_slot"""
 
-        # make sure to remove from equipment/backpack first, to avoid double-adding
-        self.drop(obj)
+        # make sure to remove from equipment/backpack first, to avoid double-adding.
+        # The object stays carried, so the slot usage doesn't change
+        position = self._backpack_position(obj)
+        del self.slots[WieldLocation.BACKPACK][position]
+        self._index_remove(obj)
 
         slots = self.slots
         use_slot = getattr(obj, "inventory_use_slot", WieldLocation.BACKPACK)
@@ -148,10 +534,12 @@ class EquipmentHandler:
         to_backpack = []
         try:
             if use_slot is WieldLocation.TWO_HANDS:
-                # TWO handed weapons can't be used with weapon/shield_hand objects
+                # TWO handed weapons can't be used with weapon/shield_hand objects,
+                # and a TWO handed weapon already wielded goes back to the backpack
                 to_backpack = [
                     slots[WieldLocation.WEAPON_HAND],
                     slots[WieldLocation.SHIELD_HAND],
+                    slots[WieldLocation.TWO_HANDS],
                 ]
                 slots[WieldLocation.WEAPON_HAND] = slots[
                     WieldLocation.SHIELD_HAND
@@ -159,8 +547,9 @@ class EquipmentHandler:
                 slots[use_slot] = obj
 
             elif use_slot in (WieldLocation.WEAPON_HAND, WieldLocation.SHIELD_HAND):
-                # can't keep a TWO handed weapon equipped if adding a 1h weapon or shield
-                to_backpack = [slots[WieldLocation.TWO_HANDS]]
+                # can't keep a TWO handed weapon equipped if adding a 1h weapon or shield,
+                # and whatever was in the hand before goes back to the backpack
+                to_backpack = [slots[WieldLocation.TWO_HANDS], slots[use_slot]]
                 slots[WieldLocation.TWO_HANDS] = None
                 slots[use_slot] = obj
 
@@ -176,10 +565,14 @@ class EquipmentHandler:
         except:
             raise EquipmentError(f"Ye cannot move to a slot. You have fucked up now")
 
+        self._stats = None
         for to_backpack_obj in to_backpack:
             # put stuff in backpack
             if to_backpack_obj:
                 slots[WieldLocation.BACKPACK].append(to_backpack_obj)
+                self._index_add(to_backpack_obj)
+        # everything carried is still carried, just elsewhere
+        self._relocate(position)
 
         # store new state
         self._save()
@@ -198,21 +591,37 @@ class EquipmentHandler:
 
     def inventory(self):
         """Returns a list of items in the inventory"""
-        slots = self.slots
-        if slots[WieldLocation.BACKPACK]:
+        listing = self._backpack_listing()
+        if listing:
             readout = []
-            for item in slots[WieldLocation.BACKPACK]:
-                readout += f"{item.key} : {item.size} slots\n"
+            for item, values in listing:
+                readout += f"{item.key} : {values['size']} slots\n"
             return "".join(readout)
         else:
             return "Yon backpack be empty."
 
+    def __contains__(self, obj):
+        """Check if an object is carried, anywhere"""
+        return bool(obj) and obj.id in self._locations()
+
+    def locate(self, obj):
+        """
+        Find where an object is carried.
+
+        Args:
+            obj (Object): The object to look for.
+        Returns:
+            tuple or None: `(WieldLocation, position)`, where position is the
+                object's index in the backpack, or None if it's worn or wielded.
+                None if the object isn't carried at all.
+
+        """
+        return self._locations().get(obj.id) if obj else None
+
     def identify_slot(self, obj):
-        """Returns what slot an item is currently in"""
-        slots = self.slots
-        for slot, slotobj in slots.items():
-            if slotobj == obj:
-                return slot
+        """Returns what slot an item is currently in, or None if it's not carried"""
+        location = self.locate(obj)
+        return location[0] if location else None
 
     def identify_loadout(self):
         """This returns all equipped items and their slots, but not the inventory."""
@@ -233,27 +642,81 @@ class EquipmentHandler:
             return f"You're not wearing anything. How embarrassing!"
 
     @property
-    def armor(self):
+    def stats(self):
+        """
+        The combat stats of the current loadout. These are only worked out again
+        after something is moved or removed, or when the Attributes of a worn or
+        wielded item change.
+
+        Returns:
+            LoadoutStats: A named tuple `(armor, weapon, weapon_stats, attack_type,
+                defend_type, damage_roll)`. `weapon` is the wielded object, or the
+                shared empty hand of `get_empty_hand` without one. `weapon_stats` is its stat view.
+
+        """
+        if self._stats is not None:
+            # like the stat sheets of get_obj_stats, the stats also depend on the
+            # Attributes of the worn items
+            for obj, version in self._stats_versions:
+                if attribute_version(obj) != version:
+                    break
+            else:
+                return self._stats
+
         slots = self.slots
-        return sum(
-            # armor is listed using it's defense, so remove 10
-            # 11 is the base no-armor value
-            getattr(slots[WieldLocation.BODY], "armor", 1),
-            # shields and helmets are listed by their bonus to armor
-            getattr(slots[WieldLocation.SHIELD_HAND], "armor", 0),
-            getattr(slots[WieldLocation.HEAD], "armor", 0),
+        # first checks 2h wield, then 1h; the two should never appear simultaneously
+        weapon = slots[WieldLocation.TWO_HANDS] or slots[WieldLocation.WEAPON_HAND]
+        body = slots[WieldLocation.BODY]
+        shield = slots[WieldLocation.SHIELD_HAND]
+        head = slots[WieldLocation.HEAD]
+        worn = [obj for obj in (weapon, body, shield, head) if obj]
+        self._stats_versions = [(obj, attribute_version(obj)) for obj in worn]
+        # all the stats are read in one go
+        views = get_stat_views(worn)
+        armor = sum(
+            (
+                # armor is listed using it's defense, so remove 10
+                # 11 is the base no-armor value
+                getattr(views.get(body.id) if body else None, "armor", 1),
+                # shields and helmets are listed by their bonus to armor
+                getattr(views.get(shield.id) if shield else None, "armor", 0),
+                getattr(views.get(head.id) if head else None, "armor", 0),
+            )
+        )
+        if weapon:
+            weapon_view = views.get(weapon.id, EMPTY_HAND)
+        else:
+            weapon, weapon_view = get_empty_hand(), EMPTY_HAND
+        self._stats = LoadoutStats(
+            armor,
+            weapon,
+            weapon_view,
+            weapon_view.attack_type,
+            weapon_view.defend_type,
+            weapon_view.damage_roll,
         )
+        return self._stats
+
+    def refresh_stats(self):
+        """
+        Forget the cached combat stats. Only needed if a worn or wielded item was
+        changed (like its armor value) in a way its attribute version doesn't
+        follow, see `game.properties.attribute_version`.
+
+        """
+        self._stats = None
+
+    @property
+    def armor(self):
+        return self.stats.armor
 
     @property
     def weapon(self):
-        # first checks 2h wield, then 1h; the two should never appear simultaneously
-        slots = self.slots
-        weapon = slots[WieldLocation.TWO_HANDS]
-        if not weapon:
-            weapon = slots[WieldLocation.WEAPON_HAND]
-        if not weapon:
-            return WeaponEmptyHand()
-        return weapon
+        return self.stats.weapon
+
+    @property
+    def weapon_stats(self):
+        return self.stats.weapon_stats
 
     def get_wearable_objects_from_backpack(self):
         """
@@ -261,16 +724,13 @@ class EquipmentHandler:
         have a list to select from when swapping your worn loadout.
 
         Returns:
-            list: A list of objects with a suitable `inventory_use_slot`. We don't check
-            quality, so this may include broken items (we may want to visually show them
-            in the list after all).
+            list: A list of objects with a suitable `inventory_use_slot`, grouped by
+            slot. We don't check quality, so this may include broken items (we may
+            want to visually show them in the list after all).
 
         """
-        return [
-            obj
-            for obj in self.slots[WieldLocation.BACKPACK]
-            if obj.inventory_use_slot in (WieldLocation.BODY, WieldLocation.HEAD)
-        ]
+        by_slot, _ = self._backpack_index()
+        return self._from_index(by_slot, WEARABLE_SLOTS)
 
     def get_wieldable_objects_from_backpack(self):
         """
@@ -278,21 +738,13 @@ class EquipmentHandler:
         have a list to select from when swapping your wielded loadout.
 
         Returns:
-            list: A list of objects with a suitable `inventory_use_slot`. We don't check
-            quality, so this may include broken items (we may want to visually show them
-            in the list after all).
-
-        """
-        return [
-            obj
-            for obj in self.slots[WieldLocation.BACKPACK]
-            if obj.inventory_use_slot
-            in (
-                WieldLocation.WEAPON_HAND,
-                WieldLocation.TWO_HANDS,
-                WieldLocation.SHIELD_HAND,
-            )
-        ]
+            list: A list of objects with a suitable `inventory_use_slot`, grouped by
+            slot. We don't check quality, so this may include broken items (we may
+            want to visually show them in the list after all).
+
+        """
+        by_slot, _ = self._backpack_index()
+        return self._from_index(by_slot, WIELDABLE_SLOTS)
 
     def get_usable_objects_from_backpack(self):
         """
@@ -304,8 +756,7 @@ class EquipmentHandler:
 
         """
         character = self.obj
-        return [
-            obj
-            for obj in self.slots[WieldLocation.BACKPACK]
-            if obj.at_pre_use(character)
-        ]
+        _, by_type = self._backpack_index()
+        # an object can be of several usable types, but should only be listed once
+        usable = dict.fromkeys(self._from_index(by_type, USABLE_OBJ_TYPES))
+        return [obj for obj in usable if obj.at_pre_use(character)]
@@ -0,0 +1,313 @@
+"""
+Hot stats: character fields that change all the time, like `hp`, `coins` and `xp`,
+kept in memory and written to the database in batches.
+
+A `HotAttributeProperty` works like an `AttributeProperty`, except that the value
+is loaded from its Attribute once and then read from memory. Assigning to it only
+changes the value in memory and marks it dirty. Dirty values are written by
+`HOT_STATS`, all in one transaction:
+
+- on a timer, `HOT_STAT_FLUSH_INTERVAL` seconds after the first change,
+- when told to, like at the end of a fight: `HOT_STATS.flush(combatants)`,
+- when a character is unpuppeted, or flushed from the idmapper cache,
+- when the server reloads or stops (see `server/conf/at_server_startstop.py`).
+
+So ten hits in a round cost ten changes in memory and a single write later on.
+
+Objects using these properties need the `HotStatAttributeHandler` as their
+`attributes` handler. It keeps the values in memory in sync when the Attributes
+are changed in other ways, like with `obj.db.coins = 5`. A direct write like that
+wins over a dirty value that wasn't written yet.
+
+Hot stats are meant for simple values like numbers. They are kept as they were
+set, without going through the Attribute's pickling.
+
+"""
+
+from django.db import transaction
+from evennia import AttributeProperty
+from evennia.typeclasses.attributes import AttributeHandler
+from evennia.utils.utils import delay, make_iter
+
+# seconds to wait after a hot stat changes before writing all changes. 0 writes
+# every change right away
+HOT_STAT_FLUSH_INTERVAL = 5
+
+# where the in-memory values are kept on the object, `{attrkey: value}`
+_HOT = "_hot_stats"
+
+
+def _clean_key(key):
+    return key.strip().lower()
+
+
+def _hot_properties(obj):
+    """Get `{attrkey: HotAttributeProperty}` for the typeclass of obj"""
+    cls = type(obj)
+    props = cls.__dict__.get("_hot_properties")
+    if props is None:
+        props = {}
+        for base in reversed(cls.__mro__):
+            for prop in vars(base).values():
+                if isinstance(prop, HotAttributeProperty):
+                    props[_clean_key(prop._key)] = prop
+        cls._hot_properties = props
+    return props
+
+
+class HotStatWriter:
+    """
+    Keeps track of changed hot stats and writes them to the database in batches.
+
+    """
+
+    def __init__(self, flush_interval=HOT_STAT_FLUSH_INTERVAL):
+        """
+        Args:
+            flush_interval (int, optional): Seconds to wait after a change before
+                writing. With 0, every change is written right away.
+
+        """
+        self.flush_interval = flush_interval
+        # {obj: {attrkey: HotAttributeProperty}}
+        self._dirty = {}
+        self._flush_task = None
+        # see `add_flush_hook`
+        self._flush_hooks = []
+
+        # metrics
+        self.updates = 0
+        self.writes = 0
+        self.flushes = 0
+
+    def __len__(self):
+        return sum(len(props) for props in self._dirty.values())
+
+    def mark_dirty(self, obj, prop):
+        """
+        Note that a hot stat changed in memory and must be written.
+
+        Args:
+            obj (Object): The object.
+            prop (HotAttributeProperty): The property that changed.
+
+        """
+        self.updates += 1
+        self._dirty.setdefault(obj, {})[_clean_key(prop._key)] = prop
+        if not self.flush_interval:
+            self.flush(obj)
+        elif not self._flush_task:
+            self._flush_task = delay(self.flush_interval, self._flush_due)
+
+    def forget(self, obj, key=None):
+        """
+        Forget unwritten changes, like when the Attribute was written some other
+        way or the object is deleted.
+
+        Args:
+            obj (Object): The object.
+            key (str, optional): The Attribute key. If not given, all of them.
+
+        """
+        if key is None:
+            self._dirty.pop(obj, None)
+            return
+        props = self._dirty.get(obj)
+        if props:
+            props.pop(_clean_key(key), None)
+            if not props:
+                del self._dirty[obj]
+
+    def add_flush_hook(self, hook):
+        """
+        Have more objects written together with the ones being flushed, in the
+        same transaction. The coin ledger uses this so that both sides of a trade
+        always reach the database together.
+
+        Args:
+            hook (callable): Called as `hook(objs)` with the objects about to be
+                flushed, or with None when everything is. It returns a list of
+                more objects to write, which may be empty.
+
+        """
+        self._flush_hooks.append(hook)
+
+    def is_dirty(self, obj):
+        """Check if an object has changes that aren't written yet"""
+        return obj in self._dirty
+
+    def _flush_due(self):
+        """Called by the timer"""
+        self._flush_task = None
+        self.flush()
+
+    def flush(self, objs=None):
+        """
+        Write changed hot stats to the database, all in one transaction.
+
+        Args:
+            objs (Object or list, optional): Only write the changes of these
+                objects, and of the objects linked to them by the flush hooks. If
+                not given, everything is written.
+        Returns:
+            int: The number of Attributes written.
+
+        """
+        if objs is not None:
+            objs = list(make_iter(objs))
+        for hook in self._flush_hooks:
+            linked = hook(objs)
+            if objs is not None:
+                objs.extend(linked)
+
+        if objs is None:
+            dirty, self._dirty = self._dirty, {}
+            if self._flush_task:
+                if self._flush_task.active():
+                    self._flush_task.cancel()
+                self._flush_task = None
+        else:
+            dirty = {}
+            for obj in objs:
+                if obj in self._dirty:
+                    dirty[obj] = self._dirty.pop(obj)
+        if not dirty:
+            return 0
+
+        writes = 0
+        with transaction.atomic():
+            for obj, props in dirty.items():
+                if not obj.pk:
+                    # deleted in the meantime
+                    continue
+                store = obj.__dict__.get(_HOT, {})
+                for key, prop in props.items():
+                    if key in store:
+                        prop.write(obj, store[key])
+                        writes += 1
+        self.writes += writes
+        self.flushes += 1
+        return writes
+
+    def metrics(self):
+        """
+        Get the writer's statistics.
+
+        Returns:
+            dict: The changes waiting to be written, and the changes, Attribute
+                writes and flushes so far. The difference between changes and
+                writes is the database writes saved.
+
+        """
+        return {
+            "pending": len(self),
+            "updates": self.updates,
+            "writes": self.writes,
+            "flushes": self.flushes,
+        }
+
+
+# the writer used by all hot stats
+HOT_STATS = HotStatWriter()
+
+
+class HotAttributeProperty(AttributeProperty):
+    """
+    An `AttributeProperty` read from memory, with changes written in batches by
+    `HOT_STATS`.
+
+    """
+
+    def _load(self, instance):
+        """Get the value from the Attribute, like `AttributeProperty` would"""
+        default = self._get_and_cache_default(instance)
+        try:
+            return self.at_get(
+                getattr(instance, self.attrhandler_name).get(
+                    key=self._key,
+                    default=default,
+                    category=self._category,
+                    strattr=self._strattr,
+                    raise_exception=self._autocreate,
+                ),
+                instance,
+            )
+        except AttributeError:
+            if not self._autocreate:
+                raise
+            # no Attribute yet. Make it right away, so it's there for `examine`
+            self.write(instance, default)
+            return default
+
+    def __get__(self, instance, owner):
+        if instance is None:
+            return self
+        store = instance.__dict__.setdefault(_HOT, {})
+        key = _clean_key(self._key)
+        if key not in store:
+            store[key] = self._load(instance)
+        return store[key]
+
+    def __set__(self, instance, value):
+        instance.__dict__.setdefault(_HOT, {})[_clean_key(self._key)] = self.at_set(
+            value, instance
+        )
+        HOT_STATS.mark_dirty(instance, self)
+
+    def __delete__(self, instance):
+        HOT_STATS.forget(instance, self._key)
+        instance.__dict__.get(_HOT, {}).pop(_clean_key(self._key), None)
+        super().__delete__(instance)
+
+    def write(self, instance, value):
+        """Write a value to the Attribute right away"""
+        super().__set__(instance, value)
+
+
+class HotStatAttributeHandler(AttributeHandler):
+    """
+    An attribute handler that keeps the in-memory values of hot stats in sync with
+    Attribute changes made without going through the properties.
+
+    """
+
+    def _sync(self, key, category, value=None, removed=False):
+        """Update (or drop) the in-memory value of a hot stat that was written"""
+        if not key:
+            return
+        obj = self.obj
+        key = _clean_key(key)
+        prop = _hot_properties(obj).get(key)
+        if not prop or _clean_key(prop._category or "") != _clean_key(category or ""):
+            return
+        HOT_STATS.forget(obj, key)
+        store = obj.__dict__.setdefault(_HOT, {})
+        if removed:
+            store.pop(key, None)
+        else:
+            store[key] = value
+
+    def add(self, key, value, category=None, *args, **kwargs):
+        super().add(key, value, category, *args, **kwargs)
+        self._sync(key, category, value)
+
+    def batch_add(self, *args, **kwargs):
+        super().batch_add(*args, **kwargs)
+        for tup in args:
+            self._sync(tup[0], tup[2] if len(tup) > 2 else None, tup[1])
+
+    def remove(self, key=None, category=None, *args, **kwargs):
+        super().remove(key, category, *args, **kwargs)
+        if key is None:
+            self._forget_all()
+        else:
+            for single_key in make_iter(key):
+                self._sync(single_key, category, removed=True)
+
+    def clear(self, *args, **kwargs):
+        super().clear(*args, **kwargs)
+        self._forget_all()
+
+    def _forget_all(self):
+        HOT_STATS.forget(self.obj)
+        self.obj.__dict__.pop(_HOT, None)
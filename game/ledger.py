@@ -0,0 +1,256 @@
+"""
+The coin ledger. All coins changing hands go through it:
+
+    from game.ledger import LEDGER
+
+    LEDGER.transfer(victim, looter, 10)
+
+    # a raid boss is looted by everyone at once
+    LEDGER.transfer_many((boss, raider, share) for raider in raiders)
+
+A transfer is applied to the balances right away, both sides in one step, so
+reading `obj.coins` is always up to date and nothing can happen in between the
+payer paying and the payee getting paid. The balances are hot stats (see
+`game.hotstats`), so they're only changed in memory. The transfer is also
+appended to the ledger as a `LedgerEntry(payer, payee, amount)`.
+
+Every `LEDGER_APPLY_INTERVAL` seconds the entries collected since last time are
+applied: the balances of everyone involved are written in one transaction.
+Hundreds of transfers after a big fight become a single write per party. Applied
+entries are kept in `LEDGER.history` for a while, for checking up on things.
+
+The balances can also be written earlier, like when a character logs out or
+`HOT_STATS.flush(character)` is called at the end of a fight. Then the entries of
+that character are applied right away, and the balances of everyone they traded
+with (and everyone those traded with, and so on) are written in the same
+transaction. So either both sides of a transfer are in the database or neither is.
+
+"""
+
+from collections import deque, namedtuple
+
+from evennia.utils.utils import delay, make_iter
+
+from .hotstats import HOT_STATS
+
+# seconds to collect transfers before applying them. 0 applies every transfer
+# right away
+LEDGER_APPLY_INTERVAL = 2
+# how many applied entries to keep in the history
+LEDGER_HISTORY_SIZE = 1000
+
+# payer and payee are dbids; None means coins coming from or going to nowhere,
+# like loot appearing or paying a shopkeeper's till
+LedgerEntry = namedtuple("LedgerEntry", ("payer", "payee", "amount"))
+
+
+def _dbid(obj):
+    return getattr(obj, "id", None) if obj else None
+
+
+class CoinLedger:
+    """
+    Moves coins between objects, and writes the balances in batches.
+
+    """
+
+    def __init__(
+        self, apply_interval=LEDGER_APPLY_INTERVAL, history_size=LEDGER_HISTORY_SIZE
+    ):
+        """
+        Args:
+            apply_interval (int, optional): Seconds to collect transfers before
+                writing them. With 0, every transfer is written right away.
+            history_size (int, optional): How many applied entries to remember.
+
+        """
+        self.apply_interval = apply_interval
+        self._pending = []
+        # {dbid: obj} of everyone in the pending entries
+        self._parties = {}
+        self._apply_task = None
+        self.history = deque(maxlen=history_size)
+
+        # metrics
+        self.transfers = 0
+        self.batches = 0
+
+    def __len__(self):
+        return len(self._pending)
+
+    def _move(self, payer, payee, amount):
+        """Move coins between the balances and note the entry, without scheduling"""
+        if amount < 0:
+            raise ValueError(f"Can't transfer a negative amount ({amount}) of coins.")
+        if payer:
+            # never take more than there is
+            amount = min(amount, payer.coins)
+        if not amount:
+            return 0
+        if payer:
+            payer.coins -= amount
+        if payee:
+            payee.coins += amount
+        self.transfers += 1
+
+        parties = [obj for obj in (payer, payee) if obj and getattr(obj, "pk", None)]
+        if parties:
+            # headless records (like in game.sim) have nothing to write
+            self._pending.append(LedgerEntry(_dbid(payer), _dbid(payee), amount))
+            for obj in parties:
+                self._parties[obj.id] = obj
+        return amount
+
+    def _schedule(self):
+        if not self._pending:
+            return
+        if not self.apply_interval:
+            self.apply()
+        elif not self._apply_task:
+            self._apply_task = delay(self.apply_interval, self._apply_due)
+
+    def transfer(self, payer, payee, amount):
+        """
+        Move coins from one object to another.
+
+        Args:
+            payer (Object or None): Who pays. If None, the coins come from nowhere.
+            payee (Object or None): Who gets paid. If None, the coins disappear.
+            amount (int): How many coins to move. If the payer has fewer, all
+                they have is moved.
+        Returns:
+            int: How many coins were moved.
+        Raises:
+            ValueError: If the amount is negative.
+
+        """
+        moved = self._move(payer, payee, amount)
+        self._schedule()
+        return moved
+
+    def transfer_many(self, transfers):
+        """
+        Make many transfers at once, like when a hoard is shared out.
+
+        Args:
+            transfers (iterable): `(payer, payee, amount)` for every transfer, made
+                in order. See `transfer`.
+        Returns:
+            list: How many coins were moved by each transfer.
+
+        """
+        moved = [self._move(*transfer) for transfer in transfers]
+        self._schedule()
+        return moved
+
+    def _apply_due(self):
+        """Called by the timer"""
+        self._apply_task = None
+        self.apply()
+
+    def _take(self, objs=None):
+        """
+        Take the pending entries of some parties off the ledger and into the
+        history, together with the entries of everyone they traded with, and so
+        on. The balances of the parties must then be written.
+
+        Args:
+            objs (Object or list, optional): The parties. If not given, all
+                entries are taken.
+        Returns:
+            tuple: The entries taken, and all the parties in them.
+
+        """
+        if objs is None:
+            entries, self._pending = self._pending, []
+            parties, self._parties = self._parties, {}
+            self._record(entries)
+            return entries, list(parties.values())
+
+        todo = [_dbid(obj) for obj in make_iter(objs)]
+        todo = [dbid for dbid in todo if dbid in self._parties]
+        if not todo:
+            return [], []
+        # who traded with whom, `{dbid: {dbid, ...}}`
+        links = {}
+        for entry in self._pending:
+            if entry.payer and entry.payee:
+                links.setdefault(entry.payer, set()).add(entry.payee)
+                links.setdefault(entry.payee, set()).add(entry.payer)
+        linked = set(todo)
+        while todo:
+            for dbid in links.get(todo.pop(), ()):
+                if dbid not in linked:
+                    linked.add(dbid)
+                    todo.append(dbid)
+
+        entries = []
+        pending = []
+        for entry in self._pending:
+            if entry.payer in linked or entry.payee in linked:
+                entries.append(entry)
+            else:
+                pending.append(entry)
+        self._pending = pending
+        parties = [self._parties.pop(dbid) for dbid in linked if dbid in self._parties]
+        self._record(entries)
+        return entries, parties
+
+    def _record(self, entries):
+        if entries:
+            self.history.extend(entries)
+            self.batches += 1
+
+    def _linked(self, objs):
+        """
+        The flush hook of `HOT_STATS`: when some objects are written, apply their
+        entries and write everyone they traded with too.
+
+        """
+        return self._take(objs)[1]
+
+    def apply(self, objs=None):
+        """
+        Write the balances of everyone in the pending entries, all in one
+        transaction.
+
+        Args:
+            objs (Object or list, optional): Only apply the entries of these
+                objects, and of everyone they traded with. If not given, all
+                entries are applied.
+        Returns:
+            int: The number of entries applied.
+
+        """
+        if objs is None and self._apply_task:
+            if self._apply_task.active():
+                self._apply_task.cancel()
+            self._apply_task = None
+        entries, parties = self._take(objs)
+        if not entries:
+            return 0
+        # the hot stats are written in a single transaction
+        HOT_STATS.flush(parties)
+        return len(entries)
+
+    def metrics(self):
+        """
+        Get the ledger's statistics.
+
+        Returns:
+            dict: The entries waiting to be applied, and the transfers made and
+                batches written so far.
+
+        """
+        return {
+            "pending": len(self),
+            "transfers": self.transfers,
+            "batches": self.batches,
+        }
+
+
+# the ledger of the game
+LEDGER = CoinLedger()
+# whenever the balance of someone with pending entries is written, the balances of
+# those they traded with are written along with it
+HOT_STATS.add_flush_hook(LEDGER._linked)
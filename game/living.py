@@ -0,0 +1,64 @@
+from .rules import dice
+
+
+class LivingMixin:
+
+    is_pc = False
+
+    def heal(self, hp):
+        """
+        Heal hp amount of health, not allowing to exceed our max hp
+
+        """
+        damage = self.hp_max - self.hp
+        healed = min(damage, hp)
+        self.hp += healed
+
+        self.msg(f"You heal for {healed} HP.")
+
+    def transfer_coins(self, payee, amount):
+        """
+        Give coins to someone, but never more than we have. Typeclasses move them
+        through the coin ledger instead, see `game.ledger`.
+
+        Args:
+            payee (object or None): Who gets the coins. If None, they're just gone.
+            amount (int): How many coins to give.
+        Returns:
+            int: How many coins were given.
+
+        """
+        amount = min(amount, self.coins)
+        self.coins -= amount
+        if payee:
+            payee.coins += amount
+        return amount
+
+    def at_pay(self, amount):
+        """When paying coins, make sure to never detract more than we have"""
+        return self.transfer_coins(None, amount)
+
+    def at_damage(self, damage, attacker=None):
+        """Called when attacked and taking damage"""
+        self.hp -= damage
+
+    def at_defeat(self):
+        """Called when defeated. By default, this means death."""
+        self.at_death()
+
+    def at_death(self):
+        """Called when this thing dies."""
+        # this will mean different things for different living things
+        pass
+
+    def at_do_loot(self, looted):
+        """Called when looting another entity"""
+        looted.at_looted(self)
+
+    def at_looted(self, looter):
+        """Called when looted by another entity"""
+
+        # default to stealing some coins
+        max_steal = dice.roll("1d10")
+        # both sides in one go
+        self.transfer_coins(looter, max_steal)
@@ -1,8 +1,135 @@
+from dataclasses import dataclass, fields
+from inspect import getattr_static
 from evennia import AttributeProperty, DefaultObject
-from evennia.utils.utils import make_iter
-from evennia.utils import search
+from evennia.objects.models import ObjectDB
+from evennia.typeclasses.attributes import ModelAttributeBackend
+from evennia.utils.utils import lazy_property, make_iter
 from .utils import get_obj_stats
+from .catalog import CATALOG
 from .enums import WieldLocation, ObjType, Ability
+from .properties import (
+    FastAttributeProperty,
+    OverrideTrackingAttributeHandler,
+    is_overridden,
+)
+
+
+# Stat views are plain, unchangeable copies of the combat stats of an item. They
+# cost nothing to read (no Attribute lookups) and can be made for things that
+# don't exist in the database at all, like empty hands.
+
+
+@dataclass(frozen=True, slots=True)
+class WeaponStats:
+    """The combat stats of a weapon."""
+
+    key: str
+    inventory_use_slot: WieldLocation
+    quality: int
+    attack_type: Ability
+    defend_type: Ability
+    damage_roll: str
+
+
+@dataclass(frozen=True, slots=True)
+class ArmorStats:
+    """The combat stats of armor, shields and helmets."""
+
+    key: str
+    inventory_use_slot: WieldLocation
+    quality: int
+    armor: int
+
+
+# the weapon of anyone not wielding anything
+EMPTY_HAND = WeaponStats(
+    key="Empty Hands",
+    inventory_use_slot=WieldLocation.WEAPON_HAND,
+    quality=100000,
+    attack_type=Ability.STR,
+    defend_type=Ability.ARMOR,
+    damage_roll="1d4",
+)
+
+
+def prefetch_attributes(objs, attrnames):
+    """
+    Get the values of some Attributes for many objects, with one query in total
+    rather than one per object and Attribute.
+
+    Args:
+        objs (list): The objects to get Attributes for.
+        attrnames (tuple): The (uncategorized) Attribute keys to get.
+    Returns:
+        dict: A mapping `{obj.id: {attrname: value}}`. Objects without a given
+            Attribute get their class default, like `AttributeProperty` would give.
+            Names that are plain class properties rather than `AttributeProperty`s
+            are read straight off the object.
+
+    """
+    values = {}
+    # the (id, name) pairs actually stored in Attributes
+    stored = set()
+    for obj in objs:
+        values[obj.id] = objvalues = {}
+        for attrname in attrnames:
+            default = getattr_static(type(obj), attrname, None)
+            if (
+                isinstance(default, FastAttributeProperty)
+                and is_overridden(obj, attrname) is False
+            ):
+                # known to be the class default, so there's nothing to fetch
+                objvalues[attrname] = getattr(obj, attrname)
+            elif isinstance(default, AttributeProperty):
+                default = default._default
+                objvalues[attrname] = default() if callable(default) else default
+                stored.add((obj.id, attrname))
+            else:
+                objvalues[attrname] = getattr(obj, attrname, None)
+    if not stored:
+        return values
+    connections = ObjectDB.db_attributes.through.objects.filter(
+        objectdb_id__in=values,
+        attribute__db_key__in=attrnames,
+        attribute__db_category__isnull=True,
+        attribute__db_attrtype__isnull=True,
+    ).select_related("attribute")
+    for connection in connections:
+        attr = connection.attribute
+        if (connection.objectdb_id, attr.db_key) in stored:
+            values[connection.objectdb_id][attr.db_key] = attr.value
+    return values
+
+
+def get_stat_views(objs):
+    """
+    Get the stat views of many objects, reading all their Attributes in one query.
+
+    Args:
+        objs (list): The objects to get views of. Those without a
+            `stat_view_class` (like plain gear) are skipped.
+    Returns:
+        dict: A mapping `{obj.id: view}`.
+
+    """
+    objs = [obj for obj in objs if getattr(obj, "stat_view_class", None)]
+    attrnames = {
+        field.name for obj in objs for field in fields(obj.stat_view_class)
+    } - {"key"}
+    values = prefetch_attributes(objs, tuple(attrnames))
+    views = {}
+    for obj in objs:
+        objvalues = values[obj.id]
+        view_class = obj.stat_view_class
+        views[obj.id] = view_class(
+            key=obj.key,
+            **{
+                field.name: objvalues[field.name]
+                for field in fields(view_class)
+                if field.name != "key"
+            },
+        )
+    return views
 
 
 class EvAdventureObject(DefaultObject):
@@ -12,24 +139,61 @@ class EvAdventureObject(DefaultObject):
     """
 
     inventory_use_slot = WieldLocation.BACKPACK
-    size = AttributeProperty(1, autocreate=False)
-    value = AttributeProperty(0, autocreate=False)
+    size = FastAttributeProperty(1, autocreate=False)
+    value = FastAttributeProperty(0, autocreate=False)
 
     # this can either be a single type or a list of types (for objects able to
     # act as multiple). This is used to tag this object during creation.
     obj_type = ObjType.GEAR
 
+    # the kind of stat view this object has, if any (see `stat_view`)
+    stat_view_class = None
+
+    @lazy_property
+    def attributes(self):
+        # keeps track of which FastAttributeProperty fields have been changed
+        return OverrideTrackingAttributeHandler(self, ModelAttributeBackend)
+
     def at_object_creation(self):
         """Called when this object is first created. We convert the .obj_type
         property to a database tag."""
 
         for obj_type in make_iter(self.obj_type):
-            self.tags.add(self.obj_type.value, category="obj_type")
+            self.tags.add(obj_type.value, category="obj_type")
+
+    def at_object_post_creation(self):
+        """Called after creation, once all tags and the location are set."""
+        super().at_object_post_creation()
+        CATALOG.add(self)
+
+    def at_post_move(self, source_location, move_type="move", **kwargs):
+        """Keep the item catalog up to date with where we are."""
+        super().at_post_move(source_location, move_type=move_type, **kwargs)
+        CATALOG.move(self)
+
+    def at_object_delete(self):
+        """Called just before deletion."""
+        if not super().at_object_delete():
+            return False
+        CATALOG.remove(self)
+        return True
 
     def get_help(self):
         """Get any help text for this item"""
         return "No help for this item"
 
+    def stat_view(self):
+        """
+        Get a frozen copy of this object's combat stats. It does not follow later
+        changes to the object.
+
+        Returns:
+            WeaponStats, ArmorStats or None: The view, or None if this kind of
+                object has no combat stats.
+
+        """
+        return get_stat_views([self]).get(self.id)
+
     # this is in the exercise, figure it's a good idea to keep around
 
     # The at_object_creation is a method Evennia calls on every child of DefaultObject whenever
@@ -44,11 +208,8 @@ class EvAdventureObject(DefaultObject):
     # This means you could have a Shield that is also Magical, for example.
 
     def search_shields(self):
-        # get all shields in the game
-        all_shields = search.search_object_by_tag(
-            ObjType.SHIELD.value, category="obj_type"
-        )
-        return all_shields
+        # get all shields in the game, from the catalog rather than the db
+        return CATALOG.find(obj_type=ObjType.SHIELD)
 
 
 class EvAdventureQuestObject(EvAdventureObject):
@@ -61,15 +222,15 @@ class EvAdventureTreasure(EvAdventureObject):
     """Treasure is mainly used to sell for currency."""
 
     obj_type = ObjType.TREASURE
-    value = AttributeProperty(100, autocreate=False)
+    value = FastAttributeProperty(100, autocreate=False)
 
 
 class EvAdventureConsumable(EvAdventureObject):
     """An item that can be used up"""
 
     obj_type = ObjType.CONSUMABLE
-    value = AttributeProperty(0.25, autocreate=False)
-    uses = AttributeProperty(1, autocreate=False)
+    value = FastAttributeProperty(0.25, autocreate=False)
+    uses = FastAttributeProperty(1, autocreate=False)
 
     def at_pre_use(self, user, *args, **kwargs):
         """Called before using. If returning False, abort use."""
@@ -95,13 +256,16 @@ class EvAdventureWeapon(EvAdventureObject):
     """Base class for all weapons"""
 
     obj_type = ObjType.WEAPON
-    inventory_use_slot = AttributeProperty(WieldLocation.WEAPON_HAND, autocreate=False)
-    quality = AttributeProperty(3, autocreate=False)
+    stat_view_class = WeaponStats
+    inventory_use_slot = FastAttributeProperty(
+        WieldLocation.WEAPON_HAND, autocreate=False
+    )
+    quality = FastAttributeProperty(3, autocreate=False)
 
-    attack_type = AttributeProperty(Ability.STR, autocreate=False)
-    defend_type = AttributeProperty(Ability.ARMOR, autocreate=False)
+    attack_type = FastAttributeProperty(Ability.STR, autocreate=False)
+    defend_type = FastAttributeProperty(Ability.ARMOR, autocreate=False)
 
-    damage_roll = AttributeProperty("1d6", autocreate=False)
+    damage_roll = FastAttributeProperty("1d6", autocreate=False)
 
 
 class EvAdventureRuneStone(EvAdventureWeapon, EvAdventureConsumable):
@@ -109,12 +273,12 @@ class EvAdventureRuneStone(EvAdventureWeapon, EvAdventureConsumable):
 
     obj_type = (ObjType.WEAPON, ObjType.MAGIC)
     inventory_use_slot = WieldLocation.TWO_HANDS
-    quality = AttributeProperty(3, autocreate=False)
+    quality = FastAttributeProperty(3, autocreate=False)
 
-    attack_type = AttributeProperty(Ability.INT, autocreate=False)
-    defend_type = AttributeProperty(Ability.DEX, autocreate=False)
+    attack_type = FastAttributeProperty(Ability.INT, autocreate=False)
+    defend_type = FastAttributeProperty(Ability.DEX, autocreate=False)
 
-    damage_roll = AttributeProperty("1d8", autocreate=False)
+    damage_roll = FastAttributeProperty("1d8", autocreate=False)
 
     def at_post_use(self, user, *args, **kwargs):
         """Called after usage/spell was cast"""
@@ -128,10 +292,11 @@ class EvAdventureRuneStone(EvAdventureWeapon, EvAdventureConsumable):
 
 class EvAdventureArmor(EvAdventureObject):
     obj_type = ObjType.ARMOR
+    stat_view_class = ArmorStats
     inventory_use_slot = WieldLocation.BODY
 
-    armor = AttributeProperty(1, autocreate=False)
-    quality = AttributeProperty(3, autocreate=False)
+    armor = FastAttributeProperty(1, autocreate=False)
+    quality = FastAttributeProperty(3, autocreate=False)
 
 
 class EvAdventureShield(EvAdventureArmor):
@@ -145,6 +310,12 @@ class EvAdventureHelmet(EvAdventureArmor):
 
 
 class WeaponEmptyHand(EvAdventureWeapon):
+    """
+    Fighting without a weapon, as a typeclass. Combat uses the much cheaper
+    `EMPTY_HAND` stat view instead; this is for code that needs a full object.
+
+    """
+
     obj_type = ObjType.WEAPON
     key = "Empty Hands"
     inventory_use_slot = WieldLocation.WEAPON_HAND
@@ -155,3 +326,34 @@ class WeaponEmptyHand(EvAdventureWeapon):
 
     def __repr__(self):
         return "<WeaponEmptyHand>"
+
+    def stat_view(self):
+        return EMPTY_HAND
+
+    def __setattr__(self, name, value):
+        # the one shared empty hand must not be changed, or everyone's fists would.
+        # Private names are let through, Evennia caches its lazy handlers on them
+        if self.__dict__.get("_frozen") and not name.startswith("_"):
+            raise AttributeError("Empty hands can't be changed.")
+        super().__setattr__(name, value)
+
+
+_EMPTY_HAND_WEAPON = None
+
+
+def get_empty_hand():
+    """
+    Get the shared, unchangeable empty hand, used as the weapon object of anyone
+    not wielding anything. It's never saved to the database. Its stat view is
+    `EMPTY_HAND`.
+
+    Returns:
+        WeaponEmptyHand: The same instance every time.
+
+    """
+    global _EMPTY_HAND_WEAPON
+    if _EMPTY_HAND_WEAPON is None:
+        hand = WeaponEmptyHand()
+        hand.__dict__["_frozen"] = True
+        _EMPTY_HAND_WEAPON = hand
+    return _EMPTY_HAND_WEAPON
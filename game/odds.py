@@ -0,0 +1,185 @@
+"""
+Exact odds for the rules in `game.rules`.
+
+Instead of rolling a saving throw a million times to guess how likely it is to
+succeed, this works out the exact probability distribution of a dice expression
+(by convolving the dice) and sums up the results that beat the target.
+
+    from game.odds import saving_throw_odds
+
+    odds = saving_throw_odds(bonus=2, target=15, advantage=True)
+    float(odds.success)  # 0.5775
+
+All probabilities are `Fraction`s, so they are exact; use `float()` to get a
+normal number. Results are memoized, so asking again is just a cache lookup.
+
+"""
+
+from collections import Counter, namedtuple
+from fractions import Fraction
+from functools import lru_cache
+from itertools import combinations_with_replacement
+from math import comb, factorial, prod
+
+from .dice import compile_roll
+
+# max number of distinct queries to keep the results of
+ODDS_CACHE_SIZE = 4096
+# refuse to enumerate keep-highest/lowest rolls with more dice combinations than this
+MAX_KEEP_COMBINATIONS = 200_000
+
+SaveOdds = namedtuple("SaveOdds", ("success", "critical_success", "critical_failure"))
+
+
+def _convolve(pmf1, pmf2):
+    """The distribution of the sum of two independent results."""
+    result = Counter()
+    for value1, prob1 in pmf1.items():
+        for value2, prob2 in pmf2.items():
+            result[value1 + value2] += prob1 * prob2
+    return dict(result)
+
+
+def _sum_pmf(count, sides):
+    """The distribution of the sum of `count` dice with `sides` sides."""
+    die = {face: Fraction(1, sides) for face in range(1, sides + 1)}
+    result = {0: Fraction(1)}
+    for _ in range(count):
+        result = _convolve(result, die)
+    return result
+
+
+def _keep_pmf(count, sides, keep, keep_highest):
+    """The distribution of the sum of the `keep` highest/lowest of `count` dice."""
+    if comb(count + sides - 1, count) > MAX_KEEP_COMBINATIONS:
+        raise ValueError(f"Too many combinations to work out {count}d{sides}k{keep}.")
+
+    # walk every distinct (sorted) set of dice once, weighted by how many
+    # orderings of the dice give that same set
+    total = sides**count
+    result = Counter()
+    for dice in combinations_with_replacement(range(1, sides + 1), count):
+        orderings = factorial(count) // prod(
+            factorial(number) for number in Counter(dice).values()
+        )
+        kept = dice[count - keep :] if keep_highest else dice[:keep]
+        result[sum(kept)] += Fraction(orderings, total)
+    return dict(result)
+
+
+def _best_of_two(pmf, highest=True):
+    """The distribution of the max (or min) of two independent results."""
+    result = {}
+    below = Fraction(0)
+    values = sorted(pmf) if highest else sorted(pmf, reverse=True)
+    for value in values:
+        # P(max == v) = P(X <= v)^2 - P(X < v)^2, and the mirror for min
+        upto = below + pmf[value]
+        result[value] = upto * upto - below * below
+        below = upto
+    return result
+
+
+@lru_cache(maxsize=ODDS_CACHE_SIZE)
+def pmf(roll_string):
+    """
+    Get the exact probability distribution of a dice expression.
+
+    Args:
+        roll_string (str): A dice string, like "2d6+3" or "1d20adv" (see `game.dice`).
+    Returns:
+        dict: A mapping `{result: probability}`, with `Fraction` probabilities.
+            The dict is cached and shared, so don't modify it.
+    Raises:
+        ValueError: If the dice string is invalid.
+
+    """
+    plan = compile_roll(roll_string)
+    if plan.keep is None:
+        result = _sum_pmf(plan.count, plan.sides)
+    else:
+        result = _keep_pmf(plan.count, plan.sides, plan.keep, plan.keep_highest)
+
+    if plan.advantage:
+        result = _best_of_two(result, highest=True)
+    elif plan.disadvantage:
+        result = _best_of_two(result, highest=False)
+
+    return {value + plan.modifier: prob for value, prob in sorted(result.items())}
+
+
+@lru_cache(maxsize=ODDS_CACHE_SIZE)
+def saving_throw_odds(
+    bonus, target, advantage=False, disadvantage=False, roll_string="1d20"
+):
+    """
+    Exact odds of `EvAdventureRollEngine.saving_throw`.
+
+    Args:
+        bonus (int): The Ability bonus added to the roll.
+        target (int): The target number to beat.
+        advantage (bool): If the roll has advantage.
+        disadvantage (bool): If the roll has disadvantage.
+        roll_string (str, optional): The dice to roll, if not the normal d20.
+
+    Returns:
+        SaveOdds: A named tuple `(success, critical_success, critical_failure)`
+            of `Fraction` probabilities. As with `saving_throw`, criticals are the
+            highest and lowest possible roll, regardless of the bonus.
+
+    """
+    distribution = pmf(roll_string)
+    if advantage and not disadvantage:
+        distribution = _best_of_two(distribution, highest=True)
+    elif disadvantage and not advantage:
+        distribution = _best_of_two(distribution, highest=False)
+
+    success = sum(
+        (prob for value, prob in distribution.items() if value + bonus > target),
+        Fraction(0),
+    )
+    return SaveOdds(
+        success,
+        distribution.get(max(distribution), Fraction(0)),
+        distribution.get(min(distribution), Fraction(0)),
+    )
+
+
+def opposed_saving_throw_odds(
+    attack_bonus, defense_bonus, advantage=False, disadvantage=False
+):
+    """
+    Exact odds of `EvAdventureRollEngine.opposed_saving_throw`.
+
+    Args:
+        attack_bonus (int): The attacker's bonus in the attack Ability.
+        defense_bonus (int): The defender's bonus in the defense Ability.
+        advantage (bool): If the attacker has advantage.
+        disadvantage (bool): If the attacker has disadvantage.
+
+    Returns:
+        SaveOdds: The odds of the attacker succeeding.
+
+    """
+    return saving_throw_odds(attack_bonus, defense_bonus + 10, advantage, disadvantage)
+
+
+def character_saving_throw_odds(
+    character, throw_type, target, advantage=False, disadvantage=False
+):
+    """
+    Exact odds of a given character passing a saving throw.
+
+    Args:
+        character (EvAdventureCharacter): The one making the throw.
+        throw_type (Ability): A valid Ability bonus enum.
+        target (int): The target number to beat.
+        advantage (bool): If the character has advantage.
+        disadvantage (bool): If the character has disadvantage.
+
+    Returns:
+        SaveOdds: The odds of the throw.
+
+    """
+    bonus = getattr(character, throw_type.value, 1)
+    return saving_throw_odds(bonus, target, advantage, disadvantage)
@@ -0,0 +1,248 @@
+"""
+Attribute properties that don't touch the database for values that were never
+changed.
+
+Most items never change their `size`, `value` or `damage_roll` from what their
+typeclass says, yet every read of a normal `AttributeProperty` goes through the
+attribute handler. A `FastAttributeProperty` instead keeps:
+
+- a default table per typeclass, `{attrname: (bit, category, property)}`, built
+  once from the class, and
+- an override bitmap per object, with a bit set for every field that has its own
+  Attribute. It's worked out from the object's Attributes the first time it's
+  needed and then kept up to date on every write and delete.
+
+Reading a field whose bit is not set just returns the class default. Writing it
+stores an Attribute as usual and sets the bit, so later reads go to the database
+value.
+
+The bitmap can only be trusted if all Attribute changes are seen, so objects
+using these properties need the `OverrideTrackingAttributeHandler` as their
+`attributes` handler. On other objects the properties behave like plain
+`AttributeProperty`s.
+
+Since that handler sees every change anyway, it also gives the object a new
+attribute version on each one (see `attribute_version`), so anything worked out
+from an object's Attributes can be cached until the version moves on.
+
+"""
+
+from collections import namedtuple
+from itertools import count
+from enum import Enum
+from inspect import getattr_static
+
+from evennia import AttributeProperty
+from evennia.typeclasses.attributes import AttributeHandler
+
+# where the override bitmap is kept on the object
+_OVERRIDES = "_attribute_overrides"
+# where the attribute version is kept on the object
+_VERSION = "_attribute_version"
+# versions are handed out from one counter, so an object reloaded from the
+# database never gets a version it (or any other object) had before
+_VERSIONS = count(1)
+# the bitmap of objects we can't track; every field counts as overridden
+_ALL_OVERRIDDEN = -1
+# defaults of these types are safe to hand out without copying
+_IMMUTABLE = (int, float, str, bytes, tuple, frozenset, Enum, type(None))
+
+_TableEntry = namedtuple("_TableEntry", ("bit", "category", "prop"))
+_TABLES = {}
+
+
+def _clean_category(category):
+    return category.strip().lower() if category is not None else None
+
+
+def default_table(cls):
+    """
+    Get the default table of a typeclass.
+
+    Args:
+        cls (type): The typeclass.
+    Returns:
+        dict: A mapping `{attrname: (bit, category, property)}` for every
+            `FastAttributeProperty` on the class, keyed by lowercase Attribute key.
+
+    """
+    table = _TABLES.get(cls)
+    if table is None:
+        table = {}
+        for name in sorted(dir(cls)):
+            prop = getattr_static(cls, name, None)
+            if isinstance(prop, FastAttributeProperty):
+                table[prop._lookup_key] = _TableEntry(
+                    1 << len(table), _clean_category(prop._category), prop
+                )
+        _TABLES[cls] = table
+    return table
+
+
+def get_overrides(obj):
+    """
+    Get the override bitmap of an object, working it out if needed.
+
+    Args:
+        obj (Object): The object.
+    Returns:
+        int: A bitmap with the bits (from `default_table`) of all fields that
+            have their own Attribute set.
+
+    """
+    overrides = obj.__dict__.get(_OVERRIDES)
+    if overrides is None:
+        if not isinstance(obj.attributes, OverrideTrackingAttributeHandler):
+            overrides = _ALL_OVERRIDDEN
+        else:
+            overrides = 0
+            if obj.pk:
+                table = default_table(type(obj))
+                # this fetches (and caches) all the object's Attributes in one go
+                for attr in obj.attributes.all():
+                    entry = table.get(attr.key.lower())
+                    if entry and entry.category == attr.category:
+                        overrides |= entry.bit
+        obj.__dict__[_OVERRIDES] = overrides
+    return overrides
+
+
+def is_overridden(obj, key):
+    """
+    Check if a field has its own Attribute, without asking the database.
+
+    Args:
+        obj (Object): The object.
+        key (str): The Attribute key of a `FastAttributeProperty` field.
+    Returns:
+        bool or None: If the field is overridden, or None if that's not known
+            (yet) without a lookup.
+
+    """
+    overrides = obj.__dict__.get(_OVERRIDES)
+    entry = default_table(type(obj)).get(key.lower())
+    if overrides is None or overrides == _ALL_OVERRIDDEN or not entry:
+        return None
+    return bool(overrides & entry.bit)
+
+
+def mark_overridden(obj, key, category=None):
+    """
+    Note that a field now has its own Attribute.
+
+    """
+    overrides = obj.__dict__.get(_OVERRIDES)
+    if overrides is None:
+        # not worked out yet, so it will be seen when it is
+        return
+    entry = default_table(type(obj)).get(key.strip().lower())
+    if entry and entry.category == _clean_category(category):
+        obj.__dict__[_OVERRIDES] = overrides | entry.bit
+
+
+def reset_overrides(obj):
+    """
+    Forget the override bitmap, so it's worked out again on next use. Used when
+    Attributes are removed, since that's rare and more fiddly to follow.
+
+    """
+    obj.__dict__.pop(_OVERRIDES, None)
+
+
+def attribute_version(obj):
+    """
+    Get the attribute version of an object. It changes whenever any of the
+    object's Attributes are added, changed or removed.
+
+    Args:
+        obj (Object): The object.
+    Returns:
+        int or None: The version, or None if the object's Attribute changes
+            aren't tracked (it doesn't use `OverrideTrackingAttributeHandler`).
+
+    """
+    version = obj.__dict__.get(_VERSION)
+    if version is None:
+        if not isinstance(obj.attributes, OverrideTrackingAttributeHandler):
+            return None
+        version = obj.__dict__[_VERSION] = next(_VERSIONS)
+    return version
+
+
+def bump_attribute_version(obj):
+    """
+    Note that an object's Attributes changed, giving it a new attribute version.
+
+    """
+    if _VERSION in obj.__dict__:
+        obj.__dict__[_VERSION] = next(_VERSIONS)
+
+
+class FastAttributeProperty(AttributeProperty):
+    """
+    An `AttributeProperty` that returns its default without asking the attribute
+    handler, as long as the object doesn't have the Attribute set.
+
+    Defaults that are callable or mutable always go the normal way, since they
+    can't be shared between objects.
+
+    """
+
+    def __set_name__(self, cls, name):
+        super().__set_name__(cls, name)
+        self._lookup_key = self._key.lower()
+        self._fast = not callable(self._default) and isinstance(
+            self._default, _IMMUTABLE
+        )
+
+    def __get__(self, instance, owner):
+        if instance is None:
+            return self
+        if self._fast:
+            entry = default_table(type(instance)).get(self._lookup_key)
+            if entry and not get_overrides(instance) & entry.bit:
+                return self.at_get(self._default, instance)
+        return super().__get__(instance, owner)
+
+    def __set__(self, instance, value):
+        super().__set__(instance, value)
+        mark_overridden(instance, self._key, self._category)
+
+    def __delete__(self, instance):
+        super().__delete__(instance)
+        reset_overrides(instance)
+
+
+class OverrideTrackingAttributeHandler(AttributeHandler):
+    """
+    An attribute handler that keeps the override bitmap of its object in sync, for
+    use with `FastAttributeProperty`, and moves the object's attribute version on
+    with every change.
+
+    """
+
+    def add(self, key, value, category=None, *args, **kwargs):
+        super().add(key, value, category, *args, **kwargs)
+        bump_attribute_version(self.obj)
+        if key:
+            mark_overridden(self.obj, key, category)
+
+    def batch_add(self, *args, **kwargs):
+        super().batch_add(*args, **kwargs)
+        bump_attribute_version(self.obj)
+        reset_overrides(self.obj)
+
+    def remove(self, *args, **kwargs):
+        super().remove(*args, **kwargs)
+        bump_attribute_version(self.obj)
+        reset_overrides(self.obj)
+
+    def clear(self, *args, **kwargs):
+        super().clear(*args, **kwargs)
+        bump_attribute_version(self.obj)
+        reset_overrides(self.obj)
+
+    def reset_cache(self):
+        super().reset_cache()
+        bump_attribute_version(self.obj)
+        reset_overrides(self.obj)
@@ -1,4 +1,6 @@
-from random import randint
+from collections import OrderedDict
+from random import randint, choices
+from .dice import RollStream, compile_roll, compile_table
 from .enums import Ability
 
 death_table = (
@@ -10,33 +12,130 @@ death_table = (
     ("7", "perception"),
     ("8", "willpower"),
 )
+# compile up front, so a broken table is caught on import
+compile_table(death_table)
+
+# how many streams an engine keeps. When there are more, the one used the longest
+# time ago is dropped, in case its owner never called `drop_stream`
+ROLL_STREAM_LIMIT = 1000
 
 
 class EvAdventureRollEngine:
+    def __init__(self, rng=None):
+        """
+        Args:
+            rng (random.Random, optional): Where to get random numbers from, usually
+                a `RollStream`. If not given, the global `random` module is used.
+
+        """
+        self.rng = rng
+        # {key: engine}, least recently used first
+        self.streams = OrderedDict()
+
+    def _random_source(self):
+        """Get the `(randint, choices)` functions to roll with."""
+        rng = self.rng
+        if rng is None:
+            return randint, choices
+        return rng.randint, rng.choices
+
+    def stream(self, key, seed=None):
+        """
+        Get a roll engine with its own random stream, for a given character,
+        combat or session. The same key gives back the same engine until
+        `drop_stream` is called, so the engine doesn't need to be kept around
+        between rolls. Only the `ROLL_STREAM_LIMIT` most recently used streams
+        are kept.
+
+        Args:
+            key (str): An identifier for the stream, like a character's dbref.
+            seed (int or str, optional): Seed for a new stream. Unseeded streams
+                are seeded from the OS. Ignored if the stream already exists.
+        Returns:
+            EvAdventureRollEngine: An engine rolling from the stream.
+
+        """
+        streams = self.streams
+        engine = streams.get(key)
+        if engine is None:
+            engine = streams[key] = type(self)(rng=RollStream(seed))
+            if len(streams) > ROLL_STREAM_LIMIT:
+                streams.popitem(last=False)
+        else:
+            streams.move_to_end(key)
+        return engine
+
+    def drop_stream(self, key):
+        """
+        Forget about a stream, like when a combat is over.
+
+        Args:
+            key (str): The stream identifier.
+
+        """
+        self.streams.pop(key, None)
+
+    def snapshot(self):
+        """
+        Snapshot the state of this engine's random stream.
+
+        Returns:
+            tuple: A state to pass to `restore`.
+        Raises:
+            RuntimeError: If the engine uses the global random module.
+
+        """
+        if self.rng is None:
+            raise RuntimeError("Cannot snapshot an engine without its own stream.")
+        return self.rng.getstate()
+
+    def restore(self, snapshot):
+        """
+        Restore this engine's random stream to an earlier snapshot, so that the
+        same rolls will be repeated.
+
+        Args:
+            snapshot (tuple): A state returned from `snapshot`.
+        Raises:
+            RuntimeError: If the engine uses the global random module.
+
+        """
+        if self.rng is None:
+            raise RuntimeError("Cannot restore an engine without its own stream.")
+        self.rng.setstate(snapshot)
+
     def roll(self, roll_string):
         """
         Roll XdY dice, where X is the number of dice
         and Y the number of sides per die.
 
         Args:
-            roll_string (str): A dice string on the form XdY.
+            roll_string (str): A dice string on the form XdY. Modifiers ("2d6+3"),
+                keep-highest/lowest ("4d6kh3") and advantage ("1d20adv") are also
+                understood, see `game.dice`.
         Returns:
             int: The result of the roll.
 
         """
-        # split the XdY input on the 'd' one time
-        number, diesize = roll_string.split("d", 1)
+        # the string is only parsed the first time we see it, after that
+        # we get the cached plan back
+        return compile_roll(roll_string).roll(*self._random_source())
 
-        # convert from string to integers
-        number = int(number)
-        diesize = int(diesize)
+    def roll_many(self, roll_string, number):
+        """
+        Roll the same dice `number` times, like for a whole group of combatants
+        at once. All dice are drawn in one go, which is much faster than calling
+        `roll` in a loop.
 
-        # make the roll
-        rolls = []
-        for _ in range(number):
-            random_result = randint(1, diesize)
-            rolls.append(random_result)
-        return sum(rolls)
+        Args:
+            roll_string (str): A dice string, like for `roll`.
+            number (int): How many times to roll.
+        Returns:
+            list: A list of `number` results.
+
+        """
+        _, draw = self._random_source()
+        return compile_roll(roll_string).roll_many(number, draw)
 
     def roll_adv_disadv(self, advantage=False, disadvantage=False):
         if advantage and not disadvantage:
@@ -91,6 +190,65 @@ class EvAdventureRollEngine:
         # bool true if roll+bonus exceeds target
         return (dice_roll + bonus) > target, quality
 
+    def saving_throw_many(
+        self,
+        characters,
+        throw_type,
+        targets,
+        adv_mask=None,
+        disadv_mask=None,
+    ):
+        """
+        Do a saving throw for many characters at once. This gives the same odds as
+        calling `saving_throw` for each of them, but draws all d20s in one go.
+
+        Args:
+            characters (list): The EvAdventureCharacters making the throw.
+            throw_type (Ability): A valid Ability bonus enum.
+            targets (int or list): The target number to beat, either one for
+                everyone or one per character.
+            adv_mask (list, optional): One bool per character, if they have advantage.
+            disadv_mask (list, optional): One bool per character, if they have
+                disadvantage.
+
+        Returns:
+            tuple: A tuple of two lists `(successes, qualities)` with one entry per
+                character, like the tuples returned by `saving_throw`.
+
+        """
+        number = len(characters)
+        if isinstance(targets, int):
+            targets = [targets] * number
+        adv_mask = adv_mask or [False] * number
+        disadv_mask = disadv_mask or [False] * number
+
+        # two d20s for everyone, the second is only used with dis/advantage
+        _, draw = self._random_source()
+        dice_rolls = draw(range(1, 21), k=number * 2)
+
+        successes = []
+        qualities = []
+        ability = throw_type.value
+        for index, character in enumerate(characters):
+            dice_roll = dice_rolls[index * 2]
+            advantage, disadvantage = adv_mask[index], disadv_mask[index]
+            if advantage and not disadvantage:
+                dice_roll = max(dice_roll, dice_rolls[index * 2 + 1])
+            elif disadvantage and not advantage:
+                dice_roll = min(dice_roll, dice_rolls[index * 2 + 1])
+
+            quality = None
+            if dice_roll == 1:
+                quality = Ability.CRITICAL_FAILURE
+            elif dice_roll == 20:
+                quality = Ability.CRITICAL_SUCCESS
+
+            bonus = getattr(character, ability, 1)
+            successes.append((dice_roll + bonus) > targets[index])
+            qualities.append(quality)
+
+        return successes, qualities
+
     def opposed_saving_throw(
         self,
         attacker,
@@ -133,27 +291,11 @@ class EvAdventureRollEngine:
 
         Raises:
             RuntimeError: If rolling dice giving results outside the table.
+            ValueError: If the table has malformed or overlapping ranges.
 
         """
-        roll_result = self.roll(dieroll)
-
-        if isinstance(table_choices[0], (tuple, list)):
-            # the first element is a tuple/list; treat as on the form [("1-5", "item"),...]
-            for (valrange, choice) in table_choices:
-                minval, *maxval = valrange.split("-", 1)
-                minval = abs(int(minval))
-                maxval = abs(int(maxval[0]) if maxval else minval)
-
-                if minval <= roll_result <= maxval:
-                    return choice
-
-            # if we get here we must have set a dieroll producing a value
-            # outside of the table boundaries - raise error
-            raise RuntimeError("roll_random_table: Invalid die roll")
-        else:
-            # simple regular list
-            roll_result = max(1, min(len(table_choices), roll_result))
-            return table_choices[roll_result - 1]
+        # the table is compiled (and validated) the first time we see it
+        return compile_table(table_choices).get(self.roll(dieroll))
 
     def roll_death(self, EvAdventureCharacter):
         """
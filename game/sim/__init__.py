@@ -0,0 +1,12 @@
+"""
+Headless combat simulator, for balance runs without a database.
+
+Fighters are plain `CombatantRecord`s that mirror `EvAdventureCharacter` stats and
+loadout, fighting it out through the real roll engine in `game.rules`. See
+`game.sim.runner` for running fights at scale from the command line.
+
+"""
+
+from .combat import FightResult, run_fight
+from .records import CombatantRecord, WeaponRecord
+from .runner import simulate
@@ -0,0 +1,106 @@
+"""
+Running a single simulated fight.
+
+Every round, each fighter still standing attacks a random enemy with an opposed
+saving throw of their weapon's attack Ability against the defender's defense (for
+most weapons, the defender's armor). Hits deal the weapon's damage roll through
+`at_damage`. Fighters dropping to 0 HP are out of the fight and `at_defeat` is
+called, so player characters roll on the death table.
+
+"""
+
+from collections import Counter, namedtuple
+
+from ..enums import Ability
+
+# fights still going after this many rounds are called a draw
+MAX_ROUNDS = 100
+
+_ABILITIES = tuple(
+    ability.value
+    for ability in (
+        Ability.STR,
+        Ability.DEX,
+        Ability.END,
+        Ability.INT,
+        Ability.PER,
+        Ability.WIL,
+    )
+)
+
+FightResult = namedtuple(
+    "FightResult", ("winner", "rounds", "time_to_kill", "death_outcomes")
+)
+
+
+def _death_outcome(record, message, abilities):
+    """Sum up how a defeat went, for the outcome histogram."""
+    if message is None:
+        return "killed"
+    if message.startswith("You survive"):
+        for ability, before in zip(_ABILITIES, abilities):
+            if getattr(record, ability) != before:
+                return f"lost {ability}"
+        return "survived"
+    if message.startswith("You almost"):
+        return "dead from ability loss"
+    return "dead"
+
+
+def run_fight(fighters, engine, max_rounds=MAX_ROUNDS):
+    """
+    Fight it out until only one team is left standing.
+
+    Args:
+        fighters (list): The `CombatantRecord`s taking part. They are modified, so
+            pass copies if the originals should be kept.
+        engine (EvAdventureRollEngine): The roll engine to use for all rolls.
+        max_rounds (int): Stop the fight as a draw after this many rounds.
+    Returns:
+        FightResult: A named tuple `(winner, rounds, time_to_kill, death_outcomes)`,
+            where `winner` is the winning team (or None for a draw), `time_to_kill`
+            is a list of the round of each defeat and `death_outcomes` counts
+            how each defeat went.
+
+    """
+    for fighter in fighters:
+        fighter.dice = engine
+
+    time_to_kill = []
+    death_outcomes = Counter()
+    teams_left = {fighter.team for fighter in fighters}
+    rounds = 0
+
+    while len(teams_left) > 1 and rounds < max_rounds:
+        rounds += 1
+        for attacker in fighters:
+            if attacker.defeated:
+                continue
+            enemies = [
+                fighter
+                for fighter in fighters
+                if not fighter.defeated and fighter.team != attacker.team
+            ]
+            if not enemies:
+                break
+            defender = enemies[engine.roll(f"1d{len(enemies)}") - 1]
+            weapon = attacker.weapon
+
+            hit, _ = engine.opposed_saving_throw(
+                attacker, defender, weapon.attack_type, weapon.defend_type
+            )
+            if not hit:
+                continue
+
+            defender.at_damage(engine.roll(weapon.damage_roll), attacker=attacker)
+            if defender.hp <= 0:
+                defender.defeated = True
+                abilities = [getattr(defender, ability) for ability in _ABILITIES]
+                message = defender.at_defeat()
+                death_outcomes[_death_outcome(defender, message, abilities)] += 1
+                time_to_kill.append(rounds)
+
+        teams_left = {fighter.team for fighter in fighters if not fighter.defeated}
+
+    winner = next(iter(teams_left)) if len(teams_left) == 1 else None
+    return FightResult(winner, rounds, time_to_kill, death_outcomes)
@@ -0,0 +1,181 @@
+"""
+Plain, database-free stand-ins for characters and their gear.
+
+`CombatantRecord` carries the same stats as `EvAdventureCharacter` and uses the
+same `LivingMixin` hooks, with the loadout flattened to what
+`EquipmentHandler.armor` and `EquipmentHandler.weapon` would give.
+
+"""
+
+from ..enums import Ability
+from ..living import LivingMixin
+
+
+class WeaponRecord:
+    """The combat stats of a weapon."""
+
+    __slots__ = ("key", "attack_type", "defend_type", "damage_roll")
+
+    def __init__(
+        self,
+        key="Empty Hands",
+        attack_type=Ability.STR,
+        defend_type=Ability.ARMOR,
+        damage_roll="1d4",
+    ):
+        self.key = key
+        self.attack_type = attack_type
+        self.defend_type = defend_type
+        self.damage_roll = damage_roll
+
+    def __repr__(self):
+        return f"<WeaponRecord {self.key} {self.damage_roll}>"
+
+    def __getstate__(self):
+        return (self.key, self.attack_type, self.defend_type, self.damage_roll)
+
+    def __setstate__(self, state):
+        self.key, self.attack_type, self.defend_type, self.damage_roll = state
+
+    @classmethod
+    def from_weapon(cls, weapon):
+        """
+        Make a record from a weapon object, like `character.equipment.weapon`.
+
+        Args:
+            weapon (EvAdventureWeapon): The weapon to copy the stats of.
+        Returns:
+            WeaponRecord: The record.
+
+        """
+        return cls(
+            key=weapon.key,
+            attack_type=weapon.attack_type,
+            defend_type=getattr(weapon, "defend_type", Ability.ARMOR),
+            damage_roll=weapon.damage_roll,
+        )
+
+
+class CombatantRecord(LivingMixin):
+    """
+    A fighter in a simulated combat.
+
+    """
+
+    def __init__(
+        self,
+        key="combatant",
+        team=0,
+        is_pc=True,
+        strength=1,
+        dexterity=1,
+        endurance=1,
+        perception=1,
+        intelligence=1,
+        willpower=1,
+        armor=1,
+        weapon=None,
+        hp=8,
+        hp_max=8,
+        level=1,
+        xp=0,
+        coins=0,
+        morale=9,
+    ):
+        self.key = key
+        self.team = team
+        self.is_pc = is_pc
+        self.strength = strength
+        self.dexterity = dexterity
+        self.endurance = endurance
+        self.perception = perception
+        self.intelligence = intelligence
+        self.willpower = willpower
+        self.armor = armor
+        self.weapon = weapon or WeaponRecord()
+        self.hp = hp
+        self.hp_max = hp_max
+        self.level = level
+        self.xp = xp
+        self.coins = coins
+        self.morale = morale
+        # the roll engine used for this fighter's death rolls, set by the simulator
+        self.dice = None
+        self.defeated = False
+
+    def __repr__(self):
+        return f"<CombatantRecord {self.key} hp={self.hp}/{self.hp_max}>"
+
+    @classmethod
+    def from_character(cls, character, team=0):
+        """
+        Make a record from a real character, copying stats and loadout.
+
+        Args:
+            character (EvAdventureCharacter): The character to copy.
+            team (int): Which side of the fight the record is on.
+        Returns:
+            CombatantRecord: The record.
+
+        """
+        return cls(
+            key=character.key,
+            team=team,
+            is_pc=character.is_pc,
+            strength=character.strength,
+            dexterity=character.dexterity,
+            endurance=character.endurance,
+            perception=character.perception,
+            intelligence=character.intelligence,
+            willpower=character.willpower,
+            armor=character.equipment.armor,
+            weapon=WeaponRecord.from_weapon(character.equipment.weapon),
+            hp=character.hp,
+            hp_max=character.hp_max,
+            level=character.level,
+            xp=character.xp,
+            coins=character.coins,
+        )
+
+    def copy(self):
+        """Get a fresh copy of this record, to start a new fight with."""
+        record = object.__new__(type(self))
+        record.__dict__.update(self.__dict__)
+        return record
+
+    def msg(self, text=None, **kwargs):
+        """Records have no one to talk to."""
+        pass
+
+    def at_defeat(self):
+        """
+        Player characters roll on the death table, like `EvAdventureCharacter`.
+
+        Returns:
+            str or None: The death roll message, if one was made.
+
+        """
+        if self.is_pc:
+            return self.dice.roll_death(self)
+        super().at_defeat()
+
+    @classmethod
+    def from_dict(cls, data, team=0):
+        """
+        Make a record from a plain dict, like from a JSON scenario file. Abilities
+        are given by value, like `"attack_type": "strength"`.
+
+        Args:
+            data (dict): Keyword arguments for the record, where `weapon` is a dict
+                of keyword arguments for its `WeaponRecord`.
+            team (int): Which side of the fight the record is on.
+        Returns:
+            CombatantRecord: The record.
+
+        """
+        data = dict(data, team=team)
+        weapon = dict(data.pop("weapon", None) or {})
+        for field in ("attack_type", "defend_type"):
+            if field in weapon:
+                weapon[field] = Ability(weapon[field])
+        return cls(weapon=WeaponRecord(**weapon), **data)
@@ -0,0 +1,188 @@
+"""
+Running many simulated fights, spread over a pool of worker processes, and
+summing up the results.
+
+    python -m game.sim --team 3 --vs 4 --fights 100000 --seed 1 --output sim.json
+
+or with a scenario file, a JSON dict `{"teams": [[{record kwargs}, ...], ...]}`:
+
+    python -m game.sim --scenario raid.json --fights 100000
+
+"""
+
+import argparse
+import json
+import os
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+
+from ..dice import RollStream, derive_seed
+from ..rules import EvAdventureRollEngine
+from .combat import MAX_ROUNDS, run_fight
+from .records import CombatantRecord
+
+# fights per unit of work handed to a worker. Fixed, so that a seeded run gives
+# the same results regardless of the number of workers
+CHUNK_SIZE = 500
+
+
+def _run_chunk(teams, fights, seed, max_rounds):
+    """Run a chunk of fights in a worker and sum them up."""
+    engine = EvAdventureRollEngine(rng=RollStream(seed))
+    wins = Counter()
+    time_to_kill = Counter()
+    death_outcomes = Counter()
+    rounds = 0
+    for _ in range(fights):
+        fighters = [record.copy() for team in teams for record in team]
+        result = run_fight(fighters, engine, max_rounds=max_rounds)
+        wins[result.winner] += 1
+        rounds += result.rounds
+        time_to_kill.update(result.time_to_kill)
+        death_outcomes.update(result.death_outcomes)
+    return wins, rounds, time_to_kill, death_outcomes
+
+
+def _percentile(histogram, fraction):
+    """Get a percentile from a histogram `{value: count}`."""
+    total = sum(histogram.values())
+    if not total:
+        return None
+    threshold = fraction * total
+    seen = 0
+    for value in sorted(histogram):
+        seen += histogram[value]
+        if seen >= threshold:
+            return value
+
+
+def simulate(teams, fights=1000, workers=None, seed=None, max_rounds=MAX_ROUNDS):
+    """
+    Run many fights between teams and sum up the results.
+
+    Args:
+        teams (list): A list of teams, each a list of `CombatantRecord`s. The
+            records' `team` is set to their index in this list.
+        fights (int): How many fights to run.
+        workers (int, optional): Number of worker processes. Defaults to the
+            number of CPUs. With 1, everything runs in this process.
+        seed (int, optional): A seed to make the whole run reproducible.
+        max_rounds (int): Fights going on longer than this are a draw.
+    Returns:
+        dict: A report with win rates, time-to-kill statistics (in rounds) and a
+            histogram of how defeats went.
+
+    """
+    teams = [[record.copy() for record in team] for team in teams]
+    for index, team in enumerate(teams):
+        for record in team:
+            record.team = index
+
+    chunks = []
+    for index, start in enumerate(range(0, fights, CHUNK_SIZE)):
+        chunk_seed = None if seed is None else derive_seed(seed, index)
+        chunks.append((teams, min(CHUNK_SIZE, fights - start), chunk_seed, max_rounds))
+
+    start_time = time.perf_counter()
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or len(chunks) == 1:
+        results = [_run_chunk(*chunk) for chunk in chunks]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(_run_chunk, *zip(*chunks)))
+    elapsed = time.perf_counter() - start_time
+
+    wins, time_to_kill, death_outcomes = Counter(), Counter(), Counter()
+    rounds = 0
+    for chunk_wins, chunk_rounds, chunk_time_to_kill, chunk_outcomes in results:
+        wins.update(chunk_wins)
+        rounds += chunk_rounds
+        time_to_kill.update(chunk_time_to_kill)
+        death_outcomes.update(chunk_outcomes)
+
+    kills = sum(time_to_kill.values())
+    return {
+        "fights": fights,
+        "rounds": rounds,
+        "seed": seed,
+        "win_rates": {
+            str(team): wins[team] / fights if fights else 0
+            for team in range(len(teams))
+        },
+        "draw_rate": wins[None] / fights if fights else 0,
+        "time_to_kill": {
+            "mean": (
+                sum(value * count for value, count in time_to_kill.items()) / kills
+                if kills
+                else None
+            ),
+            "p50": _percentile(time_to_kill, 0.5),
+            "p90": _percentile(time_to_kill, 0.9),
+            "histogram": {
+                str(value): time_to_kill[value] for value in sorted(time_to_kill)
+            },
+        },
+        "death_outcomes": dict(death_outcomes.most_common()),
+        "elapsed": elapsed,
+        "rounds_per_minute": rounds / elapsed * 60 if elapsed else None,
+    }
+
+
+def main(args=None):
+    """Command-line entry point."""
+    parser = argparse.ArgumentParser(
+        prog="python -m game.sim", description="Run headless balance fights."
+    )
+    parser.add_argument(
+        "--scenario", help="JSON file with the teams to pit against each other"
+    )
+    parser.add_argument(
+        "--team", type=int, default=1, help="Size of team 0 (default 1)"
+    )
+    parser.add_argument("--vs", type=int, default=1, help="Size of team 1 (default 1)")
+    parser.add_argument("--fights", type=int, default=10000)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--max-rounds", type=int, default=MAX_ROUNDS)
+    parser.add_argument("--output", help="Write the JSON report to this file")
+    args = parser.parse_args(args)
+
+    if args.scenario:
+        with open(args.scenario) as scenario_file:
+            scenario = json.load(scenario_file)
+        teams = [
+            [CombatantRecord.from_dict(data, team=index) for data in team]
+            for index, team in enumerate(scenario["teams"])
+        ]
+    else:
+        teams = [
+            [CombatantRecord(key=f"team{index}-{num}") for num in range(size)]
+            for index, size in enumerate((args.team, args.vs))
+        ]
+
+    report = simulate(
+        teams,
+        fights=args.fights,
+        workers=args.workers,
+        seed=args.seed,
+        max_rounds=args.max_rounds,
+    )
+
+    if args.output:
+        with open(args.output, "w") as output_file:
+            json.dump(report, output_file, indent=2)
+
+    print(
+        f"{report['fights']} fights, {report['rounds']} rounds in {report['elapsed']:.2f}s"
+    )
+    print(f"{report['rounds_per_minute']:,.0f} rounds/minute")
+    for team, rate in report["win_rates"].items():
+        print(f"team {team} wins: {rate:.1%}")
+    print(f"draws: {report['draw_rate']:.1%}")
+    print(
+        f"time to kill (rounds): mean {report['time_to_kill']['mean']}, "
+        f"p50 {report['time_to_kill']['p50']}, p90 {report['time_to_kill']['p90']}"
+    )
+    for outcome, count in report["death_outcomes"].items():
+        print(f"  {outcome}: {count}")
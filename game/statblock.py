@@ -0,0 +1,207 @@
+"""
+The packed stat block of characters.
+
+A character's abilities, hp, hp_max and level are all read together (for saving
+throws, healing, slot counts), so rather than one Attribute each they're kept in
+a single Attribute holding a tuple:
+
+    (STAT_BLOCK_VERSION, strength, dexterity, endurance, intelligence, perception,
+     willpower, hp, hp_max, level)
+
+The block is a hot stat (see `game.hotstats`): it's loaded with one query, kept in
+memory, and changes are written in batches. The stats are still used by name,
+like `character.strength`, through `PackedStat` properties.
+
+Characters made before the block existed have an Attribute per stat. The first
+time such a character is loaded, those Attributes are packed into a block and
+removed.
+
+"""
+
+from inspect import getattr_static
+
+from evennia.utils.utils import make_iter
+
+from .hotstats import HOT_STATS, HotAttributeProperty, HotStatAttributeHandler
+
+STAT_BLOCK_VERSION = 1
+STAT_BLOCK_CATEGORY = "stats"
+
+# the stats in the block, in the order they're stored
+STAT_BLOCK_FIELDS = (
+    "strength",
+    "dexterity",
+    "endurance",
+    "intelligence",
+    "perception",
+    "willpower",
+    "hp",
+    "hp_max",
+    "level",
+)
+
+_DEFAULTS = {}
+
+
+def _default_block(cls):
+    """Get a stat block with the class defaults of all the stats"""
+    block = _DEFAULTS.get(cls)
+    if block is None:
+        block = _DEFAULTS[cls] = (STAT_BLOCK_VERSION,) + tuple(
+            getattr_static(cls, field).default for field in STAT_BLOCK_FIELDS
+        )
+    return block
+
+
+class StatBlockProperty(HotAttributeProperty):
+    """
+    The stat block itself, as a tuple. Usually used through the `PackedStat`s.
+
+    """
+
+    def __init__(self):
+        super().__init__(category=STAT_BLOCK_CATEGORY, autocreate=False)
+
+    def _load(self, instance):
+        block = getattr(instance, self.attrhandler_name).get(
+            self._key, category=self._category
+        )
+        if block is None:
+            return self._migrate(instance)
+        if block[0] != STAT_BLOCK_VERSION:
+            raise ValueError(f"Unknown stat block version {block[0]} on {instance}.")
+        return tuple(block)
+
+    def _migrate(self, instance):
+        """
+        Make the stat block of a new character, or of an old one from its separate
+        stat Attributes.
+
+        """
+        attributes = getattr(instance, self.attrhandler_name)
+        # this fetches all the Attributes in one go
+        legacy = {
+            attr.key.lower(): attr.value
+            for attr in attributes.all()
+            if attr.category is None and attr.key.lower() in STAT_BLOCK_FIELDS
+        }
+        block = _default_block(type(instance))
+        if legacy:
+            block = (STAT_BLOCK_VERSION,) + tuple(
+                legacy.get(field, default)
+                for field, default in zip(STAT_BLOCK_FIELDS, block[1:])
+            )
+        self.write(instance, block)
+        if legacy:
+            # removing packed stats through the handler would reset them in the block
+            HotStatAttributeHandler.remove(attributes, key=list(legacy))
+        return block
+
+
+class PackedStat:
+    """
+    A stat kept in the stat block, used like an `AttributeProperty`.
+
+    """
+
+    def __init__(self, default):
+        """
+        Args:
+            default (int): The value of the stat for new characters.
+
+        """
+        self.default = default
+
+    def __set_name__(self, cls, name):
+        self.name = name
+        # the first item of the block is its version
+        self.index = STAT_BLOCK_FIELDS.index(name) + 1
+
+    def __get__(self, instance, owner):
+        if instance is None:
+            return self
+        return instance.stat_block[self.index]
+
+    def __set__(self, instance, value):
+        block = instance.stat_block
+        instance.stat_block = block[: self.index] + (value,) + block[self.index + 1 :]
+
+
+class StatBlockAttributeHandler(HotStatAttributeHandler):
+    """
+    An attribute handler making the packed stats look like Attributes of their
+    own. Writes, like `obj.db.strength = 3` or `create_object(attributes=...)`, go
+    into the stat block and are written right away, like other Attribute writes.
+    Reads like `obj.db.hp` or `attributes.has("level")` come from the block, and
+    removing a packed stat sets it back to its default.
+
+    There's no actual Attribute for a packed stat, so getting one with
+    `return_obj=True` gives None.
+
+    """
+
+    def _is_packed(self, key, category):
+        if category is not None or not isinstance(key, str):
+            return False
+        key = key.strip().lower()
+        return key in STAT_BLOCK_FIELDS and isinstance(
+            getattr_static(type(self.obj), key, None), PackedStat
+        )
+
+    def add(self, key, value, category=None, *args, **kwargs):
+        if self._is_packed(key, category):
+            setattr(self.obj, key.strip().lower(), value)
+            HOT_STATS.flush(self.obj)
+        else:
+            super().add(key, value, category, *args, **kwargs)
+
+    def batch_add(self, *args, **kwargs):
+        packed = []
+        others = []
+        for tup in args:
+            category = tup[2] if len(tup) > 2 else None
+            (packed if self._is_packed(tup[0], category) else others).append(tup)
+        if others:
+            super().batch_add(*others, **kwargs)
+        if packed:
+            for tup in packed:
+                setattr(self.obj, tup[0].strip().lower(), tup[1])
+            HOT_STATS.flush(self.obj)
+
+    def get(self, key=None, default=None, category=None, return_obj=False, **kwargs):
+        keys = make_iter(key)
+        if return_obj or not any(self._is_packed(single, category) for single in keys):
+            return super().get(key, default, category, return_obj, **kwargs)
+        return_list = kwargs.pop("return_list", False)
+        values = []
+        for single in keys:
+            if self._is_packed(single, category):
+                values.append(getattr(self.obj, single.strip().lower()))
+            else:
+                values.extend(
+                    super().get(single, None, category, return_list=True, **kwargs)
+                )
+        if return_list:
+            return values or ([default] if default is not None else [])
+        return values[0] if len(values) == 1 else values or default
+
+    def has(self, key=None, category=None):
+        if self._is_packed(key, category):
+            return True
+        return super().has(key, category)
+
+    def remove(self, key=None, category=None, *args, **kwargs):
+        if key is None:
+            super().remove(key, category, *args, **kwargs)
+            return
+        packed = []
+        others = []
+        for single in make_iter(key):
+            (packed if self._is_packed(single, category) else others).append(single)
+        if others:
+            super().remove(others, category, *args, **kwargs)
+        if packed:
+            for single in packed:
+                name = single.strip().lower()
+                setattr(self.obj, name, getattr_static(type(self.obj), name).default)
+            HOT_STATS.flush(self.obj)
@@ -0,0 +1,35 @@
+from evennia.utils.test_resources import BaseEvenniaTestCase
+
+from ..benchmarks import harness
+
+
+class TestBenchmarkHarness(BaseEvenniaTestCase):
+    def test_measure(self):
+        result = harness.measure(lambda: [0] * 100, number=50)
+        self.assertEqual(result["number"], 50)
+        self.assertGreater(result["ops_per_sec"], 0)
+        self.assertLessEqual(result["p50_us"], result["p99_us"])
+        # the list itself is allocated on every call
+        self.assertGreater(result["alloc_bytes"], 0)
+
+    def test_compare(self):
+        baseline = {"results": {"a": {"ops_per_sec": 100}, "b": {"ops_per_sec": 100}}}
+        current = {
+            "results": {
+                "a": {"ops_per_sec": 95},
+                "b": {"ops_per_sec": 50},
+                "c": {"ops_per_sec": 10},
+            }
+        }
+        lines = []
+        self.assertEqual(
+            harness.compare(baseline, current, threshold=0.1, report=lines.append),
+            ["b"],
+        )
+        self.assertEqual(len(lines), 4)
+
+    def test_import_main(self):
+        # importing the command line entry point must not run it (or exit)
+        from ..benchmarks import __main__
+
+        self.assertTrue(callable(__main__.main))
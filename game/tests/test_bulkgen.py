@@ -0,0 +1,29 @@
+from evennia.utils.test_resources import BaseEvenniaTest
+
+from .. import bulkgen
+from ..characters import EvAdventureCharacter
+from ..chargen import TemporaryCharacterSheet
+from ..enums import WieldLocation
+
+
+class TestBulkgen(BaseEvenniaTest):
+    def test_roll_sheets(self):
+        records = bulkgen.roll_sheets(bulkgen.CHUNK_SIZE + 3, workers=1, seed=1)
+        self.assertEqual(len(records), bulkgen.CHUNK_SIZE + 3)
+        # the same seed gives the same sheets
+        self.assertEqual(bulkgen.roll_sheets(5, workers=1, seed=1), records[:5])
+        self.assertNotEqual(bulkgen.roll_sheets(5, workers=1, seed=2), records[:5])
+        # and they're proper sheets
+        sheet = TemporaryCharacterSheet.from_record(records[0])
+        self.assertIn("ration", sheet.backpack)
+
+    def test_create_characters(self):
+        records = bulkgen.roll_sheets(3, workers=1, seed=1)
+        self.assertEqual(bulkgen.create_characters(records, batch_size=2), 3)
+        characters = EvAdventureCharacter.objects.filter(
+            db_key__in=[record[1] for record in records]
+        )
+        self.assertEqual(characters.count(), 3)
+        character = characters.get(db_key=records[0][1])
+        self.assertEqual(character.strength, records[0][2])
+        self.assertEqual(len(character.equipment.slots[WieldLocation.BACKPACK]), 6)
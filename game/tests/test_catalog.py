@@ -0,0 +1,68 @@
+from evennia import DefaultRoom
+from evennia.utils import create
+from evennia.utils.test_resources import BaseEvenniaTest
+
+from .. import objects
+from ..catalog import CATALOG, ItemCatalog
+from ..enums import ObjType
+
+
+class TestCatalog(BaseEvenniaTest):
+    def setUp(self):
+        super().setUp()
+        # the test database starts over for every test, so the catalog must too
+        CATALOG.rebuild()
+        self.vault = create.create_object(DefaultRoom, key="vault")
+        self.shield = create.create_object(
+            objects.EvAdventureShield, key="buckler", location=self.vault
+        )
+        self.sword = create.create_object(
+            objects.EvAdventureWeapon, key="sword", location=self.vault
+        )
+        self.runestone = create.create_object(
+            objects.EvAdventureRuneStone, key="rune", location=self.vault
+        )
+        self.potion = create.create_object(
+            objects.EvAdventureConsumable, key="potion", location=self.room1
+        )
+
+    def test_find(self):
+        with self.assertNumQueries(0):
+            self.assertEqual(
+                CATALOG.find(obj_type=ObjType.WEAPON, location=self.vault),
+                [self.sword, self.runestone],
+            )
+            self.assertEqual(
+                CATALOG.find(obj_type=(ObjType.MAGIC, ObjType.WEAPON)),
+                [self.runestone],
+            )
+            self.assertEqual(
+                CATALOG.find(typeclass=objects.EvAdventureConsumable),
+                [self.potion],
+            )
+            self.assertEqual(CATALOG.find(location=self.room1), [self.potion])
+            self.assertEqual(CATALOG.find(obj_type="shield", location=self.room1), [])
+        # rooms and characters aren't items
+        self.assertNotIn(self.vault, CATALOG)
+        self.assertEqual(len(CATALOG), 4)
+        self.assertEqual(self.potion.search_shields(), [self.shield])
+
+    def test_move_delete(self):
+        self.sword.move_to(self.room1, quiet=True)
+        self.assertEqual(CATALOG.find(location=self.room1), [self.sword, self.potion])
+        self.assertEqual(
+            CATALOG.find(obj_type=ObjType.WEAPON, location=self.vault),
+            [self.runestone],
+        )
+        self.shield.delete()
+        self.assertEqual(CATALOG.find(obj_type=ObjType.SHIELD), [])
+
+        # building anew from the database gives the same catalog
+        rebuilt = ItemCatalog()
+        for criteria in (
+            {"location": self.room1},
+            {"location": self.vault},
+            {"obj_type": ObjType.WEAPON},
+            {},
+        ):
+            self.assertEqual(rebuilt.dbids(**criteria), CATALOG.dbids(**criteria))
@@ -0,0 +1,182 @@
+from unittest.mock import patch
+from evennia.objects.models import ObjectDB
+from evennia.prototypes.prototypes import save_prototype
+from evennia.utils.test_resources import BaseEvenniaTest
+
+from .. import chargen
+from ..enums import WieldLocation
+from ..objects import EvAdventureArmor, EvAdventureWeapon
+
+
+class TestChargen(BaseEvenniaTest):
+    def setUp(self):
+        super().setUp()
+        # the test database starts over for every test, so the prototypes must too
+        chargen.clear_kit_prototypes()
+
+    def test_temporary_character_sheet(self):
+        sheet = chargen.TemporaryCharacterSheet()
+        # abilities are the lowest of 3d6
+        for ability in chargen._ABILITIES.values():
+            self.assertIn(getattr(sheet, ability), range(1, 7))
+        self.assertIn(sheet.name, chargen.chargen_tables["name"])
+        self.assertEqual(len(sheet.backpack), 6)
+        self.assertIn(sheet.name, sheet.show_sheet())
+        self.assertNotEqual(sheet.armor, "no armor")
+        self.assertIn(sheet.helmet, ("helmet", None))
+        self.assertIn(sheet.shield, ("shield", None))
+
+    def test_apply(self):
+        sheet = chargen.TemporaryCharacterSheet()
+        sheet.weapon = "dagger"
+        sheet.armor = "gambeson"
+        sheet.shield = sheet.helmet = None
+        sheet.backpack = ["ration", "rope, 50ft"]
+
+        character = sheet.apply(self.account)
+
+        self.assertEqual(character.key, sheet.name)
+        self.assertEqual(character.intelligence, sheet.intelligence)
+        self.assertTrue(character.access(self.account, "puppet"))
+        self.assertFalse(character.access(self.account2, "puppet"))
+        weapon = character.equipment.slots[WieldLocation.WEAPON_HAND]
+        armor = character.equipment.slots[WieldLocation.BODY]
+        self.assertEqual((weapon.key, armor.key), ("dagger", "gambeson"))
+        self.assertIsInstance(weapon, EvAdventureWeapon)
+        self.assertIsInstance(armor, EvAdventureArmor)
+        self.assertEqual(
+            [item.key for item in character.equipment.slots[WieldLocation.BACKPACK]],
+            ["ration", "rope, 50ft"],
+        )
+        # the gear is carried, not floating around nowhere
+        self.assertEqual(
+            sorted(item.key for item in character.contents),
+            ["dagger", "gambeson", "ration", "rope, 50ft"],
+        )
+
+    def test_spawn_kit(self):
+        save_prototype(
+            {
+                "prototype_key": "dagger",
+                "typeclass": "game.objects.EvAdventureWeapon",
+                "key": "dagger",
+                "attrs": [("damage_roll", "1d4")],
+            }
+        )
+        kit = [("Dagger", "weapon"), ("rope", "backpack")]
+        weapon, rope = chargen.spawn_kit(kit, location=self.room1)
+        # a prototype is used if there is one
+        self.assertEqual((weapon.key, weapon.damage_roll), ("dagger", "1d4"))
+        self.assertEqual(rope.key, "rope")
+        self.assertEqual((weapon.location, rope.location), (self.room1, self.room1))
+        self.assertEqual(chargen.spawn_kit([]), [])
+
+        # only the items are looked up, and only once
+        with patch("game.chargen.search_prototype") as mock_search:
+            weapon, rope = chargen.spawn_kit(kit)
+            mock_search.assert_not_called()
+        self.assertEqual(weapon.damage_roll, "1d4")
+
+    def test_apply_atomic(self):
+        sheet = chargen.TemporaryCharacterSheet()
+        count = ObjectDB.objects.count()
+        # if anything goes wrong, nothing is left half-made
+        with patch("game.chargen.spawn_kit", side_effect=RuntimeError):
+            with self.assertRaises(RuntimeError):
+                sheet.apply()
+        self.assertEqual(ObjectDB.objects.count(), count)
+
+    def test_record(self):
+        sheet = chargen.TemporaryCharacterSheet()
+        sheet.name = "Bob"
+        record = sheet.to_record()
+        self.assertEqual(record[:2], (1, "Bob"))
+
+        copy = chargen.TemporaryCharacterSheet.from_record(record)
+        self.assertEqual(copy.to_record(), record)
+        self.assertEqual(copy.show_sheet(), sheet.show_sheet())
+        with self.assertRaises(ValueError):
+            chargen.TemporaryCharacterSheet.from_record((0,) + record[1:])
+
+    def test_show_sheet_cached(self):
+        sheet = chargen.TemporaryCharacterSheet()
+        with patch.object(
+            chargen.TemporaryCharacterSheet,
+            "_render_sheet",
+            autospec=True,
+            side_effect=lambda sheet: sheet.name,
+        ) as mock_render:
+            sheet.show_sheet()
+            sheet.show_sheet()
+            mock_render.assert_called_once()
+            sheet.name = "Alice"
+            self.assertEqual(sheet.show_sheet(), "Alice")
+            self.assertEqual(mock_render.call_count, 2)
+
+    @patch("game.chargen.EvMenu")
+    def test_resume(self, mock_evmenu):
+        chargen.start_chargen(self.account)
+        sheet = mock_evmenu.call_args.kwargs["tmp_character"]
+        chargen._update_name(self.account, "zed", tmp_character=sheet)
+
+        # after a reload, the same sheet comes back
+        chargen.start_chargen(self.account)
+        resumed = mock_evmenu.call_args.kwargs["tmp_character"]
+        self.assertIsNot(resumed, sheet)
+        self.assertEqual(resumed.to_record(), sheet.to_record())
+        self.assertEqual(resumed.name, "Zed")
+
+        chargen.clear_chargen(self.account)
+        self.assertIsNone(chargen.load_chargen(self.account))
+
+
+class TestSheetPool(BaseEvenniaTest):
+    @patch("game.chargen.delay")
+    def test_pool(self, mock_delay):
+        pool = chargen.SheetPool(depth=4, low_water=1, refill_batch=3)
+
+        # an empty pool rolls a sheet right away and starts refilling
+        self.assertIsInstance(pool.get(), chargen.TemporaryCharacterSheet)
+        mock_delay.assert_called_once_with(0, pool._refill_step)
+        pool.request_refill()
+        mock_delay.assert_called_once()
+
+        # the refill is done in batches
+        pool._refill_step()
+        self.assertEqual(len(pool), 3)
+        self.assertEqual(mock_delay.call_count, 2)
+        pool._refill_step()
+        self.assertEqual(len(pool), 4)
+        self.assertEqual(mock_delay.call_count, 2)
+
+        sheets = [pool.get() for _ in range(3)]
+        self.assertEqual(len(set(map(id, sheets))), 3)
+        self.assertEqual(len(pool), 1)
+        # running low starts another refill
+        self.assertEqual(mock_delay.call_count, 3)
+
+        metrics = pool.metrics()
+        self.assertEqual((metrics["hits"], metrics["misses"]), (3, 1))
+        self.assertEqual(metrics["hit_rate"], 0.75)
+        self.assertEqual(metrics["refills"], 1)
+        self.assertGreater(metrics["last_refill_latency"], 0)
+
+    @patch("game.chargen.delay")
+    def test_pool_off(self, mock_delay):
+        pool = chargen.SheetPool(depth=0)
+        pool.get()
+        pool.fill()
+        self.assertEqual(len(pool), 0)
+        mock_delay.assert_not_called()
+
+    @patch("game.chargen.EvMenu")
+    def test_start_chargen_reroll(self, mock_evmenu):
+        pool = chargen.SheetPool(depth=2)
+        pool.fill()
+        with patch("game.chargen.SHEET_POOL", pool):
+            chargen.start_chargen(self.char1)
+            sheet = mock_evmenu.call_args.kwargs["tmp_character"]
+            node, kwargs = chargen._reroll(self.char1, "", tmp_character=sheet)
+        self.assertEqual(node, "node_chargen")
+        self.assertIsNot(kwargs["tmp_character"], sheet)
+        self.assertEqual(pool.hits, 2)
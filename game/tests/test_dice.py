@@ -0,0 +1,144 @@
+from random import choices
+from unittest.mock import Mock
+from evennia.utils.test_resources import BaseEvenniaTestCase
+
+from .. import dice
+from ..tables import chargen_tables
+
+
+class TestDice(BaseEvenniaTestCase):
+    def test_compile_roll(self):
+        plan = dice.compile_roll("2d6+3")
+        self.assertEqual((plan.count, plan.sides, plan.modifier), (2, 6, 3))
+        self.assertTrue(plan.simple)
+
+        # no number of dice means one die
+        self.assertEqual(dice.compile_roll("d20").count, 1)
+
+        plan = dice.compile_roll("4d6kh3")
+        self.assertEqual((plan.keep, plan.keep_highest), (3, True))
+        self.assertFalse(plan.simple)
+
+        plan = dice.compile_roll("1d20dis-1")
+        self.assertTrue(plan.disadvantage)
+        self.assertEqual(plan.modifier, -1)
+
+    def test_compile_roll_is_cached(self):
+        # the same string gives back the very same plan
+        self.assertIs(dice.compile_roll("3d8"), dice.compile_roll("3d8"))
+
+    def test_compile_roll_invalid(self):
+        for roll_string in ("", "d", "2x6", "0d6", "2d0", "2d6kh3", "1d20+"):
+            with self.assertRaises(ValueError):
+                dice.compile_roll(roll_string)
+
+    def test_roll_draws_once(self):
+        # several dice are drawn with one call to the random source
+        randint, choices = Mock(), Mock(return_value=[2, 5, 6])
+        self.assertEqual(dice.compile_roll("3d6+1").roll(randint, choices), 14)
+        choices.assert_called_once_with(range(1, 7), k=3)
+        randint.assert_not_called()
+
+        # a single die uses randint
+        randint.return_value = 17
+        self.assertEqual(dice.compile_roll("1d20").roll(randint, choices), 17)
+
+    def test_roll_keep(self):
+        choices = Mock(return_value=[1, 5, 3, 6])
+        self.assertEqual(dice.compile_roll("4d6kh3").roll(None, choices), 14)
+        self.assertEqual(dice.compile_roll("4d6kl1").roll(None, choices), 1)
+
+    def test_roll_advantage(self):
+        # both attempts come out of the same draw
+        choices = Mock(return_value=[4, 16])
+        self.assertEqual(dice.compile_roll("1d20adv").roll(None, choices), 16)
+        self.assertEqual(dice.compile_roll("1d20dis").roll(None, choices), 4)
+        choices.assert_called_with(range(1, 21), k=2)
+
+    def test_roll_bounds(self):
+        plan = dice.compile_roll("4d6kh3+2")
+        self.assertEqual((plan.min_result, plan.max_result), (5, 20))
+        for _ in range(200):
+            self.assertTrue(5 <= plan.roll(None, choices) <= 20)
+
+    def test_roll_many(self):
+        # all rolls come out of one draw
+        choices = Mock(return_value=[1, 2, 3, 4, 5, 6])
+        self.assertEqual(dice.compile_roll("2d6").roll_many(3, choices), [3, 7, 11])
+        choices.assert_called_once_with(range(1, 7), k=6)
+
+        self.assertEqual(
+            dice.compile_roll("1d6+1").roll_many(6, choices), [2, 3, 4, 5, 6, 7]
+        )
+        self.assertEqual(dice.compile_roll("3d6kh1").roll_many(2, choices), [3, 6])
+        self.assertEqual(dice.compile_roll("1d6adv").roll_many(3, choices), [2, 4, 6])
+        self.assertEqual(dice.compile_roll("1d6dis").roll_many(3, choices), [1, 3, 5])
+
+    def test_compile_table(self):
+        table = [("1-2", "dead"), ("3", "strength"), ("4-6", "dexterity")]
+        compiled = dice.compile_table(table)
+        # the same table gives back the same compiled lookup
+        self.assertIs(dice.compile_table(table), compiled)
+
+        self.assertEqual(compiled.get(1), "dead")
+        self.assertEqual(compiled.get(3), "strength")
+        self.assertEqual(compiled.get(6), "dexterity")
+        with self.assertRaises(RuntimeError):
+            compiled.get(7)
+        with self.assertRaises(RuntimeError):
+            compiled.get(0)
+
+    def test_compile_table_simple(self):
+        # simple lists clamp the result to the table
+        compiled = dice.compile_table(["a", "b", "c"])
+        self.assertEqual(compiled.get(1), "a")
+        self.assertEqual(compiled.get(3), "c")
+        self.assertEqual(compiled.get(20), "c")
+
+    def test_compile_table_gaps(self):
+        compiled = dice.compile_table([("1", "a"), ("5-6", "b")])
+        self.assertEqual(compiled.get(5), "b")
+        with self.assertRaises(RuntimeError):
+            compiled.get(3)
+
+    def test_compile_table_invalid(self):
+        # broken tables are caught when compiled, not when rolled on
+        for table in (
+            [],
+            [("1-3", "a"), ("3-4", "b")],
+            [("1-x", "a")],
+            [("4-2", "a")],
+            [(None, "a")],
+        ):
+            with self.assertRaises(ValueError):
+                dice.compile_table(table)
+
+    def test_chargen_tables(self):
+        # every chargen table has an entry for every result of the die rolled on it
+        for name, table in chargen_tables.items():
+            sides = 282 if name == "name" else 20
+            compiled = dice.compile_table(table)
+            for roll_result in range(1, sides + 1):
+                compiled.get(roll_result)
+            if not compiled.ranged:
+                self.assertEqual(len(table), sides, name)
+
+    def test_roll_stream(self):
+        # the same seed gives the same rolls
+        stream1, stream2 = dice.RollStream(1234), dice.RollStream(1234)
+        plan = dice.compile_roll("3d6")
+        rolls = [plan.roll(stream1.randint, stream1.choices) for _ in range(10)]
+        self.assertEqual(
+            rolls, [plan.roll(stream2.randint, stream2.choices) for _ in range(10)]
+        )
+
+        # snapshot and replay
+        snapshot = stream1.snapshot()
+        rolls = plan.roll_many(10, stream1.choices)
+        stream1.restore(snapshot)
+        self.assertEqual(plan.roll_many(10, stream1.choices), rolls)
+
+    def test_derive_seed(self):
+        self.assertEqual(dice.derive_seed(1, "#5"), dice.derive_seed(1, "#5"))
+        self.assertNotEqual(dice.derive_seed(1, "#5"), dice.derive_seed(1, "#6"))
+        self.assertNotEqual(dice.derive_seed(1, "#5"), dice.derive_seed(2, "#5"))
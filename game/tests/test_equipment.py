@@ -1,3 +1,4 @@
+from unittest.mock import patch
 from evennia.utils import create
 from evennia.utils.test_resources import BaseEvenniaTest
 
@@ -5,6 +6,7 @@ from .. import objects
 from ..characters import EvAdventureCharacter, LivingMixin
 from ..enums import WieldLocation
 from .. import equipment
+from ..utils import get_obj_stats
 
 
 class TestEquipment(LivingMixin, BaseEvenniaTest):
@@ -58,6 +60,131 @@ class TestEquipment(LivingMixin, BaseEvenniaTest):
         self.character.equipment.add(self.helmet)
         self.assertEqual(self.character.equipment.count_slots(), 1)
 
+    def test_count_slots_running_total(self):
+        # the running total follows every change to the equipment
+        equipment = self.character.equipment
+        self.helmet.size = 2
+        equipment.add(self.helmet)
+        equipment.add(self.weapon)
+        equipment.add(self.shield)
+        self.assertEqual(equipment.count_slots(), 4)
+        equipment.move(self.helmet)
+        equipment.move(self.weapon)
+        self.assertEqual(equipment.count_slots(), 4)
+        equipment.drop(self.shield)
+        self.assertEqual(equipment.count_slots(), 3)
+        equipment.remove(WieldLocation.HEAD)
+        self.assertEqual(equipment.count_slots(), 1)
+        equipment.add(self.shield)
+        equipment.remove_all(WieldLocation.BACKPACK)
+        self.assertEqual(equipment.count_slots(), 1)
+        self.assertEqual(equipment.count_slots(), equipment.recount_slots())
+
+    @patch("game.equipment.logger.log_warn")
+    def test_count_slots_verify(self, mock_log_warn):
+        # changing an item behind the handler's back makes the total drift
+        equipment = self.character.equipment
+        equipment.add(self.helmet)
+        self.helmet.size = 3
+        self.assertEqual(equipment.count_slots(), 1)
+
+        equipment.verify_slot_usage = True
+        self.assertEqual(equipment.count_slots(), 3)
+        mock_log_warn.assert_called_once()
+
+    def test_storage(self):
+        # equipment is stored as dbrefs and comes back as objects
+        equipment = self.character.equipment
+        equipment.add(self.weapon)
+        equipment.move(self.weapon)
+        equipment.add(self.helmet)
+        self.assertEqual(
+            self.character.attributes.get("inventory_slots", category="inventory"),
+            (2, (self.weapon.id, None, None, None, None), (self.helmet.id,)),
+        )
+        reloaded = type(equipment)(self.character)
+        self.assertEqual(reloaded.slots[WieldLocation.WEAPON_HAND], self.weapon)
+        self.assertEqual(reloaded.slots[WieldLocation.BACKPACK], [self.helmet])
+
+        # deleted objects drop out
+        self.helmet.delete()
+        reloaded = type(equipment)(self.character)
+        self.assertEqual(reloaded.slots[WieldLocation.BACKPACK], [])
+
+    def test_storage_migration(self):
+        # the old format, a dict of objects, is converted when loaded
+        self.character.attributes.add(
+            "inventory_slots",
+            {
+                WieldLocation.WEAPON_HAND: self.weapon,
+                WieldLocation.SHIELD_HAND: None,
+                WieldLocation.TWO_HANDS: None,
+                WieldLocation.BODY: None,
+                WieldLocation.HEAD: self.helmet,
+                WieldLocation.BACKPACK: [self.shield],
+            },
+            category="inventory",
+        )
+        reloaded = type(self.character.equipment)(self.character)
+        self.assertEqual(reloaded.slots[WieldLocation.WEAPON_HAND], self.weapon)
+        self.assertEqual(reloaded.slots[WieldLocation.HEAD], self.helmet)
+        self.assertEqual(reloaded.slots[WieldLocation.BACKPACK], [self.shield])
+        self.assertEqual(
+            self.character.attributes.get("inventory_slots", category="inventory"),
+            (2, (self.weapon.id, None, None, None, self.helmet.id), (self.shield.id,)),
+        )
+
+    def _count_saves(self):
+        # patch the Attribute write, to count how often the equipment is saved
+        return patch.object(
+            self.character.attributes,
+            "add",
+            wraps=self.character.attributes.add,
+        )
+
+    def test_batch(self):
+        equipment = self.character.equipment
+        with self._count_saves() as mock_add:
+            with equipment.batch():
+                equipment.add(self.weapon)
+                equipment.move(self.weapon)
+                equipment.add(self.helmet)
+                # nothing is written until the block ends
+                mock_add.assert_not_called()
+            mock_add.assert_called_once()
+
+        # the changes made it to the database
+        reloaded = type(equipment)(self.character)
+        self.assertEqual(reloaded.slots[WieldLocation.WEAPON_HAND], self.weapon)
+        self.assertEqual(reloaded.slots[WieldLocation.BACKPACK], [self.helmet])
+
+    def test_batch_error(self):
+        # changes made before an error are still saved
+        equipment = self.character.equipment
+        with self.assertRaises(ValueError):
+            with equipment.batch():
+                equipment.add(self.weapon)
+                equipment.drop(self.helmet)
+        reloaded = type(equipment)(self.character)
+        self.assertEqual(reloaded.slots[WieldLocation.BACKPACK], [self.weapon])
+
+    @patch("game.equipment.delay")
+    def test_save_delay(self, mock_delay):
+        equipment = self.character.equipment
+        equipment.save_delay = 5
+        with self._count_saves() as mock_add:
+            equipment.add(self.weapon)
+            equipment.add(self.helmet)
+            # one delayed write is scheduled for both changes
+            mock_delay.assert_called_once_with(5, equipment.flush)
+            mock_add.assert_not_called()
+
+            # reloading the server writes it out
+            self.character.at_server_reload()
+            mock_add.assert_called_once()
+            self.character.at_server_reload()
+            mock_add.assert_called_once()
+
     def test_validate_slot_usage(self):
         # test that items are correctly evaluated in regard to their slot usage
         self.assertTrue(self.character.equipment.validate_slot_usage(self.helmet))
@@ -138,6 +265,42 @@ class TestEquipment(LivingMixin, BaseEvenniaTest):
         self.character.equipment.move(self.weapon)
         self.assertFalse(self.character.equipment.slots[WieldLocation.TWO_HANDS])
 
+    def test_move_replace_weapon(self):
+        # the weapon already in hand goes back to the backpack when replaced
+        self.character.equipment.add(self.weapon)
+        self.character.equipment.move(self.weapon)
+        axe = create.create_object(objects.EvAdventureWeapon, key="axe")
+        self.character.equipment.add(axe)
+        self.character.equipment.move(axe)
+        self.assertEqual(self.character.equipment.slots[WieldLocation.WEAPON_HAND], axe)
+        self.assertEqual(
+            self.character.equipment.slots[WieldLocation.BACKPACK], [self.weapon]
+        )
+
+    def test_move_replace_two_handed(self):
+        # a two-handed weapon already wielded goes back to the backpack when replaced
+        equipment = self.character.equipment
+        greatsword, halberd = (
+            create.create_object(objects.EvAdventureWeapon, key=key)
+            for key in ("greatsword", "halberd")
+        )
+        for weapon in (greatsword, halberd):
+            weapon.inventory_use_slot = WieldLocation.TWO_HANDS
+            equipment.add(weapon)
+            equipment.move(weapon)
+        self.assertEqual(equipment.slots[WieldLocation.TWO_HANDS], halberd)
+        self.assertEqual(equipment.slots[WieldLocation.BACKPACK], [greatsword])
+        # the running total still matches a recount
+        self.assertEqual(equipment.count_slots(), equipment._recount_slots())
+        self.assertEqual(equipment.count_slots(), 2)
+        # and the reverse map knows where both are
+        self.assertEqual(equipment.identify_slot(halberd), WieldLocation.TWO_HANDS)
+        self.assertEqual(equipment.identify_slot(greatsword), WieldLocation.BACKPACK)
+        self.assertEqual(equipment.locate(greatsword), (WieldLocation.BACKPACK, 0))
+        self.assertIn(
+            "Worn: [backpack]", get_obj_stats(greatsword, owner=self.character)
+        )
+
     def test_all(self):
         # test getting all items in inventory
         self.character.equipment.add(self.helmet)
@@ -168,6 +331,38 @@ class TestEquipment(LivingMixin, BaseEvenniaTest):
         self.assertIn("helmet : 2 slots", inv)
         self.assertIn("sord : 1 slots", inv)
 
+    def test_listing_prefetch(self):
+        handler = self.character.equipment
+        self.helmet.size = 2
+        self.weapon.inventory_use_slot = WieldLocation.TWO_HANDS
+        for item in (self.helmet, self.weapon, self.shield):
+            handler.add(item)
+
+        # one query for the whole backpack, then nothing until the next change
+        with self.assertNumQueries(1):
+            inv = handler.inventory()
+            wearable = handler.get_wearable_objects_from_backpack()
+            wieldable = handler.get_wieldable_objects_from_backpack()
+        self.assertIn("helmet : 2 slots", inv)
+        self.assertIn("sheeld : 1 slots", inv)
+        self.assertEqual(wearable, [self.helmet])
+        self.assertEqual(wieldable, [self.weapon, self.shield])
+
+        # a change fetches again
+        handler.drop(self.helmet)
+        self.assertNotIn("helmet", handler.inventory())
+
+        values = equipment.prefetch_attributes(
+            [self.helmet, self.weapon], equipment.LISTING_ATTRIBUTES
+        )
+        self.assertEqual(values[self.helmet.id]["size"], 2)
+        self.assertEqual(
+            values[self.helmet.id]["inventory_use_slot"], WieldLocation.HEAD
+        )
+        self.assertEqual(
+            values[self.weapon.id]["inventory_use_slot"], WieldLocation.TWO_HANDS
+        )
+
     def test_identify_slot(self):
         # tests identifying slot item is in
         self.character.equipment.add(self.helmet)
@@ -209,3 +404,117 @@ class TestEquipment(LivingMixin, BaseEvenniaTest):
         self.character.equipment.add(self.shield)
         res = self.character.equipment.get_wieldable_objects_from_backpack()
         self.assertTrue(res, [self.weapon, self.shield])
+
+    def test_backpack_indexes(self):
+        handler = self.character.equipment
+        potion = create.create_object(objects.EvAdventureConsumable, key="potion")
+        empty = create.create_object(
+            objects.EvAdventureConsumable, key="empty", attributes=(("uses", 0),)
+        )
+        for item in (self.weapon, self.helmet, potion, self.shield, empty):
+            handler.add(item)
+
+        # built once, then kept up to date without asking the database
+        handler.get_wearable_objects_from_backpack()
+        with self.assertNumQueries(0):
+            self.assertEqual(
+                handler.get_wieldable_objects_from_backpack(),
+                [self.weapon, self.shield],
+            )
+            self.assertEqual(handler.get_usable_objects_from_backpack(), [potion])
+
+        # wielding the shield takes it out of the backpack
+        handler.move(self.shield)
+        handler.move(self.helmet)
+        with self.assertNumQueries(0):
+            self.assertEqual(
+                handler.get_wieldable_objects_from_backpack(), [self.weapon]
+            )
+            self.assertEqual(handler.get_wearable_objects_from_backpack(), [])
+
+        # a new shield puts the old one back in the backpack
+        shield2 = create.create_object(objects.EvAdventureShield, key="shield2")
+        handler.add(shield2)
+        handler.move(shield2)
+        self.assertEqual(
+            handler.get_wieldable_objects_from_backpack(), [self.weapon, self.shield]
+        )
+        handler.drop(potion)
+        self.assertEqual(handler.get_usable_objects_from_backpack(), [])
+        handler.remove_all(WieldLocation.BACKPACK)
+        self.assertEqual(handler.get_wieldable_objects_from_backpack(), [])
+
+    def test_stats(self):
+        handler = self.character.equipment
+        # no weapon means fighting with the shared empty hand
+        stats = handler.stats
+        self.assertIs(stats.weapon_stats, objects.EMPTY_HAND)
+        self.assertEqual((stats.armor, stats.damage_roll), (1, "1d4"))
+        self.assertIs(handler.weapon, handler.weapon)
+        with self.assertRaises(AttributeError):
+            handler.weapon_stats.damage_roll = "1d100"
+        # the weapon itself is always an object, even without one in hand
+        self.assertIs(handler.weapon, objects.get_empty_hand())
+        with self.assertRaises(AttributeError):
+            handler.weapon.damage_roll = "1d100"
+        self.assertIn("Empty Hands", get_obj_stats(handler.weapon, owner=self.character))
+
+        # nothing is looked up again until the loadout changes
+        with self.assertNumQueries(0):
+            self.assertIs(handler.stats, stats)
+        # and it's the same one after a recompute, not a fresh object each time
+        handler._stats = None
+        self.assertIs(handler.weapon, objects.get_empty_hand())
+
+        self.weapon.damage_roll = "1d10"
+        self.shield.armor = 2
+        for item in (self.weapon, self.shield):
+            handler.add(item)
+            handler.move(item)
+        self.assertEqual(handler.weapon, self.weapon)
+        self.assertEqual(handler.weapon_stats, self.weapon.stat_view())
+        self.assertEqual(handler.armor, 3)
+        self.assertEqual(handler.stats.damage_roll, "1d10")
+
+        # changing a worn item changes the stats too
+        stats = handler.stats
+        with self.assertNumQueries(0):
+            self.assertIs(handler.stats, stats)
+        self.weapon.damage_roll = "2d6"
+        self.shield.armor = 3
+        self.assertEqual(handler.stats.damage_roll, "2d6")
+        self.assertEqual(handler.armor, 4)
+
+        handler.remove(WieldLocation.SHIELD_HAND)
+        self.assertEqual(handler.armor, 1)
+
+    def test_locate(self):
+        handler = self.character.equipment
+        for item in (self.helmet, self.weapon, self.shield):
+            handler.add(item)
+        self.assertEqual(handler.locate(self.shield), (WieldLocation.BACKPACK, 2))
+        self.assertEqual(handler.identify_slot(self.helmet), WieldLocation.BACKPACK)
+        self.assertIn(self.weapon, handler)
+
+        handler.move(self.weapon)
+        self.assertEqual(handler.locate(self.weapon), (WieldLocation.WEAPON_HAND, None))
+        self.assertEqual(handler.locate(self.shield), (WieldLocation.BACKPACK, 1))
+        handler.drop(self.helmet)
+        self.assertNotIn(self.helmet, handler)
+        self.assertIsNone(handler.identify_slot(self.helmet))
+        self.assertEqual(handler.locate(self.shield), (WieldLocation.BACKPACK, 0))
+        with self.assertRaises(ValueError):
+            handler.drop(self.helmet)
+
+        # the map agrees with a fresh one
+        where = dict(handler._locations())
+        handler.refresh_listing()
+        self.assertEqual(handler._locations(), where)
+
+        # things leaving the character are taken out wherever they are
+        handler.removed(self.weapon)
+        handler.removed(self.shield)
+        handler.removed(self.helmet)
+        self.assertEqual(handler.slots[WieldLocation.BACKPACK], [])
+        self.assertNotIn(self.weapon, handler)
+        self.assertIsNone(handler.slots[WieldLocation.WEAPON_HAND])
@@ -0,0 +1,131 @@
+from random import Random
+from unittest.mock import patch
+
+from evennia.objects.models import ObjectDB
+from evennia.typeclasses.attributes import Attribute
+from evennia.utils import create
+from evennia.utils.idmapper.models import flush_cache
+from evennia.utils.test_resources import BaseEvenniaTest
+
+from ..characters import EvAdventureCharacter
+from ..hotstats import HOT_STATS
+from ..statblock import STAT_BLOCK_FIELDS
+
+
+def _stored(obj, key):
+    """The value of a stat as it is in the database"""
+    if key in STAT_BLOCK_FIELDS:
+        block = Attribute.objects.get(objectdb=obj, db_key="stat_block").value
+        return block[STAT_BLOCK_FIELDS.index(key) + 1]
+    return Attribute.objects.get(objectdb=obj, db_key=key).value
+
+
+class TestHotStats(BaseEvenniaTest):
+    def setUp(self):
+        super().setUp()
+        HOT_STATS.flush()
+        self.character = create.create_object(EvAdventureCharacter, key="testchar")
+        self.other = create.create_object(EvAdventureCharacter, key="other")
+
+    def test_coalescing(self):
+        self.assertEqual(self.character.hp, 8)
+        self.assertFalse(HOT_STATS.is_dirty(self.character))
+        with self.assertNumQueries(0):
+            for _ in range(5):
+                self.character.at_damage(1)
+            self.assertEqual(self.character.hp, 3)
+        self.assertTrue(HOT_STATS.is_dirty(self.character))
+        self.assertEqual(_stored(self.character, "hp"), 8)
+
+        # five changes, one write
+        updates, writes = HOT_STATS.updates, HOT_STATS.writes
+        self.assertEqual(HOT_STATS.flush(), 1)
+        self.assertEqual(_stored(self.character, "hp"), 3)
+        self.assertEqual(HOT_STATS.writes - writes, 1)
+        self.assertEqual(HOT_STATS.updates, updates)
+        self.assertEqual(HOT_STATS.metrics()["pending"], 0)
+
+    def test_direct_writes(self):
+        self.character.coins = 10
+        # writing the Attribute directly wins over the unwritten change
+        self.character.db.coins = 3
+        self.assertFalse(HOT_STATS.is_dirty(self.character))
+        self.assertEqual(self.character.coins, 3)
+        self.character.attributes.remove("coins")
+        self.assertEqual(self.character.coins, 0)
+
+        self.character.xp = 5
+        self.character.delete()
+        self.assertEqual(HOT_STATS.flush(), 0)
+
+    def test_unpuppet_and_cache_flush(self):
+        self.character.xp = 10
+        self.character.at_post_unpuppet()
+        self.assertEqual(_stored(self.character, "xp"), 10)
+
+        self.character.xp = 20
+        self.character.flush_from_cache()
+        self.assertEqual(_stored(self.character, "xp"), 20)
+        reloaded = ObjectDB.objects.get(id=self.character.id)
+        self.assertIsInstance(reloaded, EvAdventureCharacter)
+        self.assertEqual(reloaded.xp, 20)
+
+    @patch("game.rules.EvAdventureRollEngine.roll")
+    def test_accounting_across_reload(self, mock_roll):
+        """
+        Hammer two characters with random changes, then reload. Every change must
+        end up in the database.
+
+        """
+        from server.conf.at_server_startstop import at_server_stop
+
+        rng = Random(1)
+        mock_roll.side_effect = lambda roll_string: rng.randint(1, 10)
+        chars = (self.character, self.other)
+        expected = {char.id: {"hp": 8, "coins": 0, "xp": 0} for char in chars}
+        for char in chars:
+            char.hp_max = 1000
+            char.hp = 500
+            char.coins = 500
+            expected[char.id].update(hp=500, coins=500)
+
+        for _ in range(500):
+            char, other = rng.sample(chars, 2)
+            stats, other_stats = expected[char.id], expected[other.id]
+            action = rng.randrange(5)
+            amount = rng.randint(1, 20)
+            if action == 0:
+                char.at_damage(amount)
+                stats["hp"] -= amount
+            elif action == 1:
+                char.heal(amount)
+                stats["hp"] = min(1000, stats["hp"] + amount)
+            elif action == 2:
+                paid = char.at_pay(amount)
+                self.assertEqual(paid, min(amount, stats["coins"]))
+                stats["coins"] -= paid
+            elif action == 3:
+                coins = char.coins
+                char.at_looted(other)
+                stolen = coins - char.coins
+                stats["coins"] -= stolen
+                other_stats["coins"] += stolen
+            else:
+                char.xp += amount
+                stats["xp"] += amount
+
+        # only a few writes for hundreds of changes
+        self.assertGreater(HOT_STATS.updates, 500)
+        self.assertLessEqual(len(HOT_STATS), 6)
+
+        # a reload: the server stops, and everything is loaded anew from the database
+        at_server_stop()
+        flush_cache()
+        for char in chars:
+            reloaded = ObjectDB.objects.get(id=char.id)
+            self.assertEqual(
+                {key: getattr(reloaded, key) for key in ("hp", "coins", "xp")},
+                expected[char.id],
+            )
+            for key, value in expected[char.id].items():
+                self.assertEqual(_stored(reloaded, key), value)
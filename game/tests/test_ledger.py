@@ -0,0 +1,104 @@
+from unittest.mock import patch
+
+from evennia.typeclasses.attributes import Attribute
+from evennia.utils import create
+from evennia.utils.test_resources import BaseEvenniaTest
+
+from ..characters import EvAdventureCharacter
+from ..hotstats import HOT_STATS
+from ..ledger import LEDGER, LedgerEntry
+
+
+def _stored_coins(obj):
+    return Attribute.objects.get(objectdb=obj, db_key="coins").value
+
+
+class TestLedger(BaseEvenniaTest):
+    def setUp(self):
+        super().setUp()
+        LEDGER.apply()
+        HOT_STATS.flush()
+        self.thief = create.create_object(EvAdventureCharacter, key="thief")
+        self.mark = create.create_object(EvAdventureCharacter, key="mark")
+        self.mark.db.coins = 20
+
+    def test_transfer(self):
+        self.assertEqual(LEDGER.transfer(self.mark, self.thief, 30), 20)
+        self.assertEqual((self.mark.coins, self.thief.coins), (0, 20))
+        self.assertEqual(LEDGER.transfer(self.mark, self.thief, 5), 0)
+        self.assertEqual(len(LEDGER), 1)
+        # nothing is written until the ledger is applied
+        self.assertEqual(_stored_coins(self.mark), 20)
+
+        self.assertEqual(LEDGER.apply(), 1)
+        self.assertEqual((_stored_coins(self.mark), _stored_coins(self.thief)), (0, 20))
+        self.assertEqual(
+            LEDGER.history[-1], LedgerEntry(self.mark.id, self.thief.id, 20)
+        )
+
+        # coins from nowhere, and to nowhere
+        LEDGER.transfer(None, self.mark, 7)
+        self.assertEqual(self.mark.at_pay(3), 3)
+        LEDGER.apply()
+        self.assertEqual(_stored_coins(self.mark), 4)
+        self.assertEqual(LEDGER.history[-1], LedgerEntry(self.mark.id, None, 3))
+        with self.assertRaises(ValueError):
+            LEDGER.transfer(self.mark, self.thief, -1)
+
+    def test_transfer_many(self):
+        raiders = [
+            create.create_object(EvAdventureCharacter, key=f"raider{num}")
+            for num in range(10)
+        ]
+        boss = self.mark
+        boss.db.coins = 95
+        moved = LEDGER.transfer_many((boss, raider, 10) for raider in raiders)
+        self.assertEqual(moved, [10] * 9 + [5])
+        self.assertEqual(boss.coins, 0)
+
+        # one batch, one write per party
+        writes, batches = HOT_STATS.writes, LEDGER.batches
+        self.assertEqual(LEDGER.apply(), 10)
+        self.assertEqual(HOT_STATS.writes - writes, 11)
+        self.assertEqual(LEDGER.batches - batches, 1)
+        self.assertEqual(sum(_stored_coins(raider) for raider in raiders), 95)
+
+    @patch("game.rules.EvAdventureRollEngine.roll")
+    def test_looting(self, mock_roll):
+        mock_roll.return_value = 7
+        self.thief.at_do_loot(self.mark)
+        self.assertEqual((self.mark.coins, self.thief.coins), (13, 7))
+        self.assertEqual(
+            LEDGER._pending[-1], LedgerEntry(self.mark.id, self.thief.id, 7)
+        )
+
+        # logging out writes both sides
+        self.thief.at_post_unpuppet()
+        self.assertEqual(len(LEDGER), 0)
+        self.assertEqual((_stored_coins(self.mark), _stored_coins(self.thief)), (13, 7))
+
+    def test_write_one_side(self):
+        # writing one side of a transfer for another reason writes the other too
+        LEDGER.transfer(self.mark, self.thief, 5)
+        self.mark.db.strength = 3
+        self.assertEqual(len(LEDGER), 0)
+        self.assertEqual((_stored_coins(self.mark), _stored_coins(self.thief)), (15, 5))
+        self.assertEqual(LEDGER.history[-1], LedgerEntry(self.mark.id, self.thief.id, 5))
+
+    def test_write_linked(self):
+        fence = create.create_object(EvAdventureCharacter, key="fence")
+        bystander = create.create_object(EvAdventureCharacter, key="bystander")
+        LEDGER.transfer(self.mark, self.thief, 10)
+        LEDGER.transfer(self.thief, fence, 4)
+        LEDGER.transfer(None, bystander, 2)
+
+        # everyone the thief traded with, and who they traded with, is written
+        HOT_STATS.flush(fence)
+        self.assertEqual(
+            [_stored_coins(obj) for obj in (self.mark, self.thief, fence)], [10, 6, 4]
+        )
+        # but not the others, like when a character is dropped from the cache
+        self.assertEqual(LEDGER._pending, [LedgerEntry(None, bystander.id, 2)])
+        self.thief.at_idmapper_flush()
+        self.assertEqual(len(LEDGER), 1)
+        self.assertEqual(_stored_coins(bystander), 0)
@@ -1,8 +1,11 @@
 from unittest.mock import Mock, patch
 from evennia.utils import create
 from evennia.utils.test_resources import BaseEvenniaTest
+from dataclasses import FrozenInstanceError
+from .. import objects
 from ..objects import EvAdventureConsumable
 from ..characters import EvAdventureCharacter
+from ..enums import Ability, WieldLocation
 
 
 class TestObjects(BaseEvenniaTest):
@@ -26,5 +29,32 @@ class TestObjects(BaseEvenniaTest):
 
         self.assertTrue(result.startswith("testconsum"))
 
+    def test_stat_views(self):
+        weapon = create.create_object(objects.EvAdventureWeapon, key="axe")
+        weapon.damage_roll = "1d8"
+        shield = create.create_object(objects.EvAdventureShield, key="buckler")
+        shield.armor = 2
+
+        with self.assertNumQueries(1):
+            views = objects.get_stat_views([weapon, shield, self.consumable])
+        self.assertEqual(
+            views[weapon.id],
+            objects.WeaponStats(
+                "axe", WieldLocation.WEAPON_HAND, 3, Ability.STR, Ability.ARMOR, "1d8"
+            ),
+        )
+        self.assertEqual(
+            views[shield.id],
+            objects.ArmorStats("buckler", WieldLocation.SHIELD_HAND, 3, 2),
+        )
+        # consumables have no combat stats
+        self.assertNotIn(self.consumable.id, views)
+
+        # views are copies that can't be changed
+        with self.assertRaises(FrozenInstanceError):
+            views[weapon.id].damage_roll = "1d12"
+        self.assertEqual(weapon.stat_view(), views[weapon.id])
+        self.assertIs(objects.WeaponEmptyHand().stat_view(), objects.EMPTY_HAND)
+
 
 # pretty much all these is here for now lol
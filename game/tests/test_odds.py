@@ -0,0 +1,69 @@
+from fractions import Fraction
+from itertools import product
+from evennia.utils.test_resources import BaseEvenniaTestCase
+
+from .. import odds
+from ..enums import Ability
+
+
+class TestOdds(BaseEvenniaTestCase):
+    def _brute_force(self, number, sides, total):
+        # the distribution worked out by trying every possible roll
+        outcomes = list(product(range(1, sides + 1), repeat=number))
+        counts = {}
+        for dice in outcomes:
+            value = total(dice)
+            counts[value] = counts.get(value, 0) + 1
+        return {value: Fraction(count, len(outcomes)) for value, count in counts.items()}
+
+    def test_pmf(self):
+        self.assertEqual(odds.pmf("2d6+1"), self._brute_force(2, 6, lambda d: sum(d) + 1))
+        self.assertEqual(
+            odds.pmf("4d6kh3"), self._brute_force(4, 6, lambda d: sum(sorted(d)[1:]))
+        )
+        self.assertEqual(
+            odds.pmf("3d4kl1"), self._brute_force(3, 4, lambda d: min(d))
+        )
+        self.assertEqual(odds.pmf("1d20adv"), self._brute_force(2, 20, max))
+        self.assertEqual(odds.pmf("1d20dis"), self._brute_force(2, 20, min))
+        self.assertEqual(sum(odds.pmf("3d8").values()), 1)
+
+    def test_saving_throw_odds(self):
+        # need more than 13 on the d20
+        result = odds.saving_throw_odds(2, 15)
+        self.assertEqual(result.success, Fraction(7, 20))
+        self.assertEqual(result.critical_success, Fraction(1, 20))
+        self.assertEqual(result.critical_failure, Fraction(1, 20))
+
+        # with advantage, fail only if both dice fail
+        result = odds.saving_throw_odds(2, 15, advantage=True)
+        self.assertEqual(result.success, 1 - Fraction(13, 20) ** 2)
+        self.assertEqual(result.critical_failure, Fraction(1, 400))
+
+        # with disadvantage, both dice have to succeed
+        result = odds.saving_throw_odds(2, 15, disadvantage=True)
+        self.assertEqual(result.success, Fraction(7, 20) ** 2)
+
+        # advantage and disadvantage cancel out
+        self.assertEqual(
+            odds.saving_throw_odds(2, 15, True, True), odds.saving_throw_odds(2, 15)
+        )
+
+        # impossible and certain throws
+        self.assertEqual(odds.saving_throw_odds(0, 20).success, 0)
+        self.assertEqual(odds.saving_throw_odds(0, 0).success, 1)
+
+    def test_opposed_saving_throw_odds(self):
+        # beating 10 + defense
+        self.assertEqual(
+            odds.opposed_saving_throw_odds(3, 2), odds.saving_throw_odds(3, 12)
+        )
+
+    def test_character_saving_throw_odds(self):
+        class Character:
+            strength = 4
+
+        self.assertEqual(
+            odds.character_saving_throw_odds(Character, Ability.STR, 14).success,
+            Fraction(10, 20),
+        )
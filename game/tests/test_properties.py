@@ -0,0 +1,81 @@
+from unittest.mock import patch
+from evennia.utils import create
+from evennia.utils.test_resources import BaseEvenniaTest
+
+from .. import objects, properties
+from ..enums import Ability
+
+
+class TestFastAttributeProperty(BaseEvenniaTest):
+    def setUp(self):
+        super().setUp()
+        self.weapon = create.create_object(objects.EvAdventureWeapon, key="axe")
+
+    def test_default_table(self):
+        table = properties.default_table(objects.EvAdventureWeapon)
+        self.assertEqual(
+            sorted(table),
+            [
+                "attack_type",
+                "damage_roll",
+                "defend_type",
+                "inventory_use_slot",
+                "quality",
+                "size",
+                "value",
+            ],
+        )
+        # each field gets its own bit
+        self.assertEqual(len({entry.bit for entry in table.values()}), len(table))
+        # armor's use-slot is a plain class property, so it's not in the table
+        self.assertNotIn(
+            "inventory_use_slot", properties.default_table(objects.EvAdventureArmor)
+        )
+
+    def test_defaults(self):
+        # the bitmap is worked out once, then defaults don't go near the handler
+        self.assertEqual(self.weapon.damage_roll, "1d6")
+        with patch.object(self.weapon.attributes, "get") as mock_get:
+            with self.assertNumQueries(0):
+                self.assertEqual(self.weapon.damage_roll, "1d6")
+                self.assertEqual(self.weapon.size, 1)
+            mock_get.assert_not_called()
+
+    def test_overrides(self):
+        self.assertEqual(self.weapon.quality, 3)
+        self.weapon.quality = 2
+        self.assertEqual(self.weapon.quality, 2)
+        self.assertTrue(properties.is_overridden(self.weapon, "quality"))
+
+        # writes not going through the property are seen too
+        self.weapon.db.damage_roll = "2d6"
+        self.assertEqual(self.weapon.damage_roll, "2d6")
+        self.weapon.attributes.remove("damage_roll")
+        self.assertEqual(self.weapon.damage_roll, "1d6")
+
+        # a fresh bitmap is worked out from the database
+        properties.reset_overrides(self.weapon)
+        self.assertIsNone(properties.is_overridden(self.weapon, "quality"))
+        self.assertEqual((self.weapon.quality, self.weapon.damage_roll), (2, "1d6"))
+        self.assertFalse(properties.is_overridden(self.weapon, "damage_roll"))
+
+        del self.weapon.quality
+        self.assertEqual(self.weapon.quality, 3)
+
+    def test_created_with_attributes(self):
+        weapon = create.create_object(
+            objects.EvAdventureWeapon, key="mace", attributes=(("damage_roll", "1d8"),)
+        )
+        self.assertEqual(weapon.damage_roll, "1d8")
+        self.assertEqual(weapon.attack_type, Ability.STR)
+
+    def test_attribute_version(self):
+        version = properties.attribute_version(self.weapon)
+        self.assertEqual(properties.attribute_version(self.weapon), version)
+        self.weapon.quality = 2
+        self.assertNotEqual(properties.attribute_version(self.weapon), version)
+        version = properties.attribute_version(self.weapon)
+        self.weapon.attributes.remove("quality")
+        self.assertNotEqual(properties.attribute_version(self.weapon), version)
+        # objects whose Attribute changes aren't tracked have no version
+        self.assertIsNone(properties.attribute_version(self.room1))
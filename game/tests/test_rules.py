@@ -14,15 +14,56 @@ class TestEvAdventureRuleEngine(test_resources.BaseEvenniaTest):
         self.roll_engine = rules.EvAdventureRollEngine()
         self.character = create.create_object(EvAdventureCharacter, key="testchar")
 
+    @patch("game.rules.choices")
     @patch("game.rules.randint")
-    def test_roll(self, mock_randint):
+    def test_roll(self, mock_randint, mock_choices):
         # tests a general roll, patching the random integer function to a
         # static number for consistency
 
         mock_randint.return_value = 4
         self.assertEqual(self.roll_engine.roll("1d6"), 4)
+        # several dice are drawn all at once
+        mock_choices.return_value = [4, 4]
         self.assertEqual(self.roll_engine.roll("2d6"), 2 * 4)
 
+    def test_streams(self):
+        # engines with the same seed roll the same
+        engine1 = self.roll_engine.stream("combat1", seed=42)
+        engine2 = rules.EvAdventureRollEngine(rng=rules.RollStream(42))
+        self.assertIs(self.roll_engine.stream("combat1"), engine1)
+        self.assertEqual(
+            [engine1.roll("1d20") for _ in range(5)],
+            [engine2.roll("1d20") for _ in range(5)],
+        )
+
+        # replaying a stream from a snapshot
+        snapshot = engine1.snapshot()
+        rolls = [engine1.roll("2d6"), engine1.roll_many("1d8", 4)]
+        engine1.restore(snapshot)
+        self.assertEqual([engine1.roll("2d6"), engine1.roll_many("1d8", 4)], rolls)
+
+        self.roll_engine.drop_stream("combat1")
+        self.assertIsNot(self.roll_engine.stream("combat1"), engine1)
+
+        # the stream goes on between calls, without holding on to the engine
+        engine2 = rules.EvAdventureRollEngine(rng=rules.RollStream(1))
+        self.assertEqual(
+            [self.roll_engine.stream("k", 1).roll("1d20") for _ in range(2)],
+            [engine2.roll("1d20") for _ in range(2)],
+        )
+        self.roll_engine.drop_stream("k")
+
+        # only the most recently used streams are kept
+        with patch("game.rules.ROLL_STREAM_LIMIT", 2):
+            for key in ("a", "b", "a", "c"):
+                self.roll_engine.stream(key)
+        self.assertEqual(list(self.roll_engine.streams)[-2:], ["a", "c"])
+        self.assertNotIn("b", self.roll_engine.streams)
+
+        # the global engine has no stream of its own to snapshot
+        with self.assertRaises(RuntimeError):
+            self.roll_engine.snapshot()
+
     def test_advantage(self):
         # tests a roll with advantage
 
@@ -102,6 +143,47 @@ class TestEvAdventureRuleEngine(test_resources.BaseEvenniaTest):
             self.roll_engine.saving_throw(char, Ability.STR, 15), (False, None)
         )
 
+    @patch("game.rules.choices")
+    def test_roll_many(self, mock_choices):
+        mock_choices.return_value = [3, 20, 7]
+        self.assertEqual(self.roll_engine.roll_many("1d20", 3), [3, 20, 7])
+        mock_choices.assert_called_once_with(range(1, 21), k=3)
+
+    @patch("game.rules.choices")
+    def test_saving_throw_many(self, mock_choices):
+        # testing saving throws for a whole group at once
+        char1 = self.character
+        char1.strength = 2
+        char2 = create.create_object(EvAdventureCharacter, key="testchar2")
+        char2.strength = 5
+
+        # two d20s per character, the second only counts with dis/advantage
+        mock_choices.return_value = [10, 15, 20, 1]
+
+        # no advantage, only the first die counts
+        self.assertEqual(
+            self.roll_engine.saving_throw_many([char1, char2], Ability.STR, 13),
+            ([False, True], [None, Ability.CRITICAL_SUCCESS]),
+        )
+        # advantage for the first, disadvantage for the second
+        self.assertEqual(
+            self.roll_engine.saving_throw_many(
+                [char1, char2],
+                Ability.STR,
+                [13, 6],
+                adv_mask=[True, False],
+                disadv_mask=[False, True],
+            ),
+            ([True, False], [None, Ability.CRITICAL_FAILURE]),
+        )
+        # advantage and disadvantage cancel out
+        self.assertEqual(
+            self.roll_engine.saving_throw_many(
+                [char1], Ability.STR, 11, adv_mask=[True], disadv_mask=[True]
+            ),
+            ([True], [None]),
+        )
+
     def test_pass_saving_throw_but_with_patch(self):
         # i wanna try a patch this time. there are benefits to using patches.
         # patches clean themselves up after a test, unlike a mock.
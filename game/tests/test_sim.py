@@ -0,0 +1,92 @@
+import pickle
+
+from evennia.utils import create
+from evennia.utils.test_resources import BaseEvenniaTest, BaseEvenniaTestCase
+
+from ..characters import EvAdventureCharacter
+from ..dice import RollStream
+from ..enums import Ability
+from ..rules import EvAdventureRollEngine
+from ..sim import CombatantRecord, WeaponRecord, run_fight, simulate
+
+
+class TestSimulator(BaseEvenniaTestCase):
+    def test_record_copy(self):
+        record = CombatantRecord(
+            key="bob", strength=3, weapon=WeaponRecord(damage_roll="1d8")
+        )
+        copy = record.copy()
+        copy.hp = 1
+        self.assertEqual(
+            (copy.key, copy.strength, copy.weapon.damage_roll), ("bob", 3, "1d8")
+        )
+        self.assertEqual(record.hp, 8)
+
+    def test_record_pickle(self):
+        # records are sent to worker processes by pickling
+        record = CombatantRecord(key="bob", strength=3, hp=5)
+        record.defeated = True
+        loaded = pickle.loads(pickle.dumps(record))
+        self.assertEqual(vars(loaded).keys(), vars(record).keys())
+        self.assertEqual(
+            (loaded.key, loaded.strength, loaded.hp, loaded.defeated),
+            ("bob", 3, 5, True),
+        )
+        self.assertEqual(loaded.weapon.damage_roll, "1d4")
+
+    def test_record_from_dict(self):
+        record = CombatantRecord.from_dict(
+            {
+                "key": "wizard",
+                "intelligence": 4,
+                "weapon": {"attack_type": "intelligence"},
+            },
+            team=1,
+        )
+        self.assertEqual(record.team, 1)
+        self.assertEqual(record.intelligence, 4)
+        self.assertEqual(record.weapon.attack_type, Ability.INT)
+
+    def test_record_living_hooks(self):
+        # records use the same hooks as characters
+        record = CombatantRecord(hp=5, hp_max=8, coins=3)
+        record.at_damage(4)
+        self.assertEqual(record.hp, 1)
+        record.heal(20)
+        self.assertEqual(record.hp, 8)
+        self.assertEqual(record.at_pay(5), 3)
+
+    def test_run_fight(self):
+        fighters = [
+            CombatantRecord(key="hero", team=0, strength=5, hp=20, hp_max=20),
+            CombatantRecord(key="rat", team=1, is_pc=False),
+        ]
+        engine = EvAdventureRollEngine(rng=RollStream(1))
+        result = run_fight(fighters, engine)
+        self.assertEqual(result.winner, 0)
+        self.assertEqual(len(result.time_to_kill), 1)
+        # npcs just die, without a death roll
+        self.assertEqual(result.death_outcomes, {"killed": 1})
+        self.assertTrue(fighters[1].defeated)
+
+    def test_simulate(self):
+        teams = [[CombatantRecord()], [CombatantRecord(), CombatantRecord()]]
+        report = simulate(teams, fights=200, workers=1, seed=5)
+        self.assertEqual(report["fights"], 200)
+        self.assertAlmostEqual(
+            sum(report["win_rates"].values()) + report["draw_rate"], 1.0
+        )
+        # seeded runs are repeatable
+        again = simulate(teams, fights=200, workers=1, seed=5)
+        self.assertEqual(report["win_rates"], again["win_rates"])
+        self.assertEqual(report["death_outcomes"], again["death_outcomes"])
+
+
+class TestSimulatorRecords(BaseEvenniaTest):
+    def test_from_character(self):
+        character = create.create_object(EvAdventureCharacter, key="testchar")
+        character.strength = 3
+        record = CombatantRecord.from_character(character, team=1)
+        self.assertEqual((record.key, record.strength, record.team), ("testchar", 3, 1))
+        self.assertEqual(record.armor, character.equipment.armor)
+        self.assertEqual(record.weapon.damage_roll, "1d4")
@@ -0,0 +1,84 @@
+from evennia.objects.models import ObjectDB
+from evennia.typeclasses.attributes import AttributeHandler
+from evennia.utils import create
+from evennia.utils.test_resources import BaseEvenniaTest
+
+from ..characters import EvAdventureCharacter
+from ..hotstats import HOT_STATS
+from ..statblock import STAT_BLOCK_VERSION
+
+
+class TestStatBlock(BaseEvenniaTest):
+    def setUp(self):
+        super().setUp()
+        self.character = create.create_object(
+            EvAdventureCharacter,
+            key="testchar",
+            attributes=(("strength", 3), ("hp", 5), ("desc", "A test.")),
+        )
+
+    def _reload(self):
+        HOT_STATS.flush()
+        self.character.flush_from_cache(force=True)
+        return ObjectDB.objects.get(id=self.character.id)
+
+    def test_block(self):
+        self.assertEqual(
+            self.character.stat_block, (STAT_BLOCK_VERSION, 3, 1, 1, 1, 1, 1, 5, 8, 1)
+        )
+        # all the stats are in one Attribute
+        keys = {attr.key for attr in self.character.attributes.all()}
+        self.assertIn("stat_block", keys)
+        self.assertFalse(keys & {"strength", "hp", "hp_max", "level"})
+        self.assertEqual(self.character.db.desc, "A test.")
+
+        self.character.dexterity = 4
+        self.character.attributes.add("willpower", 2)
+        character = self._reload()
+        # a single Attribute lookup (Evennia fetches the link, then the Attribute)
+        with self.assertNumQueries(2):
+            self.assertEqual(
+                (character.strength, character.dexterity, character.willpower),
+                (3, 4, 2),
+            )
+            self.assertEqual(
+                (character.hp, character.hp_max, character.level), (5, 8, 1)
+            )
+
+    def test_db(self):
+        # the packed stats still look like Attributes of their own
+        self.character.db.strength = 5
+        self.assertEqual(self.character.strength, 5)
+        self.assertEqual(self.character.db.strength, 5)
+        self.assertEqual(self.character.attributes.get("hp"), 5)
+        self.assertTrue(self.character.attributes.has("hp_max"))
+        self.assertEqual(
+            self.character.attributes.get(["strength", "desc"]), [5, "A test."]
+        )
+        self.assertIsNone(self.character.attributes.get("hp", return_obj=True))
+
+        # and so does removing them, which sets them back to the default
+        del self.character.db.strength
+        self.assertEqual(self.character.db.strength, 1)
+        self.character.attributes.remove(["hp", "desc"])
+        self.assertEqual((self.character.hp, self.character.db.desc), (8, None))
+
+        character = self._reload()
+        self.assertEqual((character.db.strength, character.db.hp), (1, 8))
+
+    def test_migrate(self):
+        # make the character look like one from before the stat block
+        handler = self.character.attributes
+        AttributeHandler.remove(handler, "stat_block", category="stats")
+        AttributeHandler.batch_add(handler, ("endurance", 6), ("hp", 2), ("level", 3))
+
+        character = self._reload()
+        self.assertEqual(
+            (character.endurance, character.hp, character.level), (6, 2, 3)
+        )
+        self.assertEqual(character.strength, 1)
+        keys = {attr.key for attr in character.attributes.all()}
+        self.assertNotIn("endurance", keys)
+        self.assertNotIn("hp", keys)
+        # and it stays migrated
+        self.assertEqual(self._reload().stat_block[3], 6)
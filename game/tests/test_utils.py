@@ -1,7 +1,9 @@
 from evennia.utils import create
 from evennia.utils.test_resources import BaseEvenniaTest
+from evennia.utils.ansi import ANSIString
 
-from .. import utils
+from .. import objects, utils
+from ..characters import EvAdventureCharacter
 
 
 class TestUtils(BaseEvenniaTest):
@@ -27,3 +29,33 @@ Attacks using |wstrength|n against |warmor|n
 Damage roll: |w1d6|n
 """.strip(),
         )
+
+    def test_get_obj_stats_cache(self):
+        utils.clear_obj_stats_cache()
+        character = create.create_object(EvAdventureCharacter, key="testchar")
+        weapon = create.create_object(
+            objects.EvAdventureWeapon, key="sword", attributes=(("desc", "Sharp."),)
+        )
+        result = utils.get_obj_stats(weapon)
+        self.assertIn("Quality: |w3|n", result)
+        with self.assertNumQueries(0):
+            self.assertIs(utils.get_obj_stats(weapon), result)
+            ansi = utils.get_obj_stats(weapon, ansi=True)
+            self.assertIsInstance(ansi, ANSIString)
+            self.assertIs(utils.get_obj_stats(weapon, ansi=True), ansi)
+
+        # changing an Attribute or the key renders it again
+        weapon.quality = 1
+        self.assertIn("Quality: |w1|n", utils.get_obj_stats(weapon))
+        weapon.db.desc = "Blunt."
+        self.assertIn("Blunt.", utils.get_obj_stats(weapon))
+        weapon.key = "club"
+        self.assertIn("|cclub|n", utils.get_obj_stats(weapon))
+
+        # as does changing the owner's equipment
+        character.equipment.add(weapon)
+        self.assertIn("Worn: [backpack]", utils.get_obj_stats(weapon, owner=character))
+        character.equipment.move(weapon)
+        self.assertIn(
+            "Worn: [weapon hand]", utils.get_obj_stats(weapon, owner=character)
+        )
@@ -1,3 +1,9 @@
+from collections import OrderedDict
+
+from evennia.utils.ansi import ANSIString
+
+from .properties import attribute_version
+
 _OBJ_STATS = """
 |c{key}|n
 Value: ~|y{value}|n coins{carried}
@@ -10,23 +16,74 @@ Attacks using |w{attack_type_name}|n against |w{defense_type_name}|n
 Damage roll: |w{damage_roll}|n
 """.strip()
 
+# how many rendered stat sheets to keep around
+OBJ_STATS_CACHE_SIZE = 2000
+
+# {(obj id, owner id): [versions, text, ANSIString or None]}, oldest first
+_OBJ_STATS_CACHE = OrderedDict()
+
+
+def _obj_stats_versions(obj, owner):
+    """
+    Get what a rendered stat sheet depends on, or None if that can't be told and
+    the sheet can't be cached.
 
-def get_obj_stats(obj, owner=None):
     """
-    Get a string of stats about the object.
+    obj_version = attribute_version(obj)
+    if obj_version is None or not obj.id:
+        return None
+    if owner is None:
+        return (obj.key, obj_version, None)
+    equipment = getattr(owner, "equipment", None)
+    if equipment is None:
+        return None
+    return (obj.key, obj_version, equipment.loadout_version)
+
+
+def get_obj_stats(obj, owner=None, ansi=False):
+    """
+    Get a string of stats about the object. The result is cached until the
+    object's Attributes or key change, or the owner's equipment changes.
 
     Args:
         obj (EvAdventureObject): The object to get stats for.
         owner (EvAdventureCharacter, optional): The one currently owning/carrying `obj`, if any. Can be
             used to show e.g. where they are wielding it.
+        ansi (bool, optional): Get the stats as an `ANSIString`, with the markup
+            already parsed.
     Returns:
-        str: A nice info string to display about the object.
+        str or ANSIString: A nice info string to display about the object.
 
     """
+    versions = _obj_stats_versions(obj, owner)
+    if versions is None:
+        text = _render_obj_stats(obj, owner)
+        return ANSIString(text) if ansi else text
+
+    cache_key = (obj.id, owner.id if owner else None)
+    entry = _OBJ_STATS_CACHE.get(cache_key)
+    if entry is None or entry[0] != versions:
+        entry = [versions, _render_obj_stats(obj, owner), None]
+        _OBJ_STATS_CACHE[cache_key] = entry
+        if len(_OBJ_STATS_CACHE) > OBJ_STATS_CACHE_SIZE:
+            _OBJ_STATS_CACHE.popitem(last=False)
+    if not ansi:
+        return entry[1]
+    if entry[2] is None:
+        entry[2] = ANSIString(entry[1])
+    return entry[2]
+
+
+def clear_obj_stats_cache():
+    """Forget all cached stat sheets."""
+    _OBJ_STATS_CACHE.clear()
+
+
+def _render_obj_stats(obj, owner=None):
+    """Render the stats of `obj`, see `get_obj_stats`."""
     carried = ""
     if owner:
-        objmap = dict(owner.equipment.all())
-        carried = objmap.get(obj)
+        carried = owner.equipment.identify_slot(obj)
         carried = f", Worn: [{carried.value}]" if carried else ""
 
     attack_type = getattr(obj, "attack_type", None)
@@ -30,7 +30,13 @@ def at_server_start():
     This is called every time the server starts up, regardless of
     how it was shut down.
     """
-    pass
+    from game.catalog import CATALOG
+    from game.chargen import SHEET_POOL
+
+    # index all items in memory, they're kept up to date from here on
+    CATALOG.rebuild()
+    # have some character sheets ready for the first players
+    SHEET_POOL.request_refill()
 
 
 def at_server_stop():
@@ -38,7 +44,11 @@ def at_server_stop():
     This is called just before the server is shut down, regardless
     of it is for a reload, reset or shutdown.
     """
-    pass
+    from game.hotstats import HOT_STATS
+
+    # write the hot stats (hp, coins, xp) that are only in memory. This also
+    # applies the coin ledger
+    HOT_STATS.flush()
 
 
 def at_server_reload_start():